@@ -0,0 +1,54 @@
+"""
+Cold-start cost of the package: `import mobilemoney` alone, then the first
+access to each provider's client and to every export. Each case runs in a
+fresh interpreter.
+
+    python -m benchmarks.bench_import
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+
+CASES = (
+    ("import mobilemoney", ""),
+    ("OMPayment", "mobilemoney.OMPayment"),
+    ("MMPayment", "mobilemoney.MMPayment"),
+    ("LigdicashPayment", "mobilemoney.LigdicashPaymentWithRedirect"),
+    ("validate_om_prod_payment", "mobilemoney.validate_om_prod_payment"),
+    ("all exports", "[getattr(mobilemoney, name) for name in mobilemoney.__all__]"),
+)
+
+SCRIPT = """
+import json, sys, time
+before = len(sys.modules)
+started = time.perf_counter()
+import mobilemoney
+{access}
+elapsed = time.perf_counter() - started
+print(json.dumps([elapsed, len(sys.modules) - before, "requests" in sys.modules]))
+"""
+
+
+def measure(access: str):
+    output = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(access=access)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def main(repeat=11):
+    print(f"{'case':>26}  {'ms':>7}  {'modules':>7}  requests")
+    for name, access in CASES:
+        runs = [measure(access) for _ in range(repeat)]
+        elapsed = statistics.median(run[0] for run in runs)
+        modules, requests = runs[-1][1], runs[-1][2]
+        print(f"{name:>26}  {elapsed * 1e3:7.1f}  {modules:7d}  {requests}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Aggregate throughput of a `MerchantPool` under a per-account rate limit
+(`rate_limits`, one bucket per username, as an operator would enforce it),
+with 1 to 8 Orange Money accounts answering through a `FakeTransport`.
+
+    python -m benchmarks.bench_merchants
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mobilemoney.merchants import MerchantPool
+from mobilemoney.orangemoney import GenericPayment
+from mobilemoney.ratelimit import rate_limits
+from mobilemoney.transport import FakeTransport
+
+REPLY = (
+    b"<status>200</status><message>Paiement effectue avec succes</message>"
+    b"<transID>OM.2310.1712.0001</transID>"
+)
+
+
+def run(accounts, rate, seconds, threads):
+    transport = FakeTransport(record=False).add("POST", "http://om.local/", REPLY)
+    pool = MerchantPool()
+    for index in range(accounts):
+        client = GenericPayment(
+            "http://om.local/", "70000000", f"merchant{index}", "pw"
+        )
+        client.pool = transport
+        pool.add(client)
+
+    calls = int(rate * accounts * seconds)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        results = list(
+            executor.map(
+                lambda _: pool.call(
+                    "orangemoney", "validate_payment", "76000000", "1234", 100, "m"
+                ),
+                range(calls),
+            )
+        )
+    elapsed = time.perf_counter() - started
+    assert all(result.success for result in results)
+    return calls / elapsed
+
+
+def main(rate=200.0, seconds=1.0, threads=32):
+    rate_limits.configure("orangemoney", rate, burst=1)
+    try:
+        print(f"per-account limit: {rate:.0f} req/s")
+        print(f"{'accounts':>8}  {'req/s':>8}")
+        for accounts in (1, 2, 4, 8):
+            throughput = run(accounts, rate, seconds, threads)
+            print(f"{accounts:>8}  {throughput:>8.0f}")
+    finally:
+        rate_limits.remove("orangemoney")
+
+
+if __name__ == "__main__":
+    main()
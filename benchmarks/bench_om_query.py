@@ -0,0 +1,50 @@
+"""
+Per-request serialization cost of the Orange Money OMPREQ command: the
+precompiled template (`GenericPayment.serialize_query`) against the previous
+ElementTree build.
+
+    python -m benchmarks.bench_om_query
+"""
+
+import timeit
+import xml.etree.ElementTree as ET
+
+from mobilemoney.orangemoney import GenericPayment
+
+
+def elementtree_query(payment, customer_phone, customer_otp, amount, libel, reference):
+    root = ET.Element("COMMAND")
+
+    ET.SubElement(root, "TYPE").text = "OMPREQ"
+    ET.SubElement(root, "customer_msisdn").text = f"{customer_phone}"
+    ET.SubElement(root, "merchant_msisdn").text = payment.phonenumber
+    ET.SubElement(root, "api_username").text = payment.username
+    ET.SubElement(root, "api_password").text = payment.password
+    ET.SubElement(root, "amount").text = f"{amount}"
+    ET.SubElement(root, "PROVIDER").text = "101"
+    ET.SubElement(root, "PROVIDER2").text = "101"
+    ET.SubElement(root, "PAYID").text = "12"
+    ET.SubElement(root, "PAYID2").text = "12"
+    ET.SubElement(root, "otp").text = f"{customer_otp}"
+    ET.SubElement(root, "reference_number").text = libel
+    ET.SubElement(root, "ext_txn_id").text = reference
+
+    return ET.tostring(root, encoding="utf-8")
+
+
+def main(number=100_000):
+    payment = GenericPayment("", "70000000", "merchant", "p&ss<word>")
+    args = ("76000000", "1234", 1500, "Achat n°42 & co", "231017.101112.000001")
+
+    assert elementtree_query(payment, *args) == payment.serialize_query(*args)
+
+    for name, func in (
+        ("elementtree", lambda: elementtree_query(payment, *args)),
+        ("template", lambda: payment.serialize_query(*args)),
+    ):
+        best = min(timeit.repeat(func, number=number, repeat=5))
+        print(f"{name:>12}: {best / number * 1e6:8.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Cost of parsing an Orange Money response: the single-pass expat parser
+(`GenericPayment.parse_result` on raw bytes) against the previous
+`ET.fromstring` build over the decoded text.
+
+    python -m benchmarks.bench_om_result
+"""
+
+import timeit
+import xml.etree.ElementTree as ET
+
+from mobilemoney.orangemoney import GenericPayment
+
+
+def elementtree_result(result: str):
+    root = ET.fromstring("<root>" + result + "</root>")
+
+    status, message, trans_id = (
+        root.find("status"),
+        root.find("message"),
+        root.find("transID"),
+    )
+    return {"status": status.text, "message": message.text, "trans_id": trans_id.text}
+
+
+def main(number=100_000):
+    payment = GenericPayment()
+    content = (
+        b"<status>200</status><message>Paiement effectue avec succes</message>"
+        b"<transID>OM.2310.1712.0001</transID>"
+    )
+
+    assert elementtree_result(content.decode("utf-8")) == payment.parse_result(content)
+
+    for name, func in (
+        ("elementtree", lambda: elementtree_result(content.decode("utf-8"))),
+        ("expat", lambda: payment.parse_result(content)),
+    ):
+        best = min(timeit.repeat(func, number=number, repeat=5))
+        print(f"{name:>12}: {best / number * 1e6:8.2f} us/response")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Per-request cost of building the Moov and Ligdicash requests: cached
+headers and pre-encoded JSON templates against the previous build (new
+headers dict, Basic auth encoded on every call, body serialized from nested
+dicts). `ligdicash order` also counts building the command itself: a
+deep-copied, hand-filled dict against `InvoiceBuilder.build()`. Reports
+time and transient memory per request, with orjson when installed and with
+the standard library encoder.
+
+    python -m benchmarks.bench_request_build
+"""
+
+import copy
+import json
+import timeit
+import tracemalloc
+
+from benchmarks.suite import COMMAND
+from mobilemoney import utils
+from mobilemoney.ligdicash import GenericPaymentWithRedirect, InvoiceBuilder
+from mobilemoney.moovmoney import GenericPayment
+from mobilemoney.transport import basic_auth
+
+
+def previous_moov_payment(payment, *args):
+    headers = {
+        "content-type": "application/json",
+        "command-id": "process-commit-otppay",
+    }
+    headers["authorization"] = basic_auth((payment.username, payment.password))
+    return headers, json.dumps(payment.parse_query(*args)).encode("utf-8")
+
+
+def previous_moov_otp(payment, customer_phone, amount):
+    data = {
+        "request-id": "",
+        "destination": f"226{customer_phone}",
+        "amount": amount,
+        "remarks": "Merchant Payment with OTP",
+        "extended-data": {"module": "MERCHOTPPAY"},
+    }
+    headers = {
+        "content-type": "application/json",
+        "command-id": "process-create-mror-otp",
+    }
+    headers["authorization"] = basic_auth((payment.username, payment.password))
+    return headers, json.dumps(data).encode("utf-8")
+
+
+def previous_ligdicash_invoice(payment, command):
+    headers = {
+        "Content-Type": "application/json",
+        "Apikey": payment.username,
+        "Authorization": f"Bearer {payment.password}",
+        "Accept": "application/json",
+    }
+    return headers, json.dumps({"commande": command}).encode("utf-8")
+
+
+def previous_ligdicash_order(payment, customer, items):
+    command = copy.deepcopy(COMMAND)
+    invoice = command["invoice"]
+    invoice["customer_firstname"], invoice["customer_lastname"] = customer
+    invoice["items"] = [
+        {
+            "name": name,
+            "description": description,
+            "quantity": quantity,
+            "unit_price": unit_price,
+            "total_price": quantity * unit_price,
+        }
+        for name, quantity, unit_price, description in items
+    ]
+    invoice["total_amount"] = sum(item["total_price"] for item in invoice["items"])
+    command["custom_data"]["transaction_id"] = "2021000000001"
+    return previous_ligdicash_invoice(payment, command)
+
+
+def transient_bytes(func, calls=200) -> float:
+    """Average peak of traced memory allocated while `func` runs."""
+    func()
+    total = 0
+    tracemalloc.start()
+    for _ in range(calls):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        func()
+        total += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return total / calls
+
+
+def main(number=50_000):
+    moov = GenericPayment("", "merchant", "secret")
+    ligdicash = GenericPaymentWithRedirect("", "apikey", "apitoken")
+    args = ("76000000", "1234", 1500, "Achat n°42", "MM000000000001")
+
+    assert json.loads(moov.serialize_query(*args)) == moov.parse_query(*args)
+
+    store = InvoiceBuilder(
+        COMMAND["store"]["name"],
+        COMMAND["store"]["website_url"],
+        **COMMAND["actions"],
+        description=COMMAND["invoice"]["description"],
+    )
+    customer = ("Awa", "Ouedraogo")
+    items = [("Jus de fruits", 1, 1000, "Bouteille 1L"), ("Gateau", 2, 500, "")]
+
+    def build_order():
+        invoice = store.build(
+            items,
+            *customer,
+            customer_email=COMMAND["invoice"]["customer_email"],
+            transaction_id="2021000000001",
+        )
+        return ligdicash._invoice_request(invoice)
+
+    cases = (
+        ("moov payment", "previous", lambda: previous_moov_payment(moov, *args)),
+        ("moov payment", "cached", lambda: moov._payment_request(*args)),
+        ("moov otp", "previous", lambda: previous_moov_otp(moov, args[0], args[2])),
+        (
+            "moov otp",
+            "cached",
+            lambda: moov._otp_request(args[0], args[2], "process-create-mror-otp"),
+        ),
+        (
+            "ligdicash invoice",
+            "previous",
+            lambda: previous_ligdicash_invoice(ligdicash, COMMAND),
+        ),
+        ("ligdicash invoice", "cached", lambda: ligdicash._invoice_request(COMMAND)),
+        (
+            "ligdicash order",
+            "previous",
+            lambda: previous_ligdicash_order(ligdicash, customer, items),
+        ),
+        ("ligdicash order", "builder", build_order),
+    )
+
+    encoders = [("json", None)]
+    if utils.orjson is not None:
+        encoders.insert(0, ("orjson", utils.orjson))
+
+    print(f"{'request':<18} {'build':<16} {'us/request':>10} {'B/request':>10}")
+    for encoder, module in encoders:
+        utils.orjson = module
+        for request, build, func in cases:
+            if build == "previous" and encoder != encoders[0][0]:
+                continue
+            label = build if build == "previous" else f"{build} ({encoder})"
+            best = min(timeit.repeat(func, number=number, repeat=5))
+            print(
+                f"{request:<18} {label:<16} {best / number * 1e6:>10.2f} "
+                f"{transient_bytes(func):>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
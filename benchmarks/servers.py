@@ -0,0 +1,171 @@
+"""
+Local stand-ins for the provider gateways, used by the benchmarks.
+
+`MockProviderServer` answers like:
+
+- Orange Money: `POST /om` with an OMPREQ XML command, XML fragment reply
+- Moov: `POST /moov` keyed on the `command-id` header
+  (`process-create-mror-otp`, `process-mror-resend-otp`,
+  `process-commit-otppay`)
+- Ligdicash: `POST /ligdicash/create` and `GET /ligdicash/confirm`
+
+`latency` (+ uniform `jitter`) is added to every reply and a fraction
+`error_rate` of the requests gets an HTTP 500. `transport()` gives the same
+replies in process, through a `FakeTransport`.
+"""
+
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from mobilemoney.transport import FakeTransport, encode_body
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body: bytes, content_type: str):
+        reason = self.responses.get(status, ("",))[0]
+        # one write for headers and body: avoids delayed-ACK stalls on keep-alive
+        self.wfile.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode("latin1") + body
+        )
+
+    def _handle(self, method):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        self._reply(*self.server.reply(method, self.path, self.headers, body))
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_GET(self):
+        self._handle("GET")
+
+
+class MockProviderServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, host="127.0.0.1"):
+        super().__init__((host, 0), _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def url(self, path: str) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}{path}"
+
+    def reply(self, method: str, target: str, headers, body: bytes):
+        """(status, body, content type) answered to a request."""
+        parts = urlsplit(target)
+
+        self.count_request()
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+
+        if random.random() < self.error_rate:
+            return 500, b"Internal Server Error", "text/plain"
+
+        route = (method, parts.path.rstrip("/"))
+        if route == ("POST", "/om"):
+            return 200, self.om_reply(body), "application/xml"
+        if route == ("POST", "/moov"):
+            reply = self.moov_reply(headers.get("command-id", ""), body)
+            return 200, reply, "application/json"
+        if route == ("POST", "/ligdicash/create"):
+            return 200, self.ligdicash_create(body), "application/json"
+        if route == ("GET", "/ligdicash/confirm"):
+            token = parse_qs(parts.query).get("invoiceToken", [""])[0]
+            return 200, self.ligdicash_confirm(token), "application/json"
+        return 404, b"Not Found", "text/plain"
+
+    def transport(self) -> FakeTransport:
+        """Transport answering like this server, without any socket."""
+
+        def handler(
+            method, url, params=None, headers=None, data=None, json=None, **kwargs
+        ):
+            body, _ = encode_body(data, json)
+            target = url
+            if params:
+                target = f"{url}{'&' if '?' in url else '?'}{urlencode(params)}"
+            status, content, content_type = self.reply(
+                method, target, headers or {}, bytes(body)
+            )
+            return status, content, {"Content-Type": content_type}
+
+        return FakeTransport(handler, record=False)
+
+    def om_reply(self, body: bytes) -> bytes:
+        if b"<otp>" not in body and b"<otp />" not in body:
+            return b"<status>400</status><message>Requete invalide</message><transID>Error</transID>"
+        return (
+            b"<status>200</status><message>Paiement effectue avec succes</message>"
+            b"<transID>OM.%d</transID>" % next(self._ids)
+        )
+
+    def moov_reply(self, command_id: str, body: bytes) -> bytes:
+        request = json.loads(body or b"{}")
+        trans_id = f"MM{next(self._ids):012d}"
+        if command_id in ("process-create-mror-otp", "process-mror-resend-otp"):
+            reply = {"status": "0", "message": "OTP envoye", "trans-id": trans_id}
+        elif command_id == "process-commit-otppay":
+            reply = {
+                "status": "0",
+                "message": "Paiement effectue",
+                "trans-id": trans_id,
+                "request-id": request.get("request-id", ""),
+            }
+        else:
+            reply = {"status": "-1", "message": f"command-id inconnu: {command_id}"}
+        return json.dumps(reply).encode("utf-8")
+
+    def ligdicash_create(self, body: bytes) -> bytes:
+        command = json.loads(body or b"{}").get("commande", {})
+        token = f"mock.{next(self._ids)}.token"
+        return json.dumps(
+            {
+                "response_code": "00",
+                "token": token,
+                "response_text": f"https://client.ligdicash.com/directpayment/invoice/{token}",
+                "description": "",
+                "custom_data": command.get("custom_data", {}),
+            }
+        ).encode("utf-8")
+
+    def ligdicash_confirm(self, token: str) -> bytes:
+        return json.dumps({"status": "completed", "token": token}).encode("utf-8")
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,223 @@
+"""
+Offline throughput benchmark for the Orange Money, Moov and Ligdicash
+clients against local stand-ins (see `benchmarks.servers`).
+
+For each provider it measures the sync path (one call after the other),
+the batched path (`BatchValidator`) and the concurrent asyncio path, and
+reports requests/second, latency percentiles and memory per call.
+`--transport` picks the sync transport: `urllib3` (default), `requests`,
+or `fake` to time the clients alone without sockets (also used by the
+async path, through the loop's executor).
+
+    python -m benchmarks.suite --requests 2000 --concurrency 32 --latency 0.005
+"""
+
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from benchmarks.servers import MockProviderServer
+from mobilemoney import (
+    ligdicash,
+    ligdicash_aio,
+    moovmoney,
+    moovmoney_aio,
+    orangemoney,
+    orangemoney_aio,
+)
+from mobilemoney.aio import AsyncConnectionPool
+from mobilemoney.batch import BatchItem, BatchValidator
+from mobilemoney.pool import ConnectionPool, Urllib3Transport
+
+TRANSPORTS = ("urllib3", "requests", "fake")
+
+COMMAND = {
+    "invoice": {
+        "items": [
+            {
+                "name": "Jus de fruits",
+                "description": "Bouteille 1L",
+                "quantity": 1,
+                "unit_price": 1000,
+                "total_price": 1000,
+            }
+        ],
+        "total_amount": 1000,
+        "devise": "XOF",
+        "description": "Achat de jus de fruits",
+        "customer": "",
+        "customer_firstname": "Awa",
+        "customer_lastname": "Ouedraogo",
+        "customer_email": "client@example.com",
+        "external_id": "",
+        "otp": "",
+    },
+    "store": {"name": "Boutique", "website_url": "http://localhost"},
+    "actions": {
+        "cancel_url": "http://localhost",
+        "return_url": "http://localhost",
+        "callback_url": "http://localhost",
+    },
+    "custom_data": {"transaction_id": "2021000000001"},
+}
+
+
+def providers(server):
+    """Per provider: (sync client class, async client class, ctor args, call args)."""
+    return {
+        "orangemoney": (
+            orangemoney.GenericPayment,
+            orangemoney_aio.AsyncGenericPayment,
+            (server.url("/om"), "70000000", "merchant", "secret"),
+            ("76000000", "123456", 1000, "Achat"),
+        ),
+        "moovmoney": (
+            moovmoney.GenericPayment,
+            moovmoney_aio.AsyncGenericPayment,
+            (server.url("/moov"), "merchant", "secret"),
+            ("60000000", "123456", 1000, "Achat", "MM000000000001"),
+        ),
+        "ligdicash": (
+            ligdicash.GenericPaymentWithRedirect,
+            ligdicash_aio.AsyncGenericPaymentWithRedirect,
+            (server.url("/ligdicash/create"), "apikey", "apitoken"),
+            (COMMAND,),
+        ),
+    }
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_sync(client, args, requests):
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        client.validate_payment(*args)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def run_batched(client, args, requests, concurrency):
+    with BatchValidator(max_workers=concurrency) as validator:
+        items = (BatchItem(client, *args) for _ in range(requests))
+        return [result.elapsed for result in validator.run(items)]
+
+
+def run_async(client, args, requests, concurrency, pool=None):
+    async def call():
+        started = time.perf_counter()
+        await client.validate_payment(*args)
+        return time.perf_counter() - started
+
+    async def main():
+        client.async_pool = pool or AsyncConnectionPool(pool_size=concurrency)
+        try:
+            return await asyncio.gather(*(call() for _ in range(requests)))
+        finally:
+            if client.async_pool.asynchronous:
+                await client.async_pool.close()
+
+    return asyncio.run(main())
+
+
+def transport(name, server, pool_size):
+    """Sync transport; `fake` answers in process, to time the client alone."""
+    if name == "fake":
+        return server.transport()
+    if name == "requests":
+        return ConnectionPool(pool_size=pool_size)
+    return Urllib3Transport(pool_size=pool_size)
+
+
+def memory_per_call(client, args, calls):
+    """Retained and peak traced bytes per sync call."""
+    client.validate_payment(*args)
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for _ in range(calls):
+        client.validate_payment(*args)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (current - before) / calls, peak - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--memory-calls", type=int, default=200)
+    parser.add_argument(
+        "--providers", nargs="*", default=["orangemoney", "moovmoney", "ligdicash"]
+    )
+    parser.add_argument("--transport", choices=TRANSPORTS, default="urllib3")
+    options = parser.parse_args()
+
+    header = (
+        f"{'provider':<12} {'path':<10} {'req/s':>9} {'p50 ms':>8} "
+        f"{'p95 ms':>8} {'p99 ms':>8}"
+    )
+    with MockProviderServer(
+        options.latency, options.jitter, options.error_rate
+    ) as server:
+        print(header)
+        memory = {}
+        for name, (sync_cls, async_cls, ctor, args) in providers(server).items():
+            if name not in options.providers:
+                continue
+
+            client = sync_cls(*ctor)
+            client.pool = transport(options.transport, server, options.concurrency)
+            paths = (
+                ("sync", lambda: run_sync(client, args, options.requests)),
+                (
+                    "batched",
+                    lambda: run_batched(
+                        client, args, options.requests, options.concurrency
+                    ),
+                ),
+                (
+                    "async",
+                    lambda: run_async(
+                        async_cls(*ctor),
+                        args,
+                        options.requests,
+                        options.concurrency,
+                        client.pool if options.transport == "fake" else None,
+                    ),
+                ),
+            )
+            for path, run in paths:
+                started = time.perf_counter()
+                latencies = run()
+                elapsed = time.perf_counter() - started
+                print(
+                    f"{name:<12} {path:<10} {len(latencies) / elapsed:>9.0f} "
+                    f"{percentile(latencies, 0.50) * 1e3:>8.2f} "
+                    f"{percentile(latencies, 0.95) * 1e3:>8.2f} "
+                    f"{percentile(latencies, 0.99) * 1e3:>8.2f}"
+                )
+
+            memory[name] = memory_per_call(client, args, options.memory_calls)
+            client.pool.close()
+
+        print()
+        print(f"{'provider':<12} {'retained B/call':>16} {'peak KiB':>9}")
+        for name, (retained, peak) in memory.items():
+            print(f"{name:<12} {retained:>16.0f} {peak / 1024:>9.1f}")
+        print(f"\nserver handled {server.requests} requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,33 @@
 import webbrowser
 
-from mobilemoney import verify_ligdicash_payment_token, validate_ligdicash_payment
+from mobilemoney import InvoiceBuilder, InvoiceItem, validate_ligdicash_payment
 
-
-order = {
-    "invoice": {
-        "items": [
-            {
-                "name": "Nom du produit ou Service",
-                "description": " Description du produit ou Service ",
-                "quantity": 1,
-                "unit_price": 100,
-                "total_price": 100,
-            }
-        ],
-        "total_amount": 100,
-        "devise": "XOF",
-        "description": " Description du contenu de la facture(Achat de jus de fruits)",
-        "customer": "",
-        "customer_firstname": "Nom du client",
-        "customer_lastname": "Prénom du client",
-        "customer_email": "tester@gligdicash.com",
-        "external_id": "",
-        "otp": "",
-    },
-    "store": {
-        "name": "Nom de votre site ou de votre boutique",
-        "website_url": "url de votre site ou de votre boutique",
-    },
-    "actions": {
-        "cancel_url": "http://localhost",
-        "return_url": "http://localhost",
-        "callback_url": "http://localhost",
-    },
-    "custom_data": {
-        "transaction_id": "2021000000001",
+# per-store parts, validated and encoded once
+store = InvoiceBuilder(
+    store_name="Nom de votre site ou de votre boutique",
+    website_url="url de votre site ou de votre boutique",
+    cancel_url="http://localhost",
+    return_url="http://localhost",
+    callback_url="http://localhost",
+    custom_data={
         "logfile": "202110210048426170b8ea884a9",
         "developpeur": "kaboretidiane",
     },
-}
+)
+
+# per order: items, customer and transaction id only
+order = store.build(
+    [
+        InvoiceItem(
+            "Nom du produit ou Service", 1, 100, " Description du produit ou Service "
+        )
+    ],
+    customer_firstname="Nom du client",
+    customer_lastname="Prénom du client",
+    customer_email="tester@gligdicash.com",
+    description=" Description du contenu de la facture(Achat de jus de fruits)",
+    transaction_id="2021000000001",
+)
 
 response = validate_ligdicash_payment(
     api_key="REV9DJR33TZ6J4I4O",
@@ -0,0 +1,396 @@
+import asyncio
+import functools
+import ssl
+import time
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from mobilemoney.base import BasePayment
+from mobilemoney.instrumentation import instrumentation
+from mobilemoney.ratelimit import rate_limits
+from mobilemoney.transport import (
+    Response,
+    Transport,
+    basic_auth,
+    encode_body,
+    request_target,
+    split_timeout,
+)
+
+# former name of the response class, now shared with the sync transports
+AsyncResponse = Response
+
+
+class AsyncConnectionPool(Transport):
+    """
+    Per-host pool of keep-alive HTTP/1.1 connections for asyncio, the
+    asynchronous `Transport` of the async clients.
+
+    At most `pool_size` requests run at once against a host, further callers
+    wait for a free connection. Idle connections older than `idle_timeout`
+    seconds are dropped instead of being reused.
+    """
+
+    def __init__(self, pool_size: int = 10, idle_timeout: float = 60.0):
+        if not isinstance(pool_size, int) or pool_size < 1:
+            raise ValueError("value 'pool_size' must be a positive 'int'")
+
+        if idle_timeout is not None and idle_timeout <= 0:
+            raise ValueError("value 'idle_timeout' must be positive or None")
+
+        self._pool_size = pool_size
+        self._idle_timeout = idle_timeout
+        self._hosts = {}
+        self._loop = None
+        self._ssl_contexts = {}
+        self._opened = 0
+        self._reused = 0
+        self._waited = 0
+
+    asynchronous = True
+
+    @property
+    def pool_size(self):
+        return self._pool_size
+
+    def _ssl_context(self, verify):
+        if verify not in self._ssl_contexts:
+            context = ssl.create_default_context()
+            if not verify:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            self._ssl_contexts[verify] = context
+        return self._ssl_contexts[verify]
+
+    def _host(self, key):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # connections and semaphores cannot outlive the loop they belong to
+            self._hosts = {}
+            self._loop = loop
+
+        host = self._hosts.get(key)
+        if host is None:
+            host = self._hosts[key] = _AsyncHost(self._pool_size)
+        return host
+
+    async def _connect(self, key, timeout):
+        scheme, hostname, port, verify = key
+        context = self._ssl_context(verify) if scheme == "https" else None
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(hostname, port, ssl=context), timeout
+        )
+        self._opened += 1
+        return _AsyncConnection(reader, writer)
+
+    def _checkout(self, host):
+        now = time.monotonic()
+        while host.idle:
+            connection = host.idle.pop()
+            if connection.closed:
+                continue
+            if (
+                self._idle_timeout is not None
+                and now - connection.last_used >= self._idle_timeout
+            ):
+                connection.close()
+                continue
+            return connection
+        return None
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        params=None,
+        headers=None,
+        data=None,
+        json=None,
+        auth=None,
+        timeout=None,
+        verify=True,
+    ) -> Response:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname, port, bool(verify))
+
+        path = request_target(url, params)
+        body, content_type = encode_body(data, json)
+
+        request_headers = {"Host": parts.netloc, "User-Agent": "bf-mobilemoney"}
+        if content_type is not None:
+            request_headers["Content-Type"] = content_type
+        request_headers.update(headers or {})
+        if auth is not None:
+            request_headers["Authorization"] = basic_auth(auth)
+        if body or method not in ("GET", "HEAD"):
+            request_headers["Content-Length"] = str(len(body))
+
+        head = f"{method} {path} HTTP/1.1\r\n" + "".join(
+            f"{name}: {value}\r\n" for name, value in request_headers.items()
+        )
+        payload = (head + "\r\n").encode("latin1") + body
+
+        connect_timeout, read_timeout = split_timeout(timeout)
+        host = self._host(key)
+
+        if host.slots.locked():
+            self._waited += 1
+        async with host.slots:
+            started = time.monotonic()
+            connection = self._checkout(host)
+            reused = connection is not None
+            if reused:
+                self._reused += 1
+            else:
+                connection = await self._connect(key, connect_timeout)
+
+            try:
+                try:
+                    response = await asyncio.wait_for(
+                        connection.exchange(method, payload), read_timeout
+                    )
+                except (ConnectionError, asyncio.IncompleteReadError) as exp:
+                    # the server dropped a kept-alive connection: the request
+                    # is only sent again when it cannot have been processed
+                    # (closed before any byte of the answer) or is idempotent,
+                    # a POST payment must never be charged twice
+                    if not reused or not (
+                        method in _IDEMPOTENT_METHODS or isinstance(exp, _Stale)
+                    ):
+                        raise
+                    connection.close()
+                    connection = await self._connect(key, connect_timeout)
+                    response = await asyncio.wait_for(
+                        connection.exchange(method, payload), read_timeout
+                    )
+            except BaseException:
+                connection.close()
+                raise
+
+            if not connection.closed:
+                connection.last_used = time.monotonic()
+                host.idle.append(connection)
+
+        response.url = url
+        response.elapsed = timedelta(seconds=time.monotonic() - started)
+        return response
+
+    async def close(self):
+        hosts, self._hosts = self._hosts, {}
+        for host in hosts.values():
+            while host.idle:
+                host.idle.pop().close()
+
+    def stats(self) -> dict:
+        return {
+            "opened": self._opened,
+            "reused": self._reused,
+            "waited": self._waited,
+            "hosts": {
+                f"{key[0]}://{key[1]}:{key[2]}": {"idle": len(host.idle)}
+                for key, host in self._hosts.items()
+            },
+        }
+
+
+_IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class _Stale(asyncio.IncompleteReadError):
+    """Connection closed by the server before any byte of the answer."""
+
+
+class _AsyncHost(object):
+    __slots__ = ("slots", "idle")
+
+    def __init__(self, pool_size):
+        self.slots = asyncio.Semaphore(pool_size)
+        self.idle = []
+
+
+class _AsyncConnection(object):
+    __slots__ = ("reader", "writer", "last_used", "closed")
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.last_used = time.monotonic()
+        self.closed = False
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.writer.close()
+
+    async def exchange(self, method, payload) -> Response:
+        self.writer.write(payload)
+        await self.writer.drain()
+
+        try:
+            status_line = await self.reader.readuntil(b"\r\n")
+        except asyncio.IncompleteReadError as exp:
+            if exp.partial:
+                raise
+            raise _Stale(exp.partial, exp.expected) from None
+        fields = status_line.decode("latin1").strip().split(" ", 2)
+        version, status = fields[0], fields[1]
+        reason = fields[2] if len(fields) > 2 else ""
+
+        headers = {}
+        while True:
+            line = await self.reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        status_code = int(status)
+        keep_alive = headers.get("connection", "").lower() != "close" and (
+            version.upper() == "HTTP/1.1"
+            or headers.get("connection", "").lower() == "keep-alive"
+        )
+
+        if method == "HEAD" or status_code in (204, 304) or status_code < 200:
+            content = b""
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if size == 0:
+                    while await self.reader.readuntil(b"\r\n") != b"\r\n":
+                        pass
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readexactly(2)
+            content = b"".join(chunks)
+        elif "content-length" in headers:
+            content = await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            content = await self.reader.read()
+            keep_alive = False
+
+        if not keep_alive:
+            self.close()
+
+        return Response(status_code, content, headers, reason=reason)
+
+
+_default_async_pool = AsyncConnectionPool()
+
+
+def get_default_async_pool() -> Transport:
+    return _default_async_pool
+
+
+def set_default_async_pool(pool: Transport) -> Transport:
+    global _default_async_pool
+
+    if not isinstance(pool, Transport):
+        raise ValueError("value 'pool' must be type of 'Transport'")
+
+    _default_async_pool = pool
+    return pool
+
+
+class AsyncBasePayment(BasePayment):
+    """
+    Asyncio counterpart of `BasePayment`: `post` and `get` are coroutines
+    served by a shared `AsyncConnectionPool`, or by any `Transport` set as
+    `async_pool` (a sync one, such as `FakeTransport`, runs in the loop's
+    executor).
+    """
+
+    _async_pool = None
+
+    @property
+    def async_pool(self) -> Transport:
+        if self._async_pool is not None:
+            return self._async_pool
+        return get_default_async_pool()
+
+    @async_pool.setter
+    def async_pool(self, value):
+        if value is not None and not isinstance(value, Transport):
+            raise ValueError("value 'async_pool' must be type of 'Transport'")
+        self._async_pool = value
+
+    @async_pool.deleter
+    def async_pool(self):
+        self._async_pool = None
+
+    async def _once(self, key, func, *args):
+        if self._idempotency is None or not key:
+            return await func(*args)
+        return await self._idempotency.run_async(
+            (self.provider, self._username, key),
+            functools.partial(func, *args),
+            self._completed,
+        )
+
+    async def _request(
+        self, method, url, idempotent=False, operation="", reference="", **kwargs
+    ) -> Response:
+        event = await instrumentation.start_async(
+            self.provider, operation or method, method, url, kwargs, reference
+        )
+        response = await self._send(method, url, idempotent, **kwargs)
+        instrumentation.finish(event, response)
+        return response
+
+    async def _send(self, method, url, idempotent=False, **kwargs) -> Response:
+        policy = self.policy
+        kwargs.setdefault("timeout", policy.timeout)
+        attempts = policy.attempts(idempotent)
+
+        for attempt in range(attempts):
+            if attempt:
+                await asyncio.sleep(policy.backoff(attempt - 1))
+
+            # see `BasePayment._send`, circuit before the rate limit
+            if not policy.circuit.allow():
+                message = f"circuit open for provider '{self.provider}'"
+                return Response(503, message.encode("utf-8"), url=url)
+
+            try:
+                wait = await rate_limits.reserve_async(self.provider, self._username)
+                if wait:
+                    await asyncio.sleep(wait)
+            except BaseException:
+                policy.circuit.release()
+                raise
+            if wait is None:
+                policy.circuit.release()
+                message = f"rate limit exceeded for provider '{self.provider}'"
+                return Response(429, message.encode("utf-8"), url=url)
+
+            try:
+                pool = self.async_pool
+                if pool.asynchronous:
+                    response = await pool.request(method, url, **kwargs)
+                else:
+                    response = await asyncio.get_running_loop().run_in_executor(
+                        None, functools.partial(pool.request, method, url, **kwargs)
+                    )
+            except Exception as exp:
+                policy.circuit.record_failure()
+                response = Response(500, exp.__str__().encode("utf-8"), url=url)
+                continue
+            except BaseException:
+                # cancelled (asyncio.wait_for...): no outcome to record
+                policy.circuit.release()
+                raise
+
+            if not policy.is_failure(response):
+                policy.circuit.record_success()
+                return response
+            policy.circuit.record_failure()
+
+        return response
+
+    async def post(self, url, idempotent=False, **kwargs) -> Response:
+        return await self._request("POST", url, idempotent, **kwargs)
+
+    async def get(self, url, idempotent=False, **kwargs) -> Response:
+        return await self._request("GET", url, idempotent, **kwargs)
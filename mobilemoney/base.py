@@ -1,9 +1,18 @@
-import requests  # TODO replace with urllib3
+import functools
+import time
+
+from mobilemoney.instrumentation import instrumentation
+from mobilemoney.policy import CircuitBreaker, ProviderPolicy, get_policy
+from mobilemoney.ratelimit import rate_limits
+from mobilemoney.result import PaymentResult
+from mobilemoney.transport import Response, Transport
 
 
 class BasePayment(object):
     """ """
 
+    provider = ""
+
     def __init__(self, phonenumber: str = "", username: str = "", password: str = ""):
         if phonenumber is not None and not isinstance(phonenumber, str):
             raise ValueError("value 'phonenumber' must be type of 'str'")
@@ -17,29 +26,172 @@ class BasePayment(object):
         self._username = username
         self._password = password
         self._phonenumber = phonenumber
+        self._pool = None
+        self._policy = None
+        self._idempotency = None
+        self._keep_raw = False
+
+    @property
+    def pool(self) -> Transport:
+        if self._pool is not None:
+            return self._pool
+        # urllib3 is only loaded by clients going through the default pool
+        from mobilemoney.pool import get_default_pool
+
+        return get_default_pool()
+
+    @pool.setter
+    def pool(self, value):
+        if value is not None and not isinstance(value, Transport):
+            raise ValueError("value 'pool' must be type of 'Transport'")
+        self._pool = value
+
+    @pool.deleter
+    def pool(self):
+        self._pool = None
+
+    @property
+    def policy(self) -> ProviderPolicy:
+        return self._policy if self._policy is not None else get_policy(self.provider)
+
+    @policy.setter
+    def policy(self, value):
+        if value is not None and not isinstance(value, ProviderPolicy):
+            raise ValueError("value 'policy' must be type of 'ProviderPolicy'")
+        self._policy = value
+
+    @policy.deleter
+    def policy(self):
+        self._policy = None
 
-    def post(self, url, **kwargs) -> requests.Response:
-        try:
-            response = requests.post(url, **kwargs)
-        except Exception as exp:
-            response = requests.Response()
-            response.status_code = 500
-            response.text = exp.__str__()
-            response.content = bytes(exp.__str__())
-            response.url = url
+    @property
+    def circuit(self) -> CircuitBreaker:
+        return self.policy.circuit
+
+    @property
+    def idempotency(self):
+        return self._idempotency
+
+    @idempotency.setter
+    def idempotency(self, value):
+        from mobilemoney.idempotency import IdempotencyCache
+
+        if value is not None and not isinstance(value, IdempotencyCache):
+            raise ValueError("value 'idempotency' must be type of 'IdempotencyCache'")
+        self._idempotency = value
+
+    @idempotency.deleter
+    def idempotency(self):
+        self._idempotency = None
+
+    @property
+    def keep_raw(self) -> bool:
+        return self._keep_raw
+
+    @keep_raw.setter
+    def keep_raw(self, value):
+        if not isinstance(value, bool):
+            raise ValueError("value 'keep_raw' must be type of 'bool'")
+        self._keep_raw = value
+
+    def _payment_result(
+        self, response, status, message, trans_id, success, data=None
+    ) -> PaymentResult:
+        return PaymentResult(
+            self.provider,
+            status,
+            message,
+            trans_id,
+            success,
+            response.elapsed.total_seconds(),
+            response.status_code,
+            data,
+            response.content if self._keep_raw else None,
+        )
+
+    def _completed(self, result) -> bool:
+        """Whether `result` is a final answer that may be replayed for its key."""
+        return True
+
+    def _once(self, key, func, *args):
+        """
+        `func(*args)` through the idempotency cache under `key`: concurrent
+        calls with the same key share one request and a completed result is
+        replayed. Runs `func` directly without a cache or a key.
+        """
+        if self._idempotency is None or not key:
+            return func(*args)
+        return self._idempotency.run(
+            (self.provider, self._username, key),
+            functools.partial(func, *args),
+            self._completed,
+        )
+
+    def _error_response(self, url, status_code, message) -> Response:
+        return Response(status_code, message.encode("utf-8"), url=url)
+
+    def _request(
+        self, method, url, idempotent=False, operation="", reference="", **kwargs
+    ) -> Response:
+        event = instrumentation.start(
+            self.provider, operation or method, method, url, kwargs, reference
+        )
+        response = self._send(method, url, idempotent, **kwargs)
+        instrumentation.finish(event, response)
         return response
 
-    def get(self, url, **kwargs) -> requests.Response:
-        try:
-            response = requests.get(url, **kwargs)
-        except Exception as exp:
-            response.status_code = 500
-            response.text = exp.__str__()
-            response.content = bytes(exp.__str__())
-            response.url = url
+    def _send(self, method, url, idempotent=False, **kwargs) -> Response:
+        policy = self.policy
+        kwargs.setdefault("timeout", policy.timeout)
+        attempts = policy.attempts(idempotent)
+
+        for attempt in range(attempts):
+            if attempt:
+                time.sleep(policy.backoff(attempt - 1))
+
+            # an open circuit fails fast without taking a rate limit token;
+            # a refused token gives back the half-open trial slot
+            if not policy.circuit.allow():
+                return self._error_response(
+                    url, 503, f"circuit open for provider '{self.provider}'"
+                )
+
+            try:
+                wait = rate_limits.reserve(self.provider, self._username)
+                if wait:
+                    time.sleep(wait)
+            except BaseException:
+                policy.circuit.release()
+                raise
+            if wait is None:
+                policy.circuit.release()
+                return self._error_response(
+                    url, 429, f"rate limit exceeded for provider '{self.provider}'"
+                )
+
+            try:
+                response = self.pool.request(method, url, **kwargs)
+            except Exception as exp:
+                policy.circuit.record_failure()
+                response = self._error_response(url, 500, exp.__str__())
+                continue
+            except BaseException:
+                policy.circuit.release()
+                raise
+
+            if not policy.is_failure(response):
+                policy.circuit.record_success()
+                return response
+            policy.circuit.record_failure()
 
         return response
 
+    def post(self, url, idempotent=False, **kwargs) -> Response:
+        return self._request("POST", url, idempotent, **kwargs)
+
+    def get(self, url, idempotent=False, **kwargs) -> Response:
+        return self._request("GET", url, idempotent, **kwargs)
+
     @property
     def phonenumber(self):
         return self._phonenumber
@@ -0,0 +1,168 @@
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from mobilemoney.base import BasePayment
+
+
+class BatchItem(object):
+    """
+    One queued payment operation: `client.<method>(*args, **kwargs)`.
+    `key` is free for the caller (order id, row number, ...) and is carried
+    over to the matching `BatchResult`.
+    """
+
+    __slots__ = ("client", "method", "args", "kwargs", "key")
+
+    def __init__(self, client, *args, method="validate_payment", key=None, **kwargs):
+        if not isinstance(client, BasePayment):
+            raise ValueError("value 'client' must be type of 'BasePayment'")
+
+        if not callable(getattr(client, method, None)):
+            raise ValueError(f"'{type(client).__name__}' has no method '{method}'")
+
+        self.client = client
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+
+    @property
+    def provider(self):
+        return self.client.provider
+
+
+class BatchResult(object):
+    __slots__ = ("item", "result", "error", "elapsed")
+
+    def __init__(self, item, result=None, error=None, elapsed=0.0):
+        self.item = item
+        self.result = result
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def key(self):
+        return self.item.key
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def _execute(item):
+    started = time.monotonic()
+    try:
+        result = getattr(item.client, item.method)(*item.args, **item.kwargs)
+    except Exception as exp:
+        return BatchResult(item, error=exp, elapsed=time.monotonic() - started)
+    return BatchResult(item, result, elapsed=time.monotonic() - started)
+
+
+class BatchValidator(object):
+    """
+    Run many payment operations through a thread pool.
+
+    `limits` caps the number of concurrent calls per provider
+    (e.g. `{"moovmoney": 4}`), providers without a limit may use every
+    worker. Items are pulled lazily from the input iterable so memory stays
+    bounded, and results are yielded in completion order. An exception raised
+    by one item is stored in its `BatchResult.error` and does not stop the
+    batch.
+    """
+
+    def __init__(self, max_workers: int = 16, limits: dict = None):
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise ValueError("value 'max_workers' must be a positive 'int'")
+
+        limits = dict(limits or {})
+        for provider, limit in limits.items():
+            if not isinstance(limit, int) or limit < 1:
+                raise ValueError(f"limit for '{provider}' must be a positive 'int'")
+
+        self._max_workers = max_workers
+        self._limits = limits
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="mobilemoney-batch"
+        )
+
+    @property
+    def max_workers(self):
+        return self._max_workers
+
+    @property
+    def limits(self):
+        return dict(self._limits)
+
+    def run(self, items):
+        items = iter(items)
+        backlog_size = self._max_workers * 4
+        exhausted = False
+        parked = {}
+        parked_count = 0
+        in_flight = {}
+        futures = {}
+
+        def can_start(provider):
+            limit = self._limits.get(provider, self._max_workers)
+            return in_flight.get(provider, 0) < limit
+
+        def start(item):
+            in_flight[item.provider] = in_flight.get(item.provider, 0) + 1
+            futures[self._executor.submit(_execute, item)] = item.provider
+
+        def fill():
+            nonlocal exhausted, parked_count
+
+            for provider, queue in parked.items():
+                while queue and can_start(provider):
+                    start(queue.popleft())
+                    parked_count -= 1
+
+            while not exhausted and len(futures) < self._max_workers:
+                if parked_count >= backlog_size:
+                    break
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+
+                if not isinstance(item, BatchItem):
+                    raise ValueError("batch items must be type of 'BatchItem'")
+
+                if can_start(item.provider):
+                    start(item)
+                else:
+                    parked.setdefault(item.provider, deque()).append(item)
+                    parked_count += 1
+
+        try:
+            fill()
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight[futures.pop(future)] -= 1
+                    yield future.result()
+                fill()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+
+def validate_payments(items, max_workers: int = 16, limits: dict = None):
+    """
+    Validate an iterable of `BatchItem` and yield a `BatchResult` for each one
+    as soon as it completes.
+    """
+    with BatchValidator(max_workers, limits) as validator:
+        yield from validator.run(items)
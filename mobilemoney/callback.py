@@ -0,0 +1,276 @@
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qsl
+from wsgiref.simple_server import WSGIServer, make_server
+
+from mobilemoney.ligdicash import GenericPaymentWithRedirect
+from mobilemoney.polling import COMPLETED, NOT_COMPLETED, PollResult
+
+MAX_BODY_SIZE = 64 * 1024
+
+
+class CallbackError(ValueError):
+    pass
+
+
+def parse_callback(body: bytes, content_type: str = "") -> dict:
+    """
+    Decode a Ligdicash callback body (JSON or form encoded) and check that it
+    carries an invoice `token`.
+    """
+    if len(body) > MAX_BODY_SIZE:
+        raise CallbackError("callback body too large")
+
+    try:
+        if "application/x-www-form-urlencoded" in content_type:
+            payload = dict(parse_qsl(body.decode("utf-8")))
+        else:
+            payload = json.loads(body)
+    except ValueError as exp:
+        raise CallbackError(f"invalid callback body: {exp}")
+
+    if not isinstance(payload, dict):
+        raise CallbackError("callback body must be an object")
+
+    token = payload.get("token")
+    if not isinstance(token, str) or not token:
+        raise CallbackError("callback has no invoice 'token'")
+
+    custom_data = payload.get("custom_data")
+    if not payload.get("transaction_id") and isinstance(custom_data, dict):
+        payload["transaction_id"] = custom_data.get("transaction_id")
+
+    return payload
+
+
+class CallbackReceiver(object):
+    """
+    Receive Ligdicash `callback_url` notifications.
+
+    Usable as a WSGI application (the instance itself), an ASGI application
+    (`receiver.asgi`) or directly through `handle()`. Deliveries are
+    deduplicated by token and transaction id over the last `max_entries`
+    keys. Code waiting on `wait(token)` / `wait_async(token)` is resolved
+    with a `PollResult` as soon as the callback arrives.
+
+    Callbacks are not signed, anyone reaching the endpoint can post one: the
+    final status is confirmed once with `client.verify_token()`. Taking the
+    `status` of the payload as it is requires `trust_payload=True` (tests,
+    endpoint only reachable by the gateway).
+    """
+
+    def __init__(
+        self,
+        client: GenericPaymentWithRedirect = None,
+        max_entries: int = 10000,
+        verify_ssl=True,
+        trust_payload: bool = False,
+    ):
+        if client is None and not trust_payload:
+            raise ValueError(
+                "value 'client' is required to confirm callbacks, "
+                "or pass 'trust_payload=True'"
+            )
+
+        if client is not None and not isinstance(client, GenericPaymentWithRedirect):
+            raise ValueError(
+                "value 'client' must be type of 'GenericPaymentWithRedirect'"
+            )
+
+        if not isinstance(max_entries, int) or max_entries < 1:
+            raise ValueError("value 'max_entries' must be a positive 'int'")
+
+        self._client = client
+        self._max_entries = max_entries
+        self._verify_ssl = verify_ssl
+        self._seen = OrderedDict()
+        self._waiters = {}
+        self._lock = threading.Lock()
+
+    def _remember(self, keys, result):
+        for key in keys:
+            self._seen[key] = result
+            self._seen.move_to_end(key)
+        while len(self._seen) > self._max_entries:
+            self._seen.popitem(last=False)
+
+    def _lookup(self, keys):
+        for key in keys:
+            if key in self._seen:
+                return self._seen[key]
+        return None
+
+    def _status(self, payload):
+        if self._client is not None:
+            completed, response = self._client.verify_token(
+                payload["token"], self._verify_ssl
+            )
+        else:
+            status = payload.get("status")
+            completed = {COMPLETED: True, NOT_COMPLETED: False}.get(status)
+            response = payload
+
+        if completed is None:
+            return None, response
+        return (COMPLETED if completed else NOT_COMPLETED), response
+
+    def handle(self, body: bytes, content_type: str = "") -> tuple:
+        """
+        Process one callback delivery and return `(http_status, reply)`.
+        """
+        try:
+            payload = parse_callback(body, content_type)
+        except CallbackError as exp:
+            return 400, {"status": "error", "message": str(exp)}
+
+        token = payload["token"]
+        keys = [("token", token)]
+        if payload.get("transaction_id"):
+            keys.append(("transaction_id", str(payload["transaction_id"])))
+
+        with self._lock:
+            if self._lookup(keys) is not None:
+                return 200, {"status": "duplicate"}
+
+        status, response = self._status(payload)
+        if status is None:
+            # still pending: do not remember it so a later delivery is processed
+            return 202, {"status": "pending"}
+
+        result = PollResult(token, status, response)
+        with self._lock:
+            if self._lookup(keys) is not None:
+                return 200, {"status": "duplicate"}
+            self._remember(keys, result)
+            waiters = self._waiters.pop(token, [])
+
+        for future in waiters:
+            if not future.done():
+                future.set_result(result)
+        return 200, {"status": "ok"}
+
+    def _waiter(self, token: str) -> Future:
+        """
+        Future resolved with the `PollResult` of `token`, immediately if its
+        callback was already received.
+        """
+        future = Future()
+        with self._lock:
+            result = self._seen.get(("token", token))
+            if result is None:
+                self._waiters.setdefault(token, []).append(future)
+                return future
+        future.set_result(result)
+        return future
+
+    def _discard(self, token, future):
+        with self._lock:
+            waiters = self._waiters.get(token)
+            if waiters and future in waiters:
+                waiters.remove(future)
+                if not waiters:
+                    del self._waiters[token]
+
+    def wait(self, token: str, timeout: float = None) -> PollResult:
+        """
+        Block until the callback of `token` is received and return its
+        `PollResult`. Raises `TimeoutError` after `timeout` seconds.
+        """
+        future = self._waiter(token)
+        try:
+            return future.result(timeout)
+        finally:
+            # a callback that never comes must not leave its waiter behind
+            self._discard(token, future)
+
+    async def wait_async(self, token: str, timeout: float = None) -> PollResult:
+        future = self._waiter(token)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        finally:
+            self._discard(token, future)
+
+    def __call__(self, environ, start_response):
+        if environ.get("REQUEST_METHOD") != "POST":
+            status, reply = 405, {"status": "error", "message": "method not allowed"}
+        else:
+            try:
+                length = int(environ.get("CONTENT_LENGTH") or 0)
+            except ValueError:
+                length = 0
+            if length > MAX_BODY_SIZE:
+                status, reply = 400, {"status": "error", "message": "body too large"}
+            else:
+                body = environ["wsgi.input"].read(length) if length else b""
+                status, reply = self.handle(body, environ.get("CONTENT_TYPE", ""))
+
+        content = json.dumps(reply).encode("utf-8")
+        start_response(
+            f"{status} {_REASONS[status]}",
+            [
+                ("Content-Type", "application/json"),
+                ("Content-Length", str(len(content))),
+            ],
+        )
+        return [content]
+
+    async def asgi(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+
+        if scope["method"] != "POST":
+            status, reply = 405, {"status": "error", "message": "method not allowed"}
+        else:
+            chunks, size, more = [], 0, True
+            while more and size <= MAX_BODY_SIZE:
+                message = await receive()
+                chunks.append(message.get("body", b""))
+                size += len(chunks[-1])
+                more = message.get("more_body", False)
+
+            content_type = ""
+            for name, value in scope.get("headers", []):
+                if name.lower() == b"content-type":
+                    content_type = value.decode("latin1")
+
+            loop = asyncio.get_running_loop()
+            status, reply = await loop.run_in_executor(
+                None, self.handle, b"".join(chunks), content_type
+            )
+
+        content = json.dumps(reply).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(content)).encode("ascii")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": content})
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+_REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    405: "Method Not Allowed",
+}
+
+
+def serve(receiver: CallbackReceiver, host: str = "0.0.0.0", port: int = 8000):
+    """
+    Run `receiver` on a standalone threaded WSGI server (blocking).
+    """
+    with make_server(host, port, receiver, _ThreadingWSGIServer) as server:
+        server.serve_forever()
@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+_HIT = "hit"
+_WAIT = "wait"
+_LEAD = "lead"
+
+
+class IdempotencyCache(object):
+    """
+    Single-flight and result cache for payment calls.
+
+    The first call for a key runs, concurrent calls with the same key wait
+    for its outcome instead of reaching the operator a second time, and the
+    result is then served for `ttl` seconds to later calls with that key.
+    Only results accepted by the `cacheable` predicate are kept, so that a
+    transport error does not stick to the key. At most `maxsize` results
+    are kept, least recently used first out.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 86400.0):
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise ValueError("value 'maxsize' must be a positive 'int'")
+
+        if ttl <= 0:
+            raise ValueError("value 'ttl' must be positive")
+
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._results = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._coalesced = 0
+        self._misses = 0
+
+    @property
+    def maxsize(self):
+        return self._maxsize
+
+    @property
+    def ttl(self):
+        return self._ttl
+
+    def _claim(self, key):
+        """`(_HIT, result)`, `(_WAIT, future)` or `(_LEAD, future)`."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._results.move_to_end(key)
+                    self._hits += 1
+                    return _HIT, entry[0]
+                del self._results[key]
+
+            future = self._inflight.get(key)
+            if future is not None:
+                self._coalesced += 1
+                return _WAIT, future
+
+            self._misses += 1
+            future = self._inflight[key] = Future()
+            return _LEAD, future
+
+    def _settle(self, key, future, result=None, error=None, cacheable=None):
+        with self._lock:
+            del self._inflight[key]
+            if error is None and (cacheable is None or cacheable(result)):
+                self._results[key] = (result, time.monotonic() + self._ttl)
+                self._results.move_to_end(key)
+                while len(self._results) > self._maxsize:
+                    self._results.popitem(last=False)
+
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def run(self, key, call, cacheable=None):
+        """Result of `call()`, run at most once at a time for `key`."""
+        state, value = self._claim(key)
+        if state == _HIT:
+            return value
+        if state == _WAIT:
+            return value.result()
+
+        try:
+            result = call()
+        except BaseException as exp:
+            self._settle(key, value, error=exp)
+            raise
+        self._settle(key, value, result, cacheable=cacheable)
+        return result
+
+    async def run_async(self, key, call, cacheable=None):
+        """Like `run()` for a `call` returning an awaitable."""
+        state, value = self._claim(key)
+        if state == _HIT:
+            return value
+        if state == _WAIT:
+            import asyncio
+
+            return await asyncio.wrap_future(value)
+
+        try:
+            result = await call()
+        except BaseException as exp:
+            self._settle(key, value, error=exp)
+            raise
+        self._settle(key, value, result, cacheable=cacheable)
+        return result
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return default
+            return entry[0]
+
+    def forget(self, key):
+        with self._lock:
+            self._results.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "coalesced": self._coalesced,
+                "misses": self._misses,
+                "cached": len(self._results),
+                "inflight": len(self._inflight),
+            }
+
+    def __len__(self):
+        return len(self._results)
@@ -0,0 +1,280 @@
+import math
+import threading
+import time
+
+# log-spaced latency buckets: ~5% relative error, from 100us to ~30min
+_BUCKET_MIN = 1e-4
+_BUCKET_GROWTH = 1.05
+_BUCKET_COUNT = 350
+_LOG_GROWTH = math.log(_BUCKET_GROWTH)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class RequestEvent(object):
+    """
+    One provider call as seen by the hooks. Pre-request hooks get it before
+    the call (`status`, `elapsed`, `response_bytes` and `response` still
+    unset), post request hooks once it is finished. `extra` is free for
+    hooks to share state between both phases.
+    """
+
+    __slots__ = (
+        "provider",
+        "operation",
+        "method",
+        "url",
+        "reference",
+        "request_bytes",
+        "response_bytes",
+        "status",
+        "error",
+        "started",
+        "elapsed",
+        "response",
+        "extra",
+    )
+
+    def __init__(self, provider, operation, method, url, reference="", request_bytes=0):
+        self.provider = provider
+        self.operation = operation
+        self.method = method
+        self.url = url
+        self.reference = reference
+        self.request_bytes = request_bytes
+        self.response_bytes = 0
+        self.status = None
+        self.error = None
+        self.started = time.monotonic()
+        self.elapsed = None
+        self.response = None
+        self.extra = {}
+
+    @property
+    def failed(self):
+        return self.error is not None or (self.status or 0) >= 500
+
+
+class Histogram(object):
+    """Latency histogram with log-spaced buckets (about 5% precision)."""
+
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * _BUCKET_COUNT
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        if value <= _BUCKET_MIN:
+            index = 0
+        else:
+            index = min(
+                int(math.log(value / _BUCKET_MIN) / _LOG_GROWTH) + 1, _BUCKET_COUNT - 1
+            )
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return _BUCKET_MIN * _BUCKET_GROWTH**index
+        return _BUCKET_MIN * _BUCKET_GROWTH ** (_BUCKET_COUNT - 1)
+
+
+def _body_size(kwargs) -> int:
+    data = kwargs.get("data")
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return len(data)
+    if isinstance(data, str):
+        return len(data.encode("utf-8"))
+    return 0
+
+
+class Instrumentation(object):
+    """
+    Request hooks and in-process metrics for every provider call.
+
+    Disabled by default: `start()` then returns None and nothing else runs.
+    Once enabled, each call feeds a latency histogram and error counters per
+    (provider, operation), exported by `to_dict()` and `to_prometheus()`.
+
+    Errors raised by hooks are logged and ignored. A pre-request hook may
+    instead return a `concurrent.futures.Future` that the call waits for
+    (awaits, in async clients): an exception set on it refuses the call.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._pre_hooks = []
+        self._post_hooks = []
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._requests = {}
+        self._errors = {}
+        self._bytes = {}
+
+    def add_hook(self, pre=None, post=None):
+        if pre is not None:
+            self._pre_hooks.append(pre)
+        if post is not None:
+            self._post_hooks.append(post)
+
+    def remove_hook(self, hook):
+        for hooks in (self._pre_hooks, self._post_hooks):
+            if hook in hooks:
+                hooks.remove(hook)
+
+    def _run_hooks(self, hooks, event) -> list:
+        """Run `hooks`, return the futures they asked the call to wait for."""
+        # only loaded once instrumentation is enabled
+        from concurrent.futures import Future
+
+        futures = []
+        for hook in hooks:
+            try:
+                result = hook(event)
+            except Exception:
+                import logging
+
+                logging.getLogger(__name__).exception(
+                    "instrumentation hook %r failed", hook
+                )
+                continue
+            if isinstance(result, Future):
+                futures.append(result)
+        return futures
+
+    def _start(self, provider, operation, method, url, kwargs, reference):
+        event = RequestEvent(
+            provider, operation, method, url, reference, _body_size(kwargs)
+        )
+        return event, self._run_hooks(self._pre_hooks, event)
+
+    def start(self, provider, operation, method, url, kwargs, reference=""):
+        if not self.enabled:
+            return None
+
+        event, futures = self._start(
+            provider, operation, method, url, kwargs, reference
+        )
+        for future in futures:
+            future.result()
+        return event
+
+    async def start_async(self, provider, operation, method, url, kwargs, reference=""):
+        """`start()` for async clients, waiting on hooks without blocking."""
+        if not self.enabled:
+            return None
+
+        import asyncio
+
+        event, futures = self._start(
+            provider, operation, method, url, kwargs, reference
+        )
+        for future in futures:
+            await asyncio.wrap_future(future)
+        return event
+
+    def finish(self, event, response=None, error=None):
+        if event is None:
+            return
+
+        event.elapsed = time.monotonic() - event.started
+        event.error = error
+        if response is not None:
+            event.response = response
+            event.status = response.status_code
+            event.response_bytes = len(response.content or b"")
+            if not event.request_bytes:
+                request = getattr(response, "request", None)
+                body = getattr(request, "body", None)
+                event.request_bytes = len(body) if body else 0
+
+        key = (event.provider, event.operation)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(event.elapsed)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            sent, received = self._bytes.get(key, (0, 0))
+            self._bytes[key] = (
+                sent + event.request_bytes,
+                received + event.response_bytes,
+            )
+            if event.failed:
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+        self._run_hooks(self._post_hooks, event)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._requests.clear()
+            self._errors.clear()
+            self._bytes.clear()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            metrics = {}
+            for key, histogram in self._histograms.items():
+                provider, operation = key
+                sent, received = self._bytes[key]
+                metrics.setdefault(provider, {})[operation] = {
+                    "requests": self._requests[key],
+                    "errors": self._errors.get(key, 0),
+                    "request_bytes": sent,
+                    "response_bytes": received,
+                    "latency_sum": histogram.sum,
+                    **{f"p{int(q * 100)}": histogram.percentile(q) for q in QUANTILES},
+                }
+            return metrics
+
+    def to_prometheus(self, prefix: str = "mobilemoney") -> str:
+        lines = [
+            f"# TYPE {prefix}_request_duration_seconds summary",
+        ]
+        counters = []
+        with self._lock:
+            for key, histogram in sorted(self._histograms.items()):
+                labels = f'provider="{key[0]}",operation="{key[1]}"'
+                for q in QUANTILES:
+                    lines.append(
+                        f'{prefix}_request_duration_seconds{{{labels},quantile="{q}"}} '
+                        f"{histogram.percentile(q):.6f}"
+                    )
+                lines.append(
+                    f"{prefix}_request_duration_seconds_sum{{{labels}}} {histogram.sum:.6f}"
+                )
+                lines.append(
+                    f"{prefix}_request_duration_seconds_count{{{labels}}} {histogram.count}"
+                )
+                sent, received = self._bytes[key]
+                counters.append((labels, self._errors.get(key, 0), sent, received))
+
+        lines.append(f"# TYPE {prefix}_request_errors_total counter")
+        lines.extend(
+            f"{prefix}_request_errors_total{{{labels}}} {errors}"
+            for labels, errors, _, _ in counters
+        )
+        lines.append(f"# TYPE {prefix}_request_bytes_total counter")
+        lines.extend(
+            f"{prefix}_request_bytes_total{{{labels}}} {sent}"
+            for labels, _, sent, _ in counters
+        )
+        lines.append(f"# TYPE {prefix}_response_bytes_total counter")
+        lines.extend(
+            f"{prefix}_response_bytes_total{{{labels}}} {received}"
+            for labels, _, _, received in counters
+        )
+        return "\n".join(lines) + "\n"
+
+
+instrumentation = Instrumentation()
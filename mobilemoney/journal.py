@@ -0,0 +1,311 @@
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from mobilemoney.instrumentation import instrumentation as default_instrumentation
+from mobilemoney.utils import references
+
+SENT = "sent"
+DONE = "done"
+RESOLVED = "resolved"
+
+_COLUMNS = (
+    "entry",
+    "phase",
+    "provider",
+    "operation",
+    "method",
+    "url",
+    "reference",
+    "status",
+    "error",
+    "elapsed",
+    "body",
+    "at",
+)
+
+
+class PaymentJournal(object):
+    """
+    Append-only SQLite (WAL) journal of every provider call.
+
+    Once attached to the instrumentation, each call appends a `sent` record
+    before going out and a `done` record (HTTP status, error, response body
+    up to `max_body` bytes) when it returns. Records are buffered and
+    written by a background thread in one transaction per batch, at most
+    `flush_interval` seconds apart, so the hot path only appends to a list.
+    With `durable=True` the call also waits for its `sent` record to be on
+    disk (without blocking the event loop of async clients): concurrent
+    calls then share one fsync (group commit), and a failed write raises
+    its `sqlite3.Error` instead of letting the call go out.
+
+    After a crash, `unfinished()` lists the calls sent without a `done`
+    record, so they can be checked with the provider and marked with
+    `resolve()`. Request bodies and credentials are never written, only
+    provider, operation, url and reference.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 0.05,
+        max_batch: int = 1000,
+        durable: bool = False,
+        max_body: int = 4096,
+        synchronous: str = "FULL",
+    ):
+        if not isinstance(path, str):
+            raise ValueError("value 'path' must be type of 'str'")
+
+        if flush_interval <= 0:
+            raise ValueError("value 'flush_interval' must be positive")
+
+        if not isinstance(max_batch, int) or max_batch < 1:
+            raise ValueError("value 'max_batch' must be a positive 'int'")
+
+        if synchronous not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            raise ValueError(
+                "value 'synchronous' must be one of 'OFF,NORMAL,FULL,EXTRA'"
+            )
+
+        self._path = path
+        self._flush_interval = flush_interval
+        self._max_batch = max_batch
+        self._durable = durable
+        self._max_body = max_body
+        self._synchronous = synchronous
+        self._condition = threading.Condition()
+        self._buffer = []
+        # resolved once the rows of the current buffer are written
+        self._batch = Future()
+        self._urgent = False
+        self._closed = False
+        self._error = None
+        self._instrumentation = None
+        self._was_enabled = False
+
+        connection = self._connect()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS journal ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, entry TEXT NOT NULL, "
+            "phase TEXT NOT NULL, provider TEXT, operation TEXT, method TEXT, "
+            "url TEXT, reference TEXT, status INTEGER, error TEXT, elapsed REAL, "
+            "body BLOB, at REAL NOT NULL)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS journal_entry ON journal (entry, phase)"
+        )
+        connection.commit()
+        connection.close()
+
+        self._writer = threading.Thread(
+            target=self._write_loop, name="mobilemoney-journal", daemon=True
+        )
+        self._writer.start()
+
+    @property
+    def path(self):
+        return self._path
+
+    def _connect(self):
+        connection = sqlite3.connect(self._path, timeout=30.0)
+        connection.execute(f"PRAGMA synchronous={self._synchronous}")
+        return connection
+
+    def _append(self, row, urgent=False) -> Future:
+        """Buffer `row`, return the future of the batch it will be written in."""
+        with self._condition:
+            if self._closed:
+                return None
+            self._buffer.append(row)
+            if urgent or len(self._buffer) >= self._max_batch:
+                self._urgent = True
+                self._condition.notify_all()
+            return self._batch
+
+    def _write_loop(self):
+        connection = self._connect()
+        try:
+            while True:
+                with self._condition:
+                    if not self._urgent and not self._closed:
+                        self._condition.wait(self._flush_interval)
+                    rows, self._buffer = self._buffer, []
+                    batch, self._batch = self._batch, Future()
+                    self._urgent = False
+                    closed = self._closed
+
+                try:
+                    if rows:
+                        with connection:
+                            connection.executemany(
+                                f"INSERT INTO journal ({','.join(_COLUMNS)}) "
+                                f"VALUES ({','.join('?' * len(_COLUMNS))})",
+                                rows,
+                            )
+                except sqlite3.Error as exp:
+                    self._error = exp
+                    batch.set_exception(exp)
+                else:
+                    batch.set_result(len(rows))
+                if closed:
+                    break
+        finally:
+            connection.close()
+
+    def _before(self, event):
+        entry = event.extra["journal_entry"] = references.next()
+        batch = self._append(
+            (
+                entry,
+                SENT,
+                event.provider,
+                event.operation,
+                event.method,
+                event.url,
+                event.reference,
+                None,
+                None,
+                None,
+                None,
+                time.time(),
+            ),
+            urgent=self._durable,
+        )
+        if self._durable:
+            # waited for (or awaited) by the instrumentation before the call
+            return batch
+        return None
+
+    def _after(self, event):
+        entry = event.extra.get("journal_entry")
+        if entry is None:
+            return
+
+        response = event.response
+        body = getattr(response, "content", None) if response is not None else None
+        self._append(
+            (
+                entry,
+                DONE,
+                event.provider,
+                event.operation,
+                event.method,
+                event.url,
+                event.reference,
+                event.status,
+                None if event.error is None else str(event.error),
+                event.elapsed,
+                body[: self._max_body] if body else None,
+                time.time(),
+            )
+        )
+
+    def attach(self, instrumentation=None):
+        """
+        Record every call seen by `instrumentation`, enabled until `detach()`
+        puts back its previous state.
+        """
+        instrumentation = instrumentation or default_instrumentation
+        self.detach()
+        instrumentation.add_hook(pre=self._before, post=self._after)
+        self._was_enabled = instrumentation.enabled
+        instrumentation.enabled = True
+        self._instrumentation = instrumentation
+        return self
+
+    def detach(self):
+        if self._instrumentation is not None:
+            self._instrumentation.remove_hook(self._before)
+            self._instrumentation.remove_hook(self._after)
+            self._instrumentation.enabled = self._was_enabled
+            self._instrumentation = None
+
+    def flush(self):
+        """Block until every record appended so far is written."""
+        with self._condition:
+            batch = None if self._closed else self._batch
+            self._urgent = True
+            self._condition.notify_all()
+        if batch is not None:
+            # the error is raised below, once
+            batch.exception()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _query(self, sql, params=()):
+        connection = self._connect()
+        connection.row_factory = sqlite3.Row
+        try:
+            return [dict(row) for row in connection.execute(sql, params)]
+        finally:
+            connection.close()
+
+    def unfinished(self, provider: str = None) -> list:
+        """`sent` records without an outcome, oldest first."""
+        sql = (
+            "SELECT * FROM journal AS sent WHERE sent.phase = ? AND NOT EXISTS "
+            "(SELECT 1 FROM journal AS other WHERE other.entry = sent.entry "
+            "AND other.phase IN (?, ?))"
+        )
+        params = [SENT, DONE, RESOLVED]
+        if provider is not None:
+            sql += " AND sent.provider = ?"
+            params.append(provider)
+        return self._query(sql + " ORDER BY sent.id", params)
+
+    def entries(self, reference: str) -> list:
+        """Every record for `reference`, oldest first."""
+        return self._query(
+            "SELECT * FROM journal WHERE reference = ? ORDER BY id", (reference,)
+        )
+
+    def resolve(self, entry: dict, status: int = None, body: bytes = None):
+        """Close an `unfinished()` entry once checked with the provider."""
+        self._append(
+            (
+                entry["entry"],
+                RESOLVED,
+                entry["provider"],
+                entry["operation"],
+                entry["method"],
+                entry["url"],
+                entry["reference"],
+                status,
+                None,
+                None,
+                body,
+                time.time(),
+            )
+        )
+
+    def recover(self, handler) -> int:
+        """
+        Call `handler(entry)` for each unfinished entry and resolve the ones
+        it returns a truthy value for. Returns the number resolved.
+        """
+        resolved = 0
+        for entry in self.unfinished():
+            if handler(entry):
+                self.resolve(entry)
+                resolved += 1
+        self.flush()
+        return resolved
+
+    def close(self):
+        self.detach()
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._writer.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,37 @@
+from mobilemoney.aio import AsyncBasePayment
+from mobilemoney.ligdicash import (
+    GenericPaymentWithRedirect,
+    ligdicash_prod_url_with_redirect,
+)
+
+
+class AsyncGenericPaymentWithRedirect(AsyncBasePayment, GenericPaymentWithRedirect):
+    async def validate_payment(
+        self, command=None, verify_ssl=True, idempotency_key=None
+    ):
+        self._check_command(command)
+        return await self._once(
+            idempotency_key or self._transaction_id(command),
+            self._validate_payment,
+            command,
+            verify_ssl,
+        )
+
+    async def _validate_payment(self, command, verify_ssl=True):
+        response = await self.post(
+            self._url, verify=verify_ssl, **self._invoice_request(command)
+        )
+        return self._invoice_result(response)
+
+    async def verify_token(self, token, verify_ssl=True):
+        response = await self.get(
+            self._verify_url, verify=verify_ssl, **self._verify_request(token)
+        )
+
+        return self._parse_verify(response, token)
+
+
+class AsyncPayment(AsyncGenericPaymentWithRedirect):
+    def __init__(self, username="", password=""):
+        url = ligdicash_prod_url_with_redirect
+        super().__init__(url, username, password)
@@ -0,0 +1,273 @@
+import bisect
+import hashlib
+import threading
+import time
+
+from mobilemoney.base import BasePayment
+from mobilemoney.result import PaymentResult
+from mobilemoney.router import ProviderHealth
+
+
+def _hash(value: str) -> int:
+    digest = hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def _payment_result(result):
+    """The `PaymentResult` in what a client method returned, if any."""
+    if isinstance(result, PaymentResult):
+        return result
+    if isinstance(result, tuple):
+        for item in result:
+            if isinstance(item, PaymentResult):
+                return item
+    return None
+
+
+class MerchantAccount(object):
+    """
+    One set of merchant credentials in a `MerchantPool`, with its calls in
+    flight, errors and authentication failures.
+    """
+
+    __slots__ = (
+        "client",
+        "name",
+        "weight",
+        "inflight",
+        "errors",
+        "auth_failures",
+        "quarantined_until",
+        "health",
+    )
+
+    def __init__(self, client: BasePayment, name: str, weight: int, alpha: float):
+        self.client = client
+        self.name = name
+        self.weight = weight
+        self.inflight = 0
+        self.errors = 0
+        self.auth_failures = 0
+        self.quarantined_until = 0.0
+        self.health = ProviderHealth(alpha)
+
+    @property
+    def provider(self):
+        return self.client.provider
+
+    def available(self, now: float = None) -> bool:
+        return (now or time.monotonic()) >= self.quarantined_until
+
+
+class MerchantPool(object):
+    """
+    Several merchant accounts per provider, so that throughput is not
+    capped by the operator's per-account limits.
+
+    `call(provider, method, *args, key=...)` runs `method` on one account of
+    `provider`. With a `key` (the customer number for a Moov OTP flow, so
+    that `send_otp` and `validate_payment` land on the same merchant) the
+    account comes from a consistent hash ring, `replicas` points per unit of
+    weight, so adding or removing an account only moves its own share of
+    keys. Without a key, the account with the fewest calls in flight per
+    unit of weight is used.
+
+    An account answering with an authentication failure (HTTP 401/403 by
+    default, see `auth_failure`) is pulled out of rotation for `quarantine`
+    seconds. Rate limits configured per username in `rate_limits` apply to
+    each account separately.
+    """
+
+    def __init__(
+        self,
+        quarantine: float = 300.0,
+        replicas: int = 64,
+        alpha: float = 0.2,
+        auth_failure=None,
+    ):
+        if quarantine <= 0:
+            raise ValueError("value 'quarantine' must be positive")
+
+        if not isinstance(replicas, int) or replicas < 1:
+            raise ValueError("value 'replicas' must be a positive 'int'")
+
+        if auth_failure is not None and not callable(auth_failure):
+            raise ValueError("value 'auth_failure' must be callable")
+
+        self._quarantine = quarantine
+        self._replicas = replicas
+        self._alpha = alpha
+        self._auth_failure = auth_failure or self._unauthorized
+        self._accounts = {}
+        self._rings = {}
+        self._lock = threading.Lock()
+
+    @property
+    def quarantine(self):
+        return self._quarantine
+
+    def add(self, client: BasePayment, name: str = None, weight: int = 1):
+        """
+        Put `client` in rotation for its provider. `name` (the API username
+        by default) must be unique per provider.
+        """
+        if not isinstance(client, BasePayment):
+            raise ValueError("value 'client' must be type of 'BasePayment'")
+
+        if not isinstance(weight, int) or weight < 1:
+            raise ValueError("value 'weight' must be a positive 'int'")
+
+        name = name or client.username
+        with self._lock:
+            accounts = self._accounts.setdefault(client.provider, {})
+            if name in accounts:
+                raise ValueError(
+                    f"account '{name}' already in the pool for '{client.provider}'"
+                )
+            account = accounts[name] = MerchantAccount(
+                client, name, weight, self._alpha
+            )
+            self._build_ring(client.provider)
+        return account
+
+    def remove(self, provider: str, name: str) -> MerchantAccount:
+        with self._lock:
+            account = self._accounts.get(provider, {}).pop(name)
+            self._build_ring(provider)
+        return account
+
+    def accounts(self, provider: str) -> list:
+        with self._lock:
+            return list(self._accounts.get(provider, {}).values())
+
+    def _build_ring(self, provider):
+        points = sorted(
+            (_hash(f"{account.name}#{index}"), account.name)
+            for account in self._accounts[provider].values()
+            for index in range(account.weight * self._replicas)
+        )
+        self._rings[provider] = (
+            [point for point, _ in points],
+            [name for _, name in points],
+        )
+
+    def _by_hash(self, provider, key, now):
+        hashes, names = self._rings[provider]
+        accounts = self._accounts[provider]
+        start = bisect.bisect(hashes, _hash(f"{key}"))
+        # walk the ring past quarantined accounts
+        for offset in range(len(names)):
+            account = accounts[names[(start + offset) % len(names)]]
+            if account.available(now):
+                return account
+        return None
+
+    def _least_loaded(self, provider, now):
+        available = [
+            account
+            for account in self._accounts[provider].values()
+            if account.available(now)
+        ]
+        if not available:
+            return None
+        return min(
+            available,
+            key=lambda account: (
+                account.inflight / account.weight,
+                account.health.error_rate,
+                account.health.calls,
+            ),
+        )
+
+    def select(self, provider: str, key=None) -> MerchantAccount:
+        """Account the next call for `provider` (and `key`) would use."""
+        with self._lock:
+            return self._select(provider, key)
+
+    def _select(self, provider, key):
+        if not self._accounts.get(provider):
+            raise ValueError(f"no merchant account for provider '{provider}'")
+
+        now = time.monotonic()
+        if key is None:
+            account = self._least_loaded(provider, now)
+        else:
+            account = self._by_hash(provider, key, now)
+        if account is None:
+            raise RuntimeError(
+                f"every merchant account for provider '{provider}' is quarantined"
+            )
+        return account
+
+    def _acquire(self, provider, key):
+        with self._lock:
+            account = self._select(provider, key)
+            account.inflight += 1
+        return account, time.monotonic()
+
+    def _unauthorized(self, result: PaymentResult) -> bool:
+        return result.http_status in (401, 403)
+
+    def _release(self, account, started, result=None, error=None):
+        payment = _payment_result(result)
+        failed = error is not None or (
+            payment is not None
+            and (payment.http_status is None or payment.http_status >= 500)
+        )
+        unauthorized = payment is not None and self._auth_failure(payment)
+
+        with self._lock:
+            account.inflight -= 1
+            if failed:
+                account.errors += 1
+            if unauthorized:
+                account.auth_failures += 1
+                account.quarantined_until = time.monotonic() + self._quarantine
+        account.health.observe(time.monotonic() - started, failed or unauthorized)
+
+    def call(self, provider: str, method: str, *args, key=None, **kwargs):
+        """`method(*args, **kwargs)` on an account of `provider`."""
+        account, started = self._acquire(provider, key)
+        try:
+            result = getattr(account.client, method)(*args, **kwargs)
+        except Exception as exp:
+            self._release(account, started, error=exp)
+            raise
+        self._release(account, started, result)
+        return result
+
+    async def call_async(self, provider: str, method: str, *args, key=None, **kwargs):
+        """`call()` for async clients."""
+        account, started = self._acquire(provider, key)
+        try:
+            result = await getattr(account.client, method)(*args, **kwargs)
+        except Exception as exp:
+            self._release(account, started, error=exp)
+            raise
+        self._release(account, started, result)
+        return result
+
+    def release_quarantine(self, provider: str, name: str):
+        """Put a quarantined account back in rotation (new credentials...)."""
+        with self._lock:
+            self._accounts[provider][name].quarantined_until = 0.0
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                provider: {
+                    name: {
+                        "weight": account.weight,
+                        "inflight": account.inflight,
+                        "calls": account.health.calls,
+                        "errors": account.errors,
+                        "auth_failures": account.auth_failures,
+                        "quarantined": max(0.0, account.quarantined_until - now),
+                        "latency": account.health.latency,
+                        "error_rate": account.health.error_rate,
+                    }
+                    for name, account in accounts.items()
+                }
+                for provider, accounts in self._accounts.items()
+            }
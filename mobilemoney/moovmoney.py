@@ -1,6 +1,9 @@
-from requests.auth import HTTPBasicAuth
+from types import MappingProxyType
 
 from mobilemoney.base import BasePayment
+from mobilemoney.otp import OTPSessionStore
+from mobilemoney.transport import basic_auth
+from mobilemoney.utils import JSONTemplate
 
 onatel_dev_url = "https://196.28.245.227/tlcfzc_gw/api/gateway/3pp/transaction/process"
 onatel_prod_url = (
@@ -11,15 +14,45 @@ SEND_OTP_OPTIONS = [
     "process-create-mror-otp",
     "process-mror-resend-otp",
 ]
+COMMIT_OTPPAY = "process-commit-otppay"
+
+_OTP_BODY = JSONTemplate(
+    {
+        "request-id": "",
+        "destination": JSONTemplate.field("destination"),
+        "amount": JSONTemplate.field("amount"),
+        "remarks": "Merchant Payment with OTP",
+        "extended-data": {"module": "MERCHOTPPAY"},
+    }
+)
+_PAYMENT_BODY = JSONTemplate(
+    {
+        "request-id": "",
+        "destination": JSONTemplate.field("destination"),
+        "amount": JSONTemplate.field("amount"),
+        "remarks": JSONTemplate.field("remarks"),
+        "extended-data": {
+            "module": "MERCHOTPPAY",
+            "otp": JSONTemplate.field("otp"),
+            "ext1": "Vous avez payé pour 1",
+            "ext2": "Vous avez payé pour 2",
+            "trans-id": JSONTemplate.field("trans_id"),
+        },
+    }
+)
 
 
 class GenericPayment(BasePayment):
+    provider = "moovmoney"
+
     def __init__(self, url="", username="", password=""):
         super().__init__(None, username, password)
 
         if not isinstance(url, str):
             raise ValueError("value 'url' must be type of 'str'")
         self._url = url
+        self._otp_sessions = None
+        self._headers = None
 
     @property
     def url(self):
@@ -33,6 +66,51 @@ class GenericPayment(BasePayment):
     def url(self):
         del self._url
 
+    @property
+    def otp_sessions(self):
+        return self._otp_sessions
+
+    @otp_sessions.setter
+    def otp_sessions(self, value):
+        if value is not None and not isinstance(value, OTPSessionStore):
+            raise ValueError("value 'otp_sessions' must be type of 'OTPSessionStore'")
+        self._otp_sessions = value
+
+    @otp_sessions.deleter
+    def otp_sessions(self):
+        self._otp_sessions = None
+
+    def _cached_otp(self, customer_phone: str, amount: int, option: str):
+        """Last gateway response when a resend comes too early, else None."""
+        if self._otp_sessions is None or option != SEND_OTP_OPTIONS[1]:
+            return None
+        session = self._otp_sessions.recent(self._username, customer_phone, amount)
+        return session["response"] if session else None
+
+    def _remember_otp(self, customer_phone: str, amount: int, response):
+        if self._otp_sessions is not None:
+            self._otp_sessions.save(self._username, customer_phone, amount, response)
+        return response
+
+    def _forget_otp(self, customer_phone: str, amount: int, response):
+        if self._otp_sessions is not None and response.success:
+            self._otp_sessions.discard(self._username, customer_phone, amount)
+        return response
+
+    def _otp_trans_id(self, customer_phone: str, amount: int, otp_trans_id):
+        if otp_trans_id is not None:
+            return otp_trans_id
+
+        if self._otp_sessions is not None:
+            otp_trans_id = self._otp_sessions.trans_id(
+                self._username, customer_phone, amount
+            )
+        if otp_trans_id is None:
+            raise ValueError(
+                "value 'otp_trans_id' is required: no OTP session for this payment"
+            )
+        return otp_trans_id
+
     def parse_query(
         self,
         customer_phone: str,
@@ -55,33 +133,86 @@ class GenericPayment(BasePayment):
             },
         }
 
-    def _send_otp(self, customer_phone: str, amount: int, verify_ssl=False, option=""):
+    def serialize_query(
+        self,
+        customer_phone: str,
+        customer_otp: str,
+        amount: int,
+        libel: str,
+        otp_trans_id: str,
+    ) -> bytes:
+        """`parse_query` encoded to JSON from a pre-encoded template."""
+        return _PAYMENT_BODY.render(
+            destination=f"226{customer_phone}",
+            amount=f"{amount}",
+            remarks=f"{libel}",
+            otp=f"{customer_otp}",
+            trans_id=f"{otp_trans_id}",
+        )
+
+    def _command_headers(self, command_id: str):
+        """
+        Read-only request headers of `command_id`, Basic auth included, built
+        once per credentials.
+        """
+        key = (self._username, self._password)
+        if self._headers is None or self._headers[0] != key:
+            authorization = basic_auth(key)
+            headers = {
+                command: MappingProxyType(
+                    {
+                        "content-type": "application/json",
+                        "command-id": command,
+                        "authorization": authorization,
+                    }
+                )
+                for command in (*SEND_OTP_OPTIONS, COMMIT_OTPPAY)
+            }
+            self._headers = (key, headers)
+        return self._headers[1][command_id]
+
+    def _otp_request(self, customer_phone: str, amount: int, option=""):
         if option not in SEND_OTP_OPTIONS:
             raise ValueError(
                 f"'option' parameter must be one of '{','.join(SEND_OTP_OPTIONS)}'"
             )
-        data = {
-            "request-id": "",
-            "destination": f"226{customer_phone}",
-            "amount": amount,
-            "remarks": "Merchant Payment with OTP",
-            "extended-data": {"module": "MERCHOTPPAY"},
+
+        return {
+            "headers": self._command_headers(option),
+            "data": _OTP_BODY.render(destination=f"226{customer_phone}", amount=amount),
+            # a resend only asks the gateway to send the same OTP again
+            "idempotent": option == SEND_OTP_OPTIONS[1],
+            "operation": option,
         }
 
-        headers = {
-            "content-type": "application/json",
-            "command-id": option,
+    def _payment_request(
+        self,
+        customer_phone: str,
+        customer_otp: str,
+        amount: int,
+        message: str,
+        otp_trans_id=None,
+    ):
+        otp_trans_id = self._otp_trans_id(customer_phone, amount, otp_trans_id)
+
+        return {
+            "headers": self._command_headers(COMMIT_OTPPAY),
+            "data": self.serialize_query(
+                customer_phone, customer_otp, amount, message, otp_trans_id
+            ),
+            "operation": COMMIT_OTPPAY,
+            "reference": otp_trans_id,
         }
 
-        response = self.post(
-            self._url,
-            headers=headers,
-            json=data,
-            auth=HTTPBasicAuth(self._username, self._password),
-            verify=verify_ssl,
-        )
+    def _send_otp(self, customer_phone: str, amount: int, verify_ssl=False, option=""):
+        cached = self._cached_otp(customer_phone, amount, option)
+        if cached is not None:
+            return cached
 
-        return response.json()
+        request = self._otp_request(customer_phone, amount, option)
+        response = self.post(self._url, verify=verify_ssl, **request)
+
+        return self._remember_otp(customer_phone, amount, self._otp_data(response))
 
     def send_otp(self, customer_phone: str, amount: int, verify_ssl=False):
         return self._send_otp(customer_phone, amount, verify_ssl, SEND_OTP_OPTIONS[0])
@@ -89,39 +220,87 @@ class GenericPayment(BasePayment):
     def resend_otp(self, customer_phone: str, amount: int, verify_ssl=False):
         return self._send_otp(customer_phone, amount, verify_ssl, SEND_OTP_OPTIONS[1])
 
+    def _otp_data(self, response) -> dict:
+        """Decoded OTP answer, plain text errors in the gateway's shape."""
+        try:
+            return response.json()
+        except ValueError:
+            # transport errors and open circuits come back as plain text
+            return {"status": f"{response.status_code}", "message": response.text}
+
+    def _result(self, response):
+        try:
+            data = response.json()
+        except ValueError:
+            # transport errors and open circuits come back as plain text
+            return self._payment_result(response, "", response.text, "", False)
+
+        status = data.get("status", "")
+        return self._payment_result(
+            response,
+            status,
+            data.get("message", ""),
+            data.get("trans-id", ""),
+            status == "0",
+            data,
+        )
+
+    def _completed(self, result) -> bool:
+        # a wrong OTP may be retried on the same trans-id
+        return result.success
+
     def validate_payment(
         self,
         customer_phone: str,
         customer_otp: str,
         amount: int,
         message: str,
-        otp_trans_id,
+        otp_trans_id=None,
         verify_ssl=False,
+        idempotency_key=None,
     ):
-        headers = {
-            "content-type": "application/json",
-            "command-id": "process-commit-otppay",
-        }
+        """
+        With an `idempotency` cache, calls sharing `idempotency_key` (or the
+        OTP trans-id when not given) reach the gateway once.
+        """
+        otp_trans_id = self._otp_trans_id(customer_phone, amount, otp_trans_id)
+        return self._once(
+            idempotency_key or otp_trans_id,
+            self._validate_payment,
+            customer_phone,
+            customer_otp,
+            amount,
+            message,
+            otp_trans_id,
+            verify_ssl,
+        )
 
-        response = self.post(
-            self._url,
-            headers=headers,
-            json=self.parse_query(
-                customer_phone, customer_otp, amount, message, otp_trans_id
-            ),
-            auth=HTTPBasicAuth(self._username, self._password),
-            verify=verify_ssl,
+    def _validate_payment(
+        self,
+        customer_phone: str,
+        customer_otp: str,
+        amount: int,
+        message: str,
+        otp_trans_id=None,
+        verify_ssl=False,
+    ):
+        request = self._payment_request(
+            customer_phone, customer_otp, amount, message, otp_trans_id
         )
-        return response.json()
+        response = self.post(self._url, verify=verify_ssl, **request)
+
+        return self._forget_otp(customer_phone, amount, self._result(response))
 
 
 class DevPayment(GenericPayment):
     def __init__(self, phonenumber="", username="", password=""):
         url = onatel_dev_url
-        super().__init__(url, phonenumber, username, password)
+        super().__init__(url, username, password)
+        self.phonenumber = phonenumber
 
 
 class Payment(GenericPayment):
     def __init__(self, phonenumber="", username="", password=""):
         url = onatel_prod_url
-        super().__init__(url, phonenumber, username, password)
+        super().__init__(url, username, password)
+        self.phonenumber = phonenumber
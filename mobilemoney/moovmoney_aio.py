@@ -0,0 +1,83 @@
+from mobilemoney.aio import AsyncBasePayment
+from mobilemoney.moovmoney import (
+    SEND_OTP_OPTIONS,
+    GenericPayment,
+    onatel_dev_url,
+    onatel_prod_url,
+)
+
+
+class AsyncGenericPayment(AsyncBasePayment, GenericPayment):
+    async def _send_otp(
+        self, customer_phone: str, amount: int, verify_ssl=False, option=""
+    ):
+        cached = self._cached_otp(customer_phone, amount, option)
+        if cached is not None:
+            return cached
+
+        request = self._otp_request(customer_phone, amount, option)
+        response = await self.post(self._url, verify=verify_ssl, **request)
+
+        return self._remember_otp(customer_phone, amount, self._otp_data(response))
+
+    async def send_otp(self, customer_phone: str, amount: int, verify_ssl=False):
+        return await self._send_otp(
+            customer_phone, amount, verify_ssl, SEND_OTP_OPTIONS[0]
+        )
+
+    async def resend_otp(self, customer_phone: str, amount: int, verify_ssl=False):
+        return await self._send_otp(
+            customer_phone, amount, verify_ssl, SEND_OTP_OPTIONS[1]
+        )
+
+    async def validate_payment(
+        self,
+        customer_phone: str,
+        customer_otp: str,
+        amount: int,
+        message: str,
+        otp_trans_id=None,
+        verify_ssl=False,
+        idempotency_key=None,
+    ):
+        otp_trans_id = self._otp_trans_id(customer_phone, amount, otp_trans_id)
+        return await self._once(
+            idempotency_key or otp_trans_id,
+            self._validate_payment,
+            customer_phone,
+            customer_otp,
+            amount,
+            message,
+            otp_trans_id,
+            verify_ssl,
+        )
+
+    async def _validate_payment(
+        self,
+        customer_phone: str,
+        customer_otp: str,
+        amount: int,
+        message: str,
+        otp_trans_id=None,
+        verify_ssl=False,
+    ):
+        request = self._payment_request(
+            customer_phone, customer_otp, amount, message, otp_trans_id
+        )
+        response = await self.post(self._url, verify=verify_ssl, **request)
+
+        return self._forget_otp(customer_phone, amount, self._result(response))
+
+
+class AsyncDevPayment(AsyncGenericPayment):
+    def __init__(self, phonenumber="", username="", password=""):
+        url = onatel_dev_url
+        super().__init__(url, username, password)
+        self.phonenumber = phonenumber
+
+
+class AsyncPayment(AsyncGenericPayment):
+    def __init__(self, phonenumber="", username="", password=""):
+        url = onatel_prod_url
+        super().__init__(url, username, password)
+        self.phonenumber = phonenumber
@@ -1,18 +1,111 @@
-import xml.etree.ElementTree as ET
+import re
+from xml.parsers import expat
 
 from mobilemoney.base import BasePayment
+from mobilemoney.result import PaymentResult
+from mobilemoney.utils import get_reference
 
 orange_dev_url = "https://testom.orange.bf:9008/payment"
 orange_prod_url = "https://apiom.orange.bf"
 
+RESULT_FIELDS = {"status": "status", "message": "message", "transID": "trans_id"}
+
+
+def _escape(text: str) -> str:
+    # xml.sax.saxutils.escape, without the urllib.request import it pulls in
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _xml_element(tag: str, text) -> bytes:
+    # same output as ElementTree: escaped text, self-closing tag when empty
+    if not text:
+        return f"<{tag} />".encode("utf-8")
+    return f"<{tag}>{_escape(text)}</{tag}>".encode("utf-8")
+
+
+# one top level `<tag>text</tag>` element of the flat OM payload, text
+# without markup, entity or character references
+_FLAT_ELEMENT = re.compile(rb"\s*<([A-Za-z_][\w.-]*)>([^<&]*)</\1>")
+
+
+def _scan_fields(content):
+    """
+    Fast path for the flat `<status>..</status><message>..` payload OM
+    sends back. The whole payload must be a run of top level text elements
+    with nothing after the last closing tag, otherwise (declaration, nested
+    or empty elements, references, trailing data) None is returned so that
+    the caller falls back to the full parser.
+    """
+    found = {}
+    position = 0
+    size = len(content)
+    while position < size:
+        match = _FLAT_ELEMENT.match(content, position)
+        if match is None:
+            if content[position:].strip():
+                return None
+            break
+        key = RESULT_FIELDS.get(match.group(1).decode("ascii"))
+        if key is not None and key not in found:
+            try:
+                found[key] = match.group(2).decode("utf-8") or None
+            except UnicodeDecodeError:
+                return None
+        position = match.end()
+    if len(found) != len(RESULT_FIELDS):
+        return None
+    return found
+
+
+def _extract_fields(content) -> tuple:
+    """
+    Single expat pass over `content` wrapped in a root element, collecting
+    the RESULT_FIELDS texts of the top level elements only. The whole
+    payload is parsed so that a truncated or malformed document is reported.
+    Returns `(fields, error)`.
+    """
+    if content[:5] == b"<?xml":
+        content = memoryview(content)[content.find(b"?>") + 2 :]
+
+    found = {}
+    keys = []
+    texts = []
+
+    def start(tag, attrs):
+        # keys[0] is the wrapping root, its children are the fields
+        keys.append(RESULT_FIELDS.get(tag) if len(keys) == 1 else None)
+        texts.clear()
+
+    def end(tag):
+        key = keys.pop()
+        if key is not None and key not in found:
+            found[key] = "".join(texts) or None
+        texts.clear()
+
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = texts.append
+    try:
+        parser.Parse(b"<root>", False)
+        parser.Parse(content, False)
+        parser.Parse(b"</root>", True)
+    except expat.ExpatError as exp:
+        return found, exp
+    return found, None
+
 
 class GenericPayment(BasePayment):
+    provider = "orangemoney"
+
     def __init__(self, url="", phonenumber="", username="", password=""):
         super().__init__(phonenumber, username, password)
 
         if not isinstance(url, str):
             raise ValueError("value 'url' must be type of 'str'")
         self._url = url
+        self._template = None
 
     @property
     def url(self):
@@ -26,6 +119,56 @@ class GenericPayment(BasePayment):
     def url(self):
         del self._url
 
+    def _query_template(self):
+        """
+        Escaped and encoded merchant parts of the OMPREQ command, rebuilt only
+        when the merchant credentials change.
+        """
+        key = (self._phonenumber, self._username, self._password)
+        if self._template is None or self._template[0] != key:
+            head = b"<COMMAND>" + _xml_element("TYPE", "OMPREQ")
+            credentials = b"".join(
+                (
+                    _xml_element("merchant_msisdn", self._phonenumber),
+                    _xml_element("api_username", self._username),
+                    _xml_element("api_password", self._password),
+                )
+            )
+            static = b"".join(
+                (
+                    _xml_element("PROVIDER", "101"),
+                    _xml_element("PROVIDER2", "101"),
+                    _xml_element("PAYID", "12"),
+                    _xml_element("PAYID2", "12"),
+                )
+            )
+            self._template = (key, (head, credentials, static))
+        return self._template[1]
+
+    def serialize_query(
+        self,
+        customer_phone: str,
+        customer_otp: str,
+        amount: int,
+        libel: str,
+        reference: str,
+    ) -> bytes:
+        head, credentials, static = self._query_template()
+
+        return b"".join(
+            (
+                head,
+                _xml_element("customer_msisdn", f"{customer_phone}"),
+                credentials,
+                _xml_element("amount", f"{amount}"),
+                static,
+                _xml_element("otp", f"{customer_otp}"),
+                _xml_element("reference_number", libel),
+                _xml_element("ext_txn_id", reference),
+                b"</COMMAND>",
+            )
+        )
+
     def parse_query(
         self,
         customer_phone: str,
@@ -34,49 +177,74 @@ class GenericPayment(BasePayment):
         libel: str,
         reference: str,
     ):
-        root = ET.Element("COMMAND")
-
-        # Ajouter les éléments enfants à l'élément racine
-        ET.SubElement(root, "TYPE").text = "OMPREQ"
-        ET.SubElement(root, "customer_msisdn").text = f"{customer_phone}"
-        ET.SubElement(root, "merchant_msisdn").text = self._phonenumber
-        ET.SubElement(root, "api_username").text = self._username
-        ET.SubElement(root, "api_password").text = self._password
-        ET.SubElement(root, "amount").text = f"{amount}"
-        ET.SubElement(root, "PROVIDER").text = "101"
-        ET.SubElement(root, "PROVIDER2").text = "101"
-        ET.SubElement(root, "PAYID").text = "12"
-        ET.SubElement(root, "PAYID2").text = "12"
-        ET.SubElement(root, "otp").text = f"{customer_otp}"
-        ET.SubElement(root, "reference_number").text = libel
-        ET.SubElement(root, "ext_txn_id").text = reference
-
-        tree = ET.ElementTree(root)
-        xml_string = ET.tostring(root, encoding="utf-8").decode("utf-8")
-
-        return xml_string
-
-    def parse_result(self, result: str):
-        root = ET.fromstring("<root>" + result + "</root>")
-
-        status, message, trans_id = (
-            root.find("status"),
-            root.find("message"),
-            root.find("transID"),
-        )
+        return self.serialize_query(
+            customer_phone, customer_otp, amount, libel, reference
+        ).decode("utf-8")
 
-        if (status is not None) and (message is not None) and (trans_id is not None):
-            return {
-                "status": status.text,
-                "message": message.text,
-                "trans_id": trans_id.text,
-            }
-        else:
+    def parse_result(self, result):
+        """
+        Extract `status`, `message` and `transID` from an OM response.
+
+        `result` may be the raw response bytes or text. Only the top level
+        elements are read, as the payload is a flat list of fields; a missing
+        field or a malformed payload gives an `OM-500` result instead of an
+        exception.
+        """
+        if isinstance(result, str):
+            result = result.encode("utf-8")
+
+        found = _scan_fields(result)
+        error = None
+        if found is None:
+            found, error = _extract_fields(result)
+
+        if error is None and len(found) == len(RESULT_FIELDS):
+            return {key: found[key] for key in RESULT_FIELDS.values()}
+        if error is not None:
             return {
-                "message": "Erreur de retour de l'API OM",
+                "message": f"Réponse invalide de l'API OM: {error}",
                 "status": "OM-500",
                 "trans_id": "Error",
             }
+        return {
+            "message": "Erreur de retour de l'API OM",
+            "status": "OM-500",
+            "trans_id": "Error",
+        }
+
+    def _payment_request(
+        self,
+        customer_phone: str,
+        customer_otp: str,
+        amount: int,
+        message: str,
+        reference=None,
+    ):
+        if reference is None:
+            reference = get_reference()
+
+        return {
+            "headers": {"content-type": "application/xml"},
+            "data": self.serialize_query(
+                customer_phone, customer_otp, amount, message, reference
+            ),
+            "operation": "OMPREQ",
+            "reference": reference,
+        }
+
+    def _result(self, response) -> PaymentResult:
+        fields = self.parse_result(response.content)
+        return self._payment_result(
+            response,
+            fields["status"],
+            fields["message"],
+            fields["trans_id"],
+            fields["status"] == "200",
+        )
+
+    def _completed(self, result) -> bool:
+        # OM-500 and -100 are local parse or transport errors
+        return result.status not in ("OM-500", "-100")
 
     def validate_payment(
         self,
@@ -85,19 +253,46 @@ class GenericPayment(BasePayment):
         amount: int,
         message: str,
         verify_ssl=True,
+        reference=None,
+        idempotency_key=None,
     ):
-        headers = {"content-type": "application/xml"}
-        data = self.parse_query(customer_phone, customer_otp, amount, message)
+        """
+        With an `idempotency` cache, calls sharing `idempotency_key` (or
+        `reference` when not given) reach the gateway once.
+        """
+        return self._once(
+            idempotency_key or reference,
+            self._validate_payment,
+            customer_phone,
+            customer_otp,
+            amount,
+            message,
+            verify_ssl,
+            reference,
+        )
+
+    def _validate_payment(
+        self,
+        customer_phone: str,
+        customer_otp: str,
+        amount: int,
+        message: str,
+        verify_ssl=True,
+        reference=None,
+    ):
+        request = self._payment_request(
+            customer_phone, customer_otp, amount, message, reference
+        )
 
         try:
-            response = self.post(
-                self._url, headers=headers, data=data, verify=verify_ssl
-            ).text
+            response = self.post(self._url, verify=verify_ssl, **request)
 
         except Exception as exp:
-            response = f"<status>-100</status><message>{exp.__str__()}</message><transID>OM.0000.0000.0000</transID>"
+            return PaymentResult(
+                self.provider, "-100", exp.__str__(), "OM.0000.0000.0000"
+            )
 
-        return self.parse_result(response)
+        return self._result(response)
 
 
 class DevPayment(GenericPayment):
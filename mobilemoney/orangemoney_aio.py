@@ -0,0 +1,53 @@
+from mobilemoney.aio import AsyncBasePayment
+from mobilemoney.orangemoney import GenericPayment, orange_dev_url, orange_prod_url
+
+
+class AsyncGenericPayment(AsyncBasePayment, GenericPayment):
+    async def validate_payment(
+        self,
+        customer_phone: str,
+        customer_otp: str,
+        amount: int,
+        message: str,
+        verify_ssl=True,
+        reference=None,
+        idempotency_key=None,
+    ):
+        return await self._once(
+            idempotency_key or reference,
+            self._validate_payment,
+            customer_phone,
+            customer_otp,
+            amount,
+            message,
+            verify_ssl,
+            reference,
+        )
+
+    async def _validate_payment(
+        self,
+        customer_phone: str,
+        customer_otp: str,
+        amount: int,
+        message: str,
+        verify_ssl=True,
+        reference=None,
+    ):
+        request = self._payment_request(
+            customer_phone, customer_otp, amount, message, reference
+        )
+        response = await self.post(self._url, verify=verify_ssl, **request)
+
+        return self._result(response)
+
+
+class AsyncDevPayment(AsyncGenericPayment):
+    def __init__(self, phonenumber="", username="", password=""):
+        url = orange_dev_url
+        super().__init__(url, phonenumber, username, password)
+
+
+class AsyncPayment(AsyncGenericPayment):
+    def __init__(self, phonenumber="", username="", password=""):
+        url = orange_prod_url
+        super().__init__(url, phonenumber, username, password)
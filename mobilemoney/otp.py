@@ -0,0 +1,189 @@
+import json
+import threading
+import time
+
+
+class OTPBackend(object):
+    """
+    Storage used by `OTPSessionStore`. Values are JSON-serializable dicts and
+    expire `ttl` seconds after being set.
+    """
+
+    def get(self, key: str):
+        raise NotImplementedError
+
+    def set(self, key: str, value: dict, ttl: float):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+
+class MemoryOTPBackend(OTPBackend):
+    """Per-process backend, bounded to `max_entries` sessions."""
+
+    def __init__(self, max_entries: int = 100000):
+        if not isinstance(max_entries, int) or max_entries < 1:
+            raise ValueError("value 'max_entries' must be a positive 'int'")
+
+        self._max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _purge(self, now):
+        for key in [
+            key for key, (_, expires) in self._entries.items() if expires <= now
+        ]:
+            del self._entries[key]
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._entries[key]
+                return None
+            return entry[0]
+
+    def set(self, key: str, value: dict, ttl: float):
+        now = time.time()
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self._max_entries:
+                self._purge(now)
+                if len(self._entries) >= self._max_entries:
+                    # drop the session closest to expiry
+                    del self._entries[
+                        min(self._entries, key=lambda k: self._entries[k][1])
+                    ]
+            self._entries[key] = (value, now + ttl)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SQLiteOTPBackend(OTPBackend):
+    """
+    Backend shared by every process of a host through a SQLite database in
+    WAL mode.
+    """
+
+    def __init__(self, path: str, timeout: float = 5.0):
+        if not isinstance(path, str):
+            raise ValueError("value 'path' must be type of 'str'")
+
+        self._path = path
+        self._timeout = timeout
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS otp_sessions "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # only the SQLite backend pays for the module
+            import sqlite3
+
+            connection = sqlite3.connect(self._path, timeout=self._timeout)
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str):
+        row = (
+            self._connection()
+            .execute(
+                "SELECT value FROM otp_sessions WHERE key = ? AND expires > ?",
+                (key, time.time()),
+            )
+            .fetchone()
+        )
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: dict, ttl: float):
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute("DELETE FROM otp_sessions WHERE expires <= ?", (now,))
+            connection.execute(
+                "INSERT OR REPLACE INTO otp_sessions (key, value, expires) "
+                "VALUES (?, ?, ?)",
+                (key, json.dumps(value), now + ttl),
+            )
+
+    def delete(self, key: str):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM otp_sessions WHERE key = ?", (key,))
+
+
+class OTPSessionStore(object):
+    """
+    Moov OTP sessions keyed by (merchant, customer phone, amount).
+
+    Keeps the `trans-id` returned by `send_otp` for `ttl` seconds so that
+    `validate_payment` can find it, and answers `resend_otp` locally with the
+    last gateway response when the previous OTP was sent less than
+    `resend_interval` seconds ago.
+    """
+
+    def __init__(
+        self, backend: OTPBackend = None, ttl: float = 300.0, resend_interval=60.0
+    ):
+        if backend is not None and not isinstance(backend, OTPBackend):
+            raise ValueError("value 'backend' must be type of 'OTPBackend'")
+
+        if ttl <= 0 or resend_interval < 0:
+            raise ValueError("'ttl' must be positive and 'resend_interval' >= 0")
+
+        self._backend = backend if backend is not None else MemoryOTPBackend()
+        self._ttl = ttl
+        self._resend_interval = resend_interval
+
+    @property
+    def backend(self):
+        return self._backend
+
+    @property
+    def ttl(self):
+        return self._ttl
+
+    @property
+    def resend_interval(self):
+        return self._resend_interval
+
+    def key(self, merchant: str, customer_phone: str, amount) -> str:
+        return f"{merchant}:{customer_phone}:{amount}"
+
+    def get(self, merchant: str, customer_phone: str, amount):
+        return self._backend.get(self.key(merchant, customer_phone, amount))
+
+    def trans_id(self, merchant: str, customer_phone: str, amount):
+        session = self.get(merchant, customer_phone, amount)
+        return session["trans_id"] if session else None
+
+    def save(self, merchant: str, customer_phone: str, amount, response: dict):
+        trans_id = response.get("trans-id") if isinstance(response, dict) else None
+        if not trans_id:
+            return None
+
+        session = {"trans_id": trans_id, "sent_at": time.time(), "response": response}
+        self._backend.set(
+            self.key(merchant, customer_phone, amount), session, self._ttl
+        )
+        return session
+
+    def recent(self, merchant: str, customer_phone: str, amount):
+        """
+        The session if its OTP was sent less than `resend_interval` seconds
+        ago, None otherwise.
+        """
+        session = self.get(merchant, customer_phone, amount)
+        if session and time.time() - session["sent_at"] < self._resend_interval:
+            return session
+        return None
+
+    def discard(self, merchant: str, customer_phone: str, amount):
+        self._backend.delete(self.key(merchant, customer_phone, amount))
@@ -0,0 +1,181 @@
+import random
+import threading
+import time
+
+
+class CircuitBreaker(object):
+    """
+    Fails fast while a provider is unhealthy.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls are refused for `reset_timeout` seconds. It then lets a single
+    trial call through (half-open): a success closes the circuit, a failure
+    opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        if not isinstance(failure_threshold, int) or failure_threshold < 1:
+            raise ValueError("value 'failure_threshold' must be a positive 'int'")
+
+        if reset_timeout <= 0:
+            raise ValueError("value 'reset_timeout' must be positive")
+
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def failure_threshold(self):
+        return self._failure_threshold
+
+    @property
+    def reset_timeout(self):
+        return self._reset_timeout
+
+    def _current_state(self, now):
+        if self._state == self.OPEN and now - self._opened_at >= self._reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probing = False
+        return self._state
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    @property
+    def failures(self):
+        return self._failures
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if (
+                self._state == self.HALF_OPEN
+                or self._failures >= self._failure_threshold
+            ):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def release(self):
+        """
+        Give back the trial slot of a half-open circuit when the call ended
+        without an outcome (cancelled, interrupted).
+        """
+        with self._lock:
+            self._probing = False
+
+    def reset(self):
+        self.record_success()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            retry_in = None
+            if state == self.OPEN:
+                retry_in = max(0.0, self._reset_timeout - (now - self._opened_at))
+            return {"state": state, "failures": self._failures, "retry_in": retry_in}
+
+
+class ProviderPolicy(object):
+    """
+    Timeouts, retries and circuit breaker applied to every call made to one
+    provider. Retries (with jittered exponential backoff) are only used for
+    calls flagged as idempotent.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        retries: int = 2,
+        backoff_base: float = 0.2,
+        backoff_max: float = 5.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        if not isinstance(retries, int) or retries < 0:
+            raise ValueError("value 'retries' must be a non negative 'int'")
+
+        if connect_timeout <= 0 or read_timeout <= 0:
+            raise ValueError("timeouts must be positive")
+
+        if backoff_base < 0 or backoff_max < 0:
+            raise ValueError("backoff values must not be negative")
+
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.circuit = CircuitBreaker(failure_threshold, reset_timeout)
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    def attempts(self, idempotent: bool) -> int:
+        return self.retries + 1 if idempotent else 1
+
+    def backoff(self, attempt: int) -> float:
+        # "full jitter": uniform between 0 and the exponential ceiling
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def is_failure(self, response) -> bool:
+        return response.status_code >= 500
+
+
+_policies = {}
+_policies_lock = threading.Lock()
+
+
+def get_policy(provider: str) -> ProviderPolicy:
+    with _policies_lock:
+        policy = _policies.get(provider)
+        if policy is None:
+            policy = _policies[provider] = ProviderPolicy()
+        return policy
+
+
+def set_policy(provider: str, policy: ProviderPolicy) -> ProviderPolicy:
+    if not isinstance(policy, ProviderPolicy):
+        raise ValueError("value 'policy' must be type of 'ProviderPolicy'")
+
+    with _policies_lock:
+        _policies[provider] = policy
+    return policy
+
+
+def circuit_states() -> dict:
+    with _policies_lock:
+        policies = dict(_policies)
+    return {
+        provider: policy.circuit.snapshot() for provider, policy in policies.items()
+    }
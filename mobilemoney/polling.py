@@ -0,0 +1,265 @@
+import asyncio
+import base64
+import heapq
+import itertools
+import json
+import threading
+import time
+
+from mobilemoney.batch import BatchItem, BatchValidator
+from mobilemoney.ligdicash import GenericPaymentWithRedirect
+
+COMPLETED = "completed"
+NOT_COMPLETED = "nocompleted"
+EXPIRED = "expired"
+
+
+def token_expiry(token: str):
+    """
+    Return the `expiry_date` (epoch seconds) carried by a Ligdicash invoice
+    token, or None when the token cannot be decoded.
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["expiry_date"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class PollResult(object):
+    __slots__ = ("token", "status", "response")
+
+    def __init__(self, token, status, response=None):
+        self.token = token
+        self.status = status
+        self.response = response
+
+    @property
+    def completed(self):
+        return self.status == COMPLETED
+
+
+class _Tracked(object):
+    __slots__ = ("token", "callback", "expires_at", "interval", "due")
+
+    def __init__(self, token, callback, expires_at, interval, due):
+        self.token = token
+        self.callback = callback
+        self.expires_at = expires_at
+        self.interval = interval
+        self.due = due
+
+
+class InvoicePoller(object):
+    """
+    Poll many pending Ligdicash invoice tokens at a bounded request rate.
+
+    Each token is checked after `initial_interval` seconds, and every
+    non-terminal answer multiplies its interval by `factor` (up to
+    `max_interval`). A token leaves the poller once it is `completed`,
+    `nocompleted` or past the `expiry_date` of its JWT. Outcomes are
+    delivered as `PollResult` to the per-token callback and returned by
+    `poll_once()` / yielded by `completions()`.
+
+    At most `batch_size` verifications run per tick, on `max_workers`
+    threads, and `run()` keeps the overall pace under `rate` requests per
+    second.
+    """
+
+    def __init__(
+        self,
+        client: GenericPaymentWithRedirect,
+        initial_interval: float = 5.0,
+        max_interval: float = 300.0,
+        factor: float = 1.5,
+        rate: float = 10.0,
+        batch_size: int = 50,
+        max_workers: int = 8,
+        verify_ssl=True,
+    ):
+        if not isinstance(client, GenericPaymentWithRedirect):
+            raise ValueError(
+                "value 'client' must be type of 'GenericPaymentWithRedirect'"
+            )
+
+        if initial_interval <= 0 or max_interval < initial_interval:
+            raise ValueError("intervals must be positive and ordered")
+
+        if factor < 1:
+            raise ValueError("value 'factor' must be >= 1")
+
+        if rate <= 0:
+            raise ValueError("value 'rate' must be positive")
+
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise ValueError("value 'batch_size' must be a positive 'int'")
+
+        self._client = client
+        self._initial_interval = initial_interval
+        self._max_interval = max_interval
+        self._factor = factor
+        self._rate = rate
+        self._batch_size = batch_size
+        self._verify_ssl = verify_ssl
+        self._batch = BatchValidator(max_workers)
+        self._tokens = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def __contains__(self, token):
+        return token in self._tokens
+
+    def add(self, token: str, callback=None, expires_at: float = None):
+        """
+        Track `token`. `expires_at` (epoch seconds) defaults to the token's
+        own `expiry_date`.
+        """
+        if expires_at is None:
+            expires_at = token_expiry(token)
+
+        with self._lock:
+            due = time.monotonic() + self._initial_interval
+            tracked = _Tracked(token, callback, expires_at, self._initial_interval, due)
+            self._tokens[token] = tracked
+            heapq.heappush(self._heap, (due, next(self._counter), token))
+        self._wakeup.set()
+
+    def remove(self, token: str) -> bool:
+        with self._lock:
+            return self._tokens.pop(token, None) is not None
+
+    def next_due(self):
+        """Monotonic time at which the next token must be checked, or None."""
+        with self._lock:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def _drop_stale(self):
+        while self._heap:
+            due, _, token = self._heap[0]
+            tracked = self._tokens.get(token)
+            if tracked is not None and tracked.due == due:
+                return
+            heapq.heappop(self._heap)
+
+    def _take_due(self, now):
+        due_tokens = []
+        with self._lock:
+            while self._heap and len(due_tokens) < self._batch_size:
+                self._drop_stale()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                _, _, token = heapq.heappop(self._heap)
+                due_tokens.append(self._tokens[token])
+        return due_tokens
+
+    def _reschedule(self, tracked):
+        with self._lock:
+            if self._tokens.get(tracked.token) is not tracked:
+                return
+            tracked.interval = min(tracked.interval * self._factor, self._max_interval)
+            tracked.due = time.monotonic() + tracked.interval
+            heapq.heappush(
+                self._heap, (tracked.due, next(self._counter), tracked.token)
+            )
+
+    def _finish(self, tracked, status, response):
+        with self._lock:
+            if self._tokens.get(tracked.token) is tracked:
+                del self._tokens[tracked.token]
+        result = PollResult(tracked.token, status, response)
+        if tracked.callback is not None:
+            tracked.callback(result)
+        return result
+
+    def poll_once(self) -> list:
+        """
+        Verify the tokens that are due (at most `batch_size`) and return the
+        `PollResult` of the ones that reached a terminal state.
+        """
+        return self._poll()[0]
+
+    def _poll(self):
+        due_tokens = self._take_due(time.monotonic())
+        finished = []
+
+        items = []
+        for tracked in due_tokens:
+            if tracked.expires_at is not None and tracked.expires_at <= time.time():
+                finished.append(self._finish(tracked, EXPIRED, None))
+            else:
+                items.append(
+                    BatchItem(
+                        self._client,
+                        tracked.token,
+                        self._verify_ssl,
+                        method="verify_token",
+                        key=tracked,
+                    )
+                )
+
+        for result in self._batch.run(items):
+            tracked = result.key
+            if result.ok and result.result[0] is not None:
+                status = COMPLETED if result.result[0] else NOT_COMPLETED
+                finished.append(self._finish(tracked, status, result.result[1]))
+            else:
+                self._reschedule(tracked)
+
+        return finished, len(items)
+
+    def run(self, stop_event: threading.Event = None):
+        """
+        Poll until every token reached a terminal state or `stop_event` is
+        set.
+        """
+        while self._tokens and not (stop_event and stop_event.is_set()):
+            self._wakeup.clear()
+            next_due = self.next_due()
+            if next_due is None:
+                break
+
+            delay = next_due - time.monotonic()
+            if delay > 0:
+                self._wakeup.wait(delay)
+                continue
+
+            started = time.monotonic()
+            _, checked = self._poll()
+            pause = checked / self._rate - (time.monotonic() - started)
+            if pause > 0:
+                time.sleep(pause)
+
+    async def completions(self):
+        """
+        Async iterator over the `PollResult` of the tracked tokens, ending
+        once no token is left.
+        """
+        loop = asyncio.get_running_loop()
+
+        while self._tokens:
+            next_due = self.next_due()
+            if next_due is None:
+                break
+
+            delay = next_due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            started = time.monotonic()
+            finished, checked = await loop.run_in_executor(None, self._poll)
+            for result in finished:
+                yield result
+            pause = checked / self._rate - (time.monotonic() - started)
+            if pause > 0:
+                await asyncio.sleep(pause)
+
+    def close(self):
+        self._batch.shutdown()
@@ -0,0 +1,281 @@
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+import urllib3
+
+from mobilemoney.transport import (
+    Response,
+    Transport,
+    basic_auth,
+    encode_body,
+    request_target,
+    split_timeout,
+)
+
+
+class ConnectionPool(Transport):
+    """
+    Thread-safe, per-host pool of keep-alive HTTP sessions, sent through
+    `requests`.
+
+    Every host (scheme + netloc) gets its own session whose adapter keeps at
+    most `pool_size` connections alive. Callers beyond that limit wait for a
+    free slot instead of opening extra sockets. Hosts not used for
+    `idle_timeout` seconds are closed on the next request or `evict_idle()`.
+
+    Subclasses change the HTTP client through `_new_session`, `_send`,
+    `_counters` and `_close_session`, see `Urllib3Transport`.
+    """
+
+    def __init__(self, pool_size: int = 10, idle_timeout: float = 60.0):
+        if not isinstance(pool_size, int) or pool_size < 1:
+            raise ValueError("value 'pool_size' must be a positive 'int'")
+
+        if idle_timeout is not None and idle_timeout <= 0:
+            raise ValueError("value 'idle_timeout' must be positive or None")
+
+        self._pool_size = pool_size
+        self._idle_timeout = idle_timeout
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._reused = 0
+        self._waited = 0
+        self._evicted = 0
+
+    @property
+    def pool_size(self):
+        return self._pool_size
+
+    @property
+    def idle_timeout(self):
+        return self._idle_timeout
+
+    def _host_key(self, url: str, verify=True):
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}".lower()
+
+    def _new_session(self, url: str, verify=True):
+        # imported here so that only this transport pays for `requests`
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self._pool_size, pool_block=False
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _send(self, session, method: str, url: str, **kwargs):
+        return session.request(method, url, **kwargs)
+
+    def _counters(self, session):
+        """(connections opened, requests sent) by `session`."""
+        opened = requests_count = 0
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for pool in filter(None, map(pools.get, pools.keys())):
+                opened += pool.num_connections
+                requests_count += pool.num_requests
+        return opened, requests_count
+
+    def _close_session(self, session):
+        session.close()
+
+    def _acquire(self, url: str, verify=True):
+        key = self._host_key(url, verify)
+        now = time.monotonic()
+
+        with self._lock:
+            self._evict_idle(now)
+            host = self._hosts.get(key)
+            if host is None:
+                host = _Host(self._new_session(url, verify), self._pool_size)
+                self._hosts[key] = host
+            host.in_use += 1
+            host.last_used = now
+
+        if not host.slots.acquire(blocking=False):
+            with self._lock:
+                self._waited += 1
+            host.slots.acquire()
+
+        return host
+
+    def _release(self, host):
+        host.slots.release()
+        with self._lock:
+            host.in_use -= 1
+            host.last_used = time.monotonic()
+
+    def request(self, method: str, url: str, **kwargs):
+        host = self._acquire(url, kwargs.get("verify", True))
+        try:
+            return self._send(host.session, method, url, **kwargs)
+        finally:
+            self._release(host)
+
+    def _evict_idle(self, now):
+        if self._idle_timeout is None:
+            return
+
+        for key in list(self._hosts):
+            host = self._hosts[key]
+            if host.in_use == 0 and now - host.last_used >= self._idle_timeout:
+                self._close_host(key)
+                self._evicted += 1
+
+    def evict_idle(self):
+        with self._lock:
+            self._evict_idle(time.monotonic())
+
+    def _close_host(self, key):
+        host = self._hosts.pop(key)
+        opened, requests_count = self._counters(host.session)
+        self._opened += opened
+        self._reused += requests_count - opened
+        self._close_session(host.session)
+
+    def close(self):
+        with self._lock:
+            for key in list(self._hosts):
+                self._close_host(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            opened, reused = self._opened, self._reused
+            hosts = {}
+            for key, host in self._hosts.items():
+                host_opened, host_requests = self._counters(host.session)
+                opened += host_opened
+                reused += host_requests - host_opened
+                hosts[key] = {
+                    "opened": host_opened,
+                    "reused": host_requests - host_opened,
+                    "in_use": host.in_use,
+                }
+
+            return {
+                "opened": opened,
+                "reused": reused,
+                "waited": self._waited,
+                "evicted": self._evicted,
+                "hosts": hosts,
+            }
+
+
+class _Host(object):
+    __slots__ = ("session", "slots", "in_use", "last_used")
+
+    def __init__(self, session, pool_size):
+        self.session = session
+        self.slots = threading.BoundedSemaphore(pool_size)
+        self.in_use = 0
+        self.last_used = time.monotonic()
+
+
+class Urllib3Transport(ConnectionPool):
+    """
+    `ConnectionPool` sending through urllib3 connection pools directly,
+    without the `requests` session layer (hooks, cookie jar, redirects,
+    charset detection).
+
+    The response body is read once into `Response.content` and handed over
+    as is. Bytes-like request bodies, `memoryview` included, are written
+    without a copy. Certificate checking is a property of the urllib3 pool,
+    so a host reached with and without `verify` gets two pools.
+    """
+
+    def _host_key(self, url: str, verify=True):
+        key = super()._host_key(url)
+        if verify or not key.startswith("https:"):
+            return key
+        return f"{key} (unverified)"
+
+    def _new_session(self, url: str, verify=True):
+        options = {}
+        if urlsplit(url).scheme.lower() == "https":
+            options["cert_reqs"] = "CERT_REQUIRED" if verify else "CERT_NONE"
+        return urllib3.connection_from_url(
+            url, maxsize=self._pool_size, block=False, retries=False, **options
+        )
+
+    def _send(
+        self,
+        session,
+        method: str,
+        url: str,
+        params=None,
+        headers=None,
+        data=None,
+        json=None,
+        auth=None,
+        timeout=None,
+        verify=True,
+    ) -> Response:
+        body, content_type = encode_body(data, json)
+        request_headers = {"User-Agent": "bf-mobilemoney"}
+        if content_type is not None:
+            request_headers["Content-Type"] = content_type
+        request_headers.update(headers or {})
+        if auth is not None:
+            request_headers["Authorization"] = basic_auth(auth)
+
+        connect_timeout, read_timeout = split_timeout(timeout)
+        started = time.monotonic()
+        response = session.urlopen(
+            method,
+            request_target(url, params),
+            body=body if body or method not in ("GET", "HEAD") else None,
+            headers=request_headers,
+            retries=False,
+            redirect=False,
+            assert_same_host=False,
+            timeout=urllib3.Timeout(connect=connect_timeout, read=read_timeout),
+        )
+        return Response(
+            response.status,
+            response.data,
+            response.headers,
+            url,
+            response.reason or "",
+            timedelta(seconds=time.monotonic() - started),
+        )
+
+    def _counters(self, session):
+        return session.num_connections, session.num_requests
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool() -> Transport:
+    global _default_pool
+
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = Urllib3Transport()
+    return _default_pool
+
+
+def set_default_pool(pool: Transport) -> Transport:
+    """
+    Replace the transport shared by every payment instance and close the
+    previous one. Returns the new transport.
+    """
+    global _default_pool
+
+    if not isinstance(pool, Transport):
+        raise ValueError("value 'pool' must be type of 'Transport'")
+
+    with _default_pool_lock:
+        previous, _default_pool = _default_pool, pool
+    if previous is not None:
+        previous.close()
+    return pool
@@ -0,0 +1,183 @@
+import threading
+import time
+
+
+class RateBackend(object):
+    """
+    Token buckets used by `RateLimiter`.
+
+    `reserve()` takes one token from bucket `key` (refilled at `rate` tokens
+    per second, holding at most `burst`) and returns how long the caller has
+    to wait before sending. The bucket may go below zero: callers queue up
+    in reservation order. When the wait would exceed `max_wait`, nothing is
+    taken and None is returned.
+
+    Backends doing I/O set `blocking`, `RateLimiter.reserve_async()` then
+    runs them in the default executor instead of the event loop.
+    """
+
+    blocking = False
+
+    def reserve(self, key: str, rate: float, burst: float, max_wait=None):
+        raise NotImplementedError
+
+
+def _take(tokens, updated, now, rate, burst, max_wait):
+    """New (tokens, wait) for one reservation, or None past `max_wait`."""
+    tokens = min(burst, tokens + (now - updated) * rate) - 1
+    wait = -tokens / rate if tokens < 0 else 0.0
+    if max_wait is not None and wait > max_wait:
+        return None
+    return tokens, wait
+
+
+class MemoryRateBackend(RateBackend):
+    """Per-process buckets, shared by threads and event loops."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str, rate: float, burst: float, max_wait=None):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            taken = _take(tokens, updated, now, rate, burst, max_wait)
+            if taken is None:
+                return None
+            self._buckets[key] = (taken[0], now)
+            return taken[1]
+
+
+class SQLiteRateBackend(RateBackend):
+    """
+    Buckets shared by every process of a host through a SQLite database in
+    WAL mode (one short write transaction per reservation).
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, timeout: float = 5.0):
+        if not isinstance(path, str):
+            raise ValueError("value 'path' must be type of 'str'")
+
+        self._path = path
+        self._timeout = timeout
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS rate_buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            import sqlite3
+
+            connection = sqlite3.connect(
+                self._path, timeout=self._timeout, isolation_level=None
+            )
+            self._local.connection = connection
+        return connection
+
+    def reserve(self, key: str, rate: float, burst: float, max_wait=None):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = connection.execute(
+                "SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row if row else (burst, now)
+            taken = _take(tokens, updated, now, rate, burst, max_wait)
+            if taken is not None:
+                connection.execute(
+                    "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) "
+                    "VALUES (?, ?, ?)",
+                    (key, taken[0], now),
+                )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return None if taken is None else taken[1]
+
+
+class RateLimiter(object):
+    """
+    Token-bucket shaping of outbound calls, one bucket per provider and API
+    username.
+
+    Nothing is limited until `configure()` sets a rate for a provider (or
+    for one of its usernames). Calls over the rate wait for their turn
+    instead of failing; with `max_wait`, a call that would wait longer is
+    refused and `BasePayment` answers it with an HTTP 429 response.
+    """
+
+    def __init__(self, backend: RateBackend = None):
+        self._backend = None
+        self.backend = backend if backend is not None else MemoryRateBackend()
+        self._limits = {}
+
+    @property
+    def backend(self):
+        return self._backend
+
+    @backend.setter
+    def backend(self, value):
+        if not isinstance(value, RateBackend):
+            raise ValueError("value 'backend' must be type of 'RateBackend'")
+        self._backend = value
+
+    def configure(
+        self,
+        provider: str,
+        rate: float,
+        burst: float = None,
+        username: str = None,
+        max_wait: float = None,
+    ):
+        """
+        Allow `rate` calls per second (bursts of `burst`, `rate` by default)
+        to `provider`, for each username or only for `username`.
+        """
+        if rate <= 0:
+            raise ValueError("value 'rate' must be positive")
+
+        burst = max(1.0, rate) if burst is None else burst
+        if burst < 1:
+            raise ValueError("value 'burst' must be at least 1")
+
+        self._limits[(provider, username)] = (rate, burst, max_wait)
+
+    def remove(self, provider: str, username: str = None):
+        self._limits.pop((provider, username), None)
+
+    def _limit(self, provider, username):
+        return self._limits.get((provider, username)) or self._limits.get(
+            (provider, None)
+        )
+
+    def reserve(self, provider: str, username: str = ""):
+        """Seconds to wait before calling, None if refused."""
+        limit = self._limit(provider, username)
+        if limit is None:
+            return 0.0
+
+        rate, burst, max_wait = limit
+        return self._backend.reserve(f"{provider}:{username}", rate, burst, max_wait)
+
+    async def reserve_async(self, provider: str, username: str = ""):
+        """`reserve()` that keeps a blocking backend off the event loop."""
+        if self._backend.blocking and self._limit(provider, username) is not None:
+            import asyncio
+
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self.reserve, provider, username
+            )
+        return self.reserve(provider, username)
+
+
+rate_limits = RateLimiter()
@@ -0,0 +1,427 @@
+import csv
+from decimal import Decimal, InvalidOperation
+from xml.parsers import expat
+
+from mobilemoney.result import PaymentResult
+
+MATCHED = "matched"
+AMOUNT_MISMATCH = "amount_mismatch"
+DUPLICATE = "duplicate"
+MISSING = "missing"
+UNKNOWN = "unknown"
+
+KINDS = (MATCHED, AMOUNT_MISMATCH, DUPLICATE, MISSING, UNKNOWN)
+
+# statement column / element names tried, case-insensitively, for each field
+TRANS_ID_FIELDS = (
+    "trans_id",
+    "transid",
+    "trans-id",
+    "transaction_id",
+    "transaction id",
+    "id transaction",
+    "txn_id",
+)
+AMOUNT_FIELDS = ("amount", "montant", "transaction_amount", "amt")
+REFERENCE_FIELDS = (
+    "reference",
+    "référence",
+    "ext_txn_id",
+    "external_id",
+    "request-id",
+    "partner_reference",
+)
+
+_CHUNK_SIZE = 1 << 16
+
+
+def parse_amount(value):
+    """
+    `Decimal` from a statement amount ("1 000", "1,000.50", "1.000,50",
+    "1000,5", 1000), None when empty or unreadable. A lone separator
+    followed by exactly three digits ("1.000", "1,000") or a repeated one
+    separates thousands: XOF amounts have no decimals.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, Decimal)):
+        return Decimal(value)
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if value.isdigit():
+        return Decimal(value)
+
+    text = "".join(str(value).split())
+    if "," in text and "." in text:
+        # the last separator is the decimal one
+        if text.rfind(",") > text.rfind("."):
+            text = text.replace(".", "").replace(",", ".")
+        else:
+            text = text.replace(",", "")
+    else:
+        separator = "," if "," in text else "."
+        head, _, tail = text.rpartition(separator)
+        if separator in head or len(tail) == 3:
+            text = text.replace(separator, "")
+        elif separator == ",":
+            text = f"{head}.{tail}"
+    try:
+        return Decimal(text) if text else None
+    except InvalidOperation:
+        return None
+
+
+class StatementRow(object):
+    """One operator statement line, `line` being its position in the file."""
+
+    __slots__ = ("trans_id", "amount", "reference", "line")
+
+    def __init__(self, trans_id, amount=None, reference=None, line=0):
+        self.trans_id = trans_id
+        self.amount = amount
+        self.reference = reference
+        self.line = line
+
+
+class ReconciliationEntry(object):
+    """
+    One reconciliation outcome: `expected` is our amount, `actual` the
+    statement one, `line` the statement line (None for `missing`).
+    """
+
+    __slots__ = ("kind", "trans_id", "reference", "expected", "actual", "line")
+
+    def __init__(
+        self, kind, trans_id, reference=None, expected=None, actual=None, line=None
+    ):
+        self.kind = kind
+        self.trans_id = trans_id
+        self.reference = reference
+        self.expected = expected
+        self.actual = actual
+        self.line = line
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        return (
+            f"ReconciliationEntry(kind={self.kind!r}, trans_id={self.trans_id!r}, "
+            f"expected={self.expected!r}, actual={self.actual!r}, line={self.line!r})"
+        )
+
+
+class ReconciliationReport(object):
+    """Count of each kind, and the entries of the kinds asked to be kept."""
+
+    def __init__(self, keep=(AMOUNT_MISMATCH, DUPLICATE, MISSING, UNKNOWN)):
+        self.counts = dict.fromkeys(KINDS, 0)
+        self.entries = {kind: [] for kind in keep}
+
+    def add(self, entry: ReconciliationEntry):
+        self.counts[entry.kind] += 1
+        entries = self.entries.get(entry.kind)
+        if entries is not None:
+            entries.append(entry)
+
+    @property
+    def balanced(self) -> bool:
+        return not any(self.counts[kind] for kind in KINDS if kind != MATCHED)
+
+    def to_dict(self) -> dict:
+        return {
+            "counts": dict(self.counts),
+            "entries": {
+                kind: [entry.to_dict() for entry in entries]
+                for kind, entries in self.entries.items()
+            },
+        }
+
+
+def _open(source, mode, encoding=None):
+    """(file object, whether we opened it)."""
+    if not isinstance(source, (str, bytes)) and not hasattr(source, "__fspath__"):
+        return source, False
+    if "b" in mode:
+        return open(source, mode), True
+    return open(source, mode, encoding=encoding, newline=""), True
+
+
+def _pick(names, candidates, explicit):
+    if explicit is not None:
+        return explicit
+    lowered = {name.strip().lower(): name for name in names if name}
+    for candidate in candidates:
+        if candidate in lowered:
+            return lowered[candidate]
+    return None
+
+
+def read_csv_statement(
+    source,
+    trans_id: str = None,
+    amount: str = None,
+    reference: str = None,
+    delimiter: str = None,
+    encoding: str = "utf-8-sig",
+):
+    """
+    Stream `StatementRow` from a CSV statement (path or text file object).
+
+    Columns are found among TRANS_ID_FIELDS, AMOUNT_FIELDS and
+    REFERENCE_FIELDS unless named explicitly. The delimiter is sniffed from
+    the header line when not given.
+    """
+    handle, owned = _open(source, "r", encoding)
+    try:
+        header = handle.readline()
+        if delimiter is None:
+            delimiter = max(",;\t|", key=header.count)
+        columns = next(csv.reader([header], delimiter=delimiter), [])
+
+        trans_id = _pick(columns, TRANS_ID_FIELDS, trans_id)
+        if trans_id is None:
+            raise ValueError(f"no transaction id column in {columns!r}")
+        amount = _pick(columns, AMOUNT_FIELDS, amount)
+        reference = _pick(columns, REFERENCE_FIELDS, reference)
+
+        reader = csv.DictReader(handle, fieldnames=columns, delimiter=delimiter)
+        for row in reader:
+            value = (row.get(trans_id) or "").strip()
+            if not value:
+                continue
+            row_reference = (row.get(reference) or "").strip() if reference else ""
+            yield StatementRow(
+                value,
+                parse_amount(row.get(amount)) if amount else None,
+                row_reference or None,
+                reader.line_num + 1,
+            )
+    finally:
+        if owned:
+            handle.close()
+
+
+def read_xml_statement(
+    source,
+    record: str = "transaction",
+    trans_id: str = None,
+    amount: str = None,
+    reference: str = None,
+):
+    """
+    Stream `StatementRow` from an XML statement (path or binary file
+    object), one per `record` element. Fields are read from child elements
+    or attributes of the record; only the current record is kept in memory.
+    """
+    names = {
+        "trans_id": (trans_id,) if trans_id else TRANS_ID_FIELDS,
+        "amount": (amount,) if amount else AMOUNT_FIELDS,
+        "reference": (reference,) if reference else REFERENCE_FIELDS,
+    }
+    fields = {
+        name.lower(): field
+        for field, candidates in names.items()
+        for name in candidates
+    }
+    rows = []
+    current = None
+    field = None
+    texts = []
+
+    def start(tag, attrs):
+        nonlocal current, field
+        if tag == record:
+            current = {}
+            for name, value in attrs.items():
+                key = fields.get(name.lower())
+                if key is not None:
+                    current.setdefault(key, value)
+        elif current is not None:
+            field = fields.get(tag.lower())
+            texts.clear()
+
+    def end(tag):
+        nonlocal current, field
+        if tag == record and current is not None:
+            value = (current.get("trans_id") or "").strip()
+            if value:
+                rows.append(
+                    StatementRow(
+                        value,
+                        parse_amount(current.get("amount")),
+                        (current.get("reference") or "").strip() or None,
+                        parser.CurrentLineNumber,
+                    )
+                )
+            current = None
+        elif field is not None and current is not None:
+            current.setdefault(field, "".join(texts))
+            field = None
+
+    def text(data):
+        if field is not None:
+            texts.append(data)
+
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = text
+
+    handle, owned = _open(source, "rb")
+    try:
+        while True:
+            chunk = handle.read(_CHUNK_SIZE)
+            parser.Parse(chunk, not chunk)
+            yield from rows
+            rows.clear()
+            if not chunk:
+                break
+    finally:
+        if owned:
+            handle.close()
+
+
+def _record_fields(record):
+    """(trans_id, amount, reference) of one of our records."""
+    if isinstance(record, PaymentResult):
+        return record.trans_id, None, None
+    if isinstance(record, dict):
+        trans_id = (
+            record.get("trans_id") or record.get("trans-id") or record.get("transID")
+        )
+        return trans_id, record.get("amount"), record.get("reference")
+    if isinstance(record, (tuple, list)):
+        return (tuple(record) + (None, None))[:3]
+    return (
+        getattr(record, "trans_id", None),
+        getattr(record, "amount", None),
+        getattr(record, "reference", None),
+    )
+
+
+class Reconciler(object):
+    """
+    Match our transactions against an operator statement in one pass.
+
+    Our side is indexed by trans_id (and reference) in memory, the
+    statement is streamed: each row is matched, flagged as an amount
+    mismatch, a duplicate (seen twice in the statement or added twice on
+    our side) or unknown (not ours). Our transactions never seen in the
+    statement are reported as missing at the end. Memory is bounded by our
+    side, not by the statement: to flag repeated unknown rows as
+    duplicates, only the last `max_unknown` unknown trans_ids are kept.
+
+    Records may be `PaymentResult` (no amount check), dicts with
+    `trans_id`/`trans-id`, `amount` and `reference`, or
+    `(trans_id, amount, reference)` tuples.
+    """
+
+    def __init__(self, records=(), tolerance=0, max_unknown: int = 100000):
+        if not isinstance(max_unknown, int) or max_unknown < 0:
+            raise ValueError("value 'max_unknown' must be a non negative 'int'")
+
+        self._tolerance = parse_amount(tolerance) or Decimal(0)
+        self._max_unknown = max_unknown
+        # trans_id -> [amount, reference, times seen in the statement]
+        self._index = {}
+        self._references = {}
+        self._duplicates = []
+        self.extend(records)
+
+    def add(self, trans_id, amount=None, reference=None):
+        if not trans_id:
+            raise ValueError("value 'trans_id' must not be empty")
+
+        trans_id = str(trans_id).strip()
+        amount = parse_amount(amount)
+        if trans_id in self._index:
+            self._duplicates.append(
+                ReconciliationEntry(DUPLICATE, trans_id, reference, amount)
+            )
+            return
+        self._index[trans_id] = [amount, reference, 0]
+        if reference:
+            self._references[reference] = trans_id
+
+    def extend(self, records):
+        for record in records:
+            self.add(*_record_fields(record))
+
+    def __len__(self):
+        return len(self._index)
+
+    def _lookup(self, row):
+        entry = self._index.get(row.trans_id)
+        if entry is not None:
+            return row.trans_id, entry
+        if row.reference:
+            trans_id = self._references.get(row.reference)
+            if trans_id is not None:
+                return trans_id, self._index[trans_id]
+        return row.trans_id, None
+
+    def match(self, rows):
+        """Yield a `ReconciliationEntry` per statement row, then the missing ones."""
+        yield from self._duplicates
+        # insertion ordered, the oldest unknown trans_id is dropped first
+        unknown = {}
+        for row in rows:
+            trans_id, entry = self._lookup(row)
+            if entry is None:
+                kind = DUPLICATE if trans_id in unknown else UNKNOWN
+                unknown[trans_id] = None
+                if len(unknown) > self._max_unknown:
+                    del unknown[next(iter(unknown))]
+                yield ReconciliationEntry(
+                    kind, trans_id, row.reference, None, row.amount, row.line
+                )
+                continue
+
+            expected, reference, seen = entry
+            entry[2] = seen + 1
+            if seen:
+                kind = DUPLICATE
+            elif (
+                expected is not None
+                and row.amount is not None
+                and abs(expected - row.amount) > self._tolerance
+            ):
+                kind = AMOUNT_MISMATCH
+            else:
+                kind = MATCHED
+            yield ReconciliationEntry(
+                kind,
+                trans_id,
+                reference or row.reference,
+                expected,
+                row.amount,
+                row.line,
+            )
+
+        for trans_id, (expected, reference, seen) in self._index.items():
+            if not seen:
+                yield ReconciliationEntry(MISSING, trans_id, reference, expected)
+
+    def reconcile(
+        self, rows, keep=(AMOUNT_MISMATCH, DUPLICATE, MISSING, UNKNOWN)
+    ) -> ReconciliationReport:
+        """Run `match()` and collect a `ReconciliationReport`."""
+        report = ReconciliationReport(keep)
+        for entry in self.match(rows):
+            report.add(entry)
+        return report
+
+
+def reconcile(
+    records, statement, keep=(AMOUNT_MISMATCH, DUPLICATE, MISSING, UNKNOWN), **kwargs
+):
+    """
+    Reconcile `records` against a statement file: `.xml` files go through
+    `read_xml_statement`, anything else through `read_csv_statement`
+    (`kwargs` are passed to the reader).
+    """
+    name = str(getattr(statement, "name", statement))
+    reader = read_xml_statement if name.lower().endswith(".xml") else read_csv_statement
+    return Reconciler(records).reconcile(reader(statement, **kwargs), keep)
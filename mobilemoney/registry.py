@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+
+
+class ClientRegistry(object):
+    """
+    LRU cache of long-lived payment clients keyed by class and constructor
+    arguments (i.e. merchant credentials).
+
+    `get()` returns the cached client for the same credentials, building it
+    on first use. When credentials rotate, `invalidate()` drops the stale
+    clients so the next call builds new ones.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise ValueError("value 'maxsize' must be a positive 'int'")
+
+        self._maxsize = maxsize
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def maxsize(self):
+        return self._maxsize
+
+    def get(self, cls, *args):
+        key = (cls, args)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+
+            client = self._clients[key] = cls(*args)
+            if len(self._clients) > self._maxsize:
+                self._clients.popitem(last=False)
+            return client
+
+    def invalidate(self, cls=None, username: str = None) -> int:
+        """
+        Drop cached clients of class `cls` and/or API username `username`
+        (every client when both are None). Returns the number of dropped
+        clients.
+        """
+        with self._lock:
+            keys = [
+                key
+                for key, client in self._clients.items()
+                if (cls is None or issubclass(key[0], cls))
+                and (username is None or client.username == username)
+            ]
+            for key in keys:
+                del self._clients[key]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self):
+        return len(self._clients)
+
+    def __contains__(self, client):
+        with self._lock:
+            return any(cached is client for cached in self._clients.values())
+
+
+clients = ClientRegistry()
@@ -0,0 +1,89 @@
+_FIELDS = (
+    "provider",
+    "status",
+    "message",
+    "trans_id",
+    "success",
+    "latency",
+    "http_status",
+)
+
+
+class PaymentResult(object):
+    """
+    Outcome of a provider call, the same for every provider.
+
+    `status`, `message` and `trans_id` are the provider's own values (OM
+    `status`/`message`/`transID`, Moov `status`/`message`/`trans-id`,
+    Ligdicash `response_code` or `status`/`response_text`/`token`) and
+    `success` tells whether the payment went through. `data` keeps the
+    decoded JSON reply of Moov and Ligdicash, `raw` the response body only
+    for clients with `keep_raw` set.
+
+    For code written against the former return values, results can be read
+    like the dict (`result["trans-id"]`, `"token" in result`) and `json()`
+    returns `data`.
+    """
+
+    __slots__ = _FIELDS + ("data", "raw")
+
+    def __init__(
+        self,
+        provider: str,
+        status: str,
+        message: str = "",
+        trans_id: str = "",
+        success: bool = False,
+        latency: float = None,
+        http_status: int = None,
+        data: dict = None,
+        raw: bytes = None,
+    ):
+        self.provider = provider
+        self.status = status
+        self.message = message
+        self.trans_id = trans_id
+        self.success = success
+        self.latency = latency
+        self.http_status = http_status
+        self.data = data
+        self.raw = raw
+
+    @property
+    def ok(self):
+        return self.success
+
+    def __getitem__(self, key):
+        data = self.data
+        if data is not None and key in data:
+            return data[key]
+        if key in _FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        data = self.data
+        return (data is not None and key in data) or key in _FIELDS
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def json(self):
+        return self.data
+
+    def to_dict(self) -> dict:
+        result = {field: getattr(self, field) for field in _FIELDS}
+        if self.data is not None:
+            result["data"] = self.data
+        if self.raw is not None:
+            result["raw"] = self.raw
+        return result
+
+    def __repr__(self):
+        return (
+            f"PaymentResult(provider={self.provider!r}, status={self.status!r}, "
+            f"trans_id={self.trans_id!r}, success={self.success!r})"
+        )
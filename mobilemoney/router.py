@@ -0,0 +1,286 @@
+import threading
+import time
+
+from mobilemoney.policy import CircuitBreaker
+
+ORANGEMONEY = "orangemoney"
+MOOVMONEY = "moovmoney"
+LIGDICASH = "ligdicash"
+
+# first two digits of the 8 digit Burkina Faso mobile numbers
+PREFIXES = {
+    ORANGEMONEY: ("04", "05", "06", "07", "54", "55", "56", "57")
+    + ("64", "65", "66", "67", "74", "75", "76", "77"),
+    MOOVMONEY: ("01", "02", "03", "50", "51", "52", "53", "60")
+    + ("61", "62", "63", "70", "71", "72", "73"),
+}
+_OPERATORS = {prefix: name for name, values in PREFIXES.items() for prefix in values}
+
+
+def normalize_phone(phone: str) -> str:
+    """Local 8 digit number from `phone` (spaces and +226/00226 removed)."""
+    phone = "".join(char for char in str(phone) if char.isdigit())
+    if len(phone) == 13 and phone.startswith("00226"):
+        return phone[5:]
+    if len(phone) == 11 and phone.startswith("226"):
+        return phone[3:]
+    return phone
+
+
+def operator_for(phone: str):
+    """`orangemoney`, `moovmoney` or None when the number is unknown."""
+    phone = normalize_phone(phone)
+    return _OPERATORS.get(phone[:2]) if len(phone) == 8 else None
+
+
+class PaymentRequest(object):
+    """
+    Provider independent payment. `command` (a Ligdicash invoice) makes the
+    request eligible for the aggregator when the direct operator is
+    degraded; `provider` forces the provider.
+    """
+
+    __slots__ = (
+        "customer_phone",
+        "amount",
+        "message",
+        "otp",
+        "otp_trans_id",
+        "reference",
+        "command",
+        "provider",
+        "idempotency_key",
+    )
+
+    def __init__(
+        self,
+        customer_phone: str,
+        amount: int,
+        message: str = "",
+        otp: str = "",
+        otp_trans_id: str = None,
+        reference: str = None,
+        command: dict = None,
+        provider: str = None,
+        idempotency_key: str = None,
+    ):
+        if provider is not None and provider not in (
+            ORANGEMONEY,
+            MOOVMONEY,
+            LIGDICASH,
+        ):
+            raise ValueError(
+                f"value 'provider' must be one of '{ORANGEMONEY},{MOOVMONEY},{LIGDICASH}'"
+            )
+
+        self.customer_phone = normalize_phone(customer_phone)
+        self.amount = amount
+        self.message = message
+        self.otp = otp
+        self.otp_trans_id = otp_trans_id
+        self.reference = reference
+        self.command = command
+        self.provider = provider
+        self.idempotency_key = idempotency_key
+
+
+class ProviderHealth(object):
+    """
+    Exponentially weighted latency and error rate of one provider, as seen
+    by the router (`alpha` is the weight of the latest call).
+    """
+
+    def __init__(self, alpha: float = 0.2):
+        if not 0 < alpha <= 1:
+            raise ValueError("value 'alpha' must be in ]0, 1]")
+
+        self._alpha = alpha
+        self._lock = threading.Lock()
+        self.latency = None
+        self.error_rate = 0.0
+        self.calls = 0
+        self.updated = time.monotonic()
+
+    def observe(self, elapsed: float, failed: bool):
+        with self._lock:
+            alpha = self._alpha
+            if self.latency is None:
+                self.latency = elapsed
+            else:
+                self.latency += alpha * (elapsed - self.latency)
+            self.error_rate += alpha * ((1.0 if failed else 0.0) - self.error_rate)
+            self.calls += 1
+            self.updated = time.monotonic()
+
+    def probe(self, interval: float) -> bool:
+        """True at most once per `interval` seconds without new samples."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self.updated < interval:
+                return False
+            self.updated = now
+            return True
+
+
+class PaymentRouter(object):
+    """
+    Single entry point for OM, Moov and Ligdicash payments.
+
+    `pay()` takes a `PaymentRequest` and sends it to the provider asked for,
+    else to the operator of the customer number. When that operator is
+    degraded (circuit open, EWMA latency above `max_latency` seconds or
+    error rate above `max_error_rate`) and the request carries a Ligdicash
+    `command`, it goes through Ligdicash instead, except for one probe every
+    `probe_interval` seconds that lets the operator prove it recovered.
+    Clients may be sync or async ones (then use `pay_async()`).
+    """
+
+    def __init__(
+        self,
+        orangemoney=None,
+        moovmoney=None,
+        ligdicash=None,
+        max_latency: float = 5.0,
+        max_error_rate: float = 0.5,
+        alpha: float = 0.2,
+        probe_interval: float = 30.0,
+    ):
+        self._clients = {
+            name: client
+            for name, client in (
+                (ORANGEMONEY, orangemoney),
+                (MOOVMONEY, moovmoney),
+                (LIGDICASH, ligdicash),
+            )
+            if client is not None
+        }
+        if not self._clients:
+            raise ValueError("at least one payment client is required")
+
+        self._max_latency = max_latency
+        self._max_error_rate = max_error_rate
+        self._probe_interval = probe_interval
+        self._health = {name: ProviderHealth(alpha) for name in self._clients}
+
+    @property
+    def clients(self):
+        return dict(self._clients)
+
+    def degraded(self, provider: str) -> bool:
+        client = self._clients.get(provider)
+        if client is None:
+            return True
+        if client.circuit.state == CircuitBreaker.OPEN:
+            return True
+
+        health = self._health[provider]
+        return health.error_rate > self._max_error_rate or (
+            health.latency is not None and health.latency > self._max_latency
+        )
+
+    def _check(self, request):
+        if not isinstance(request, PaymentRequest):
+            raise ValueError("value 'request' must be type of 'PaymentRequest'")
+        amount = request.amount
+        if isinstance(amount, bool) or not isinstance(amount, int) or amount <= 0:
+            raise ValueError("value 'amount' must be a positive 'int'")
+
+    def route(self, request: PaymentRequest) -> str:
+        """Name of the provider `request` would be sent to."""
+        self._check(request)
+        if request.provider is not None:
+            if request.provider not in self._clients:
+                raise ValueError(f"no client for provider '{request.provider}'")
+            return request.provider
+
+        provider = operator_for(request.customer_phone)
+        eligible = request.command is not None and LIGDICASH in self._clients
+        if provider is not None and provider in self._clients:
+            if not eligible or not self.degraded(provider):
+                return provider
+            if self.degraded(LIGDICASH):
+                return provider
+            if self._health[provider].probe(self._probe_interval):
+                return provider
+            return LIGDICASH
+        if eligible:
+            return LIGDICASH
+        raise ValueError(f"no provider for number '{request.customer_phone}'")
+
+    def _call(self, provider, request):
+        client = self._clients[provider]
+        if provider == ORANGEMONEY:
+            return client.validate_payment(
+                request.customer_phone,
+                request.otp,
+                request.amount,
+                request.message,
+                reference=request.reference,
+                idempotency_key=request.idempotency_key,
+            )
+        if provider == MOOVMONEY:
+            return client.validate_payment(
+                request.customer_phone,
+                request.otp,
+                request.amount,
+                request.message,
+                request.otp_trans_id,
+                idempotency_key=request.idempotency_key,
+            )
+        if request.command is None:
+            raise ValueError("value 'command' is required for a Ligdicash payment")
+        return client.validate_payment(
+            request.command, idempotency_key=request.idempotency_key
+        )
+
+    def _failed(self, provider, result) -> bool:
+        """Whether `result` is a transport error rather than an answer."""
+        if provider == ORANGEMONEY and result.status in ("OM-500", "-100"):
+            return True
+        return result.http_status is None or result.http_status >= 500
+
+    def _observe(self, provider, started, result=None, error=None):
+        failed = error is not None or self._failed(provider, result)
+        self._health[provider].observe(time.monotonic() - started, failed)
+
+    def pay(self, request: PaymentRequest):
+        """
+        `(provider, PaymentResult)`. Invalid arguments raise ValueError or
+        TypeError and are not counted against the provider health.
+        """
+        provider = self.route(request)
+        started = time.monotonic()
+        try:
+            result = self._call(provider, request)
+        except (ValueError, TypeError):
+            raise
+        except Exception as exp:
+            self._observe(provider, started, error=exp)
+            raise
+        self._observe(provider, started, result)
+        return provider, result
+
+    async def pay_async(self, request: PaymentRequest):
+        provider = self.route(request)
+        started = time.monotonic()
+        try:
+            result = await self._call(provider, request)
+        except (ValueError, TypeError):
+            raise
+        except Exception as exp:
+            self._observe(provider, started, error=exp)
+            raise
+        self._observe(provider, started, result)
+        return provider, result
+
+    def health(self) -> dict:
+        return {
+            name: {
+                "latency": health.latency,
+                "error_rate": health.error_rate,
+                "calls": health.calls,
+                "circuit": self._clients[name].circuit.state,
+                "degraded": self.degraded(name),
+            }
+            for name, health in self._health.items()
+        }
@@ -0,0 +1,167 @@
+import base64
+import json as jsonlib
+import threading
+from datetime import timedelta
+from urllib.parse import urlencode, urlsplit
+
+
+class Response(object):
+    """
+    HTTP response as seen by the payment classes, a subset of
+    `requests.Response` (`status_code`, `content`, `text`, `json()`,
+    `elapsed`).
+
+    `content` is the body exactly as read from the socket: `parse_result`
+    and `json()` work on these bytes, `text` is only decoded when accessed.
+    """
+
+    __slots__ = ("status_code", "content", "headers", "url", "reason", "elapsed")
+
+    def __init__(
+        self,
+        status_code=500,
+        content=b"",
+        headers=None,
+        url="",
+        reason="",
+        elapsed=None,
+    ):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers if headers is not None else {}
+        self.url = url
+        self.reason = reason
+        self.elapsed = elapsed if elapsed is not None else timedelta(0)
+
+    @property
+    def text(self):
+        return bytes(self.content).decode("utf-8", errors="replace")
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def json(self, **kwargs):
+        return jsonlib.loads(self.content, **kwargs)
+
+    def __repr__(self):
+        return f"<Response [{self.status_code}]>"
+
+
+class Transport(object):
+    """
+    Sends the HTTP requests of the payment classes.
+
+    `request()` takes the `requests` keyword arguments used by the clients
+    (`params`, `headers`, `data`, `json`, `auth`, `timeout`, `verify`) and
+    returns an object with the `Response` attributes. `ConnectionPool`
+    (requests), `Urllib3Transport` (the default) and `FakeTransport` are
+    provided.
+
+    Transports with `asynchronous` set (`AsyncConnectionPool`) implement
+    `request()` and `close()` as coroutines. The async clients accept any
+    transport and run the others in the event loop's executor.
+    """
+
+    asynchronous = False
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+
+def auth_pair(auth):
+    if isinstance(auth, (tuple, list)):
+        return auth[0], auth[1]
+    return auth.username, auth.password
+
+
+def basic_auth(auth) -> str:
+    """`Authorization` header value for a (username, password) pair."""
+    username, password = auth_pair(auth)
+    token = base64.b64encode(f"{username}:{password}".encode("latin1"))
+    return f"Basic {token.decode('ascii')}"
+
+
+def split_timeout(timeout):
+    if isinstance(timeout, (tuple, list)):
+        return timeout[0], timeout[1]
+    return timeout, timeout
+
+
+def request_target(url: str, params=None) -> str:
+    """Path and query of `url`, with `params` appended to the query."""
+    parts = urlsplit(url)
+    target = parts.path or "/"
+    query = parts.query
+    if params:
+        query = "&".join(filter(None, [query, urlencode(params)]))
+    return f"{target}?{query}" if query else target
+
+
+def encode_body(data=None, json=None):
+    """
+    Request body and its default content type. Bytes-like bodies (bytes,
+    bytearray, memoryview) are returned as they are, without a copy.
+    """
+    if json is not None:
+        return jsonlib.dumps(json).encode("utf-8"), "application/json"
+    if isinstance(data, str):
+        return data.encode("utf-8"), None
+    if isinstance(data, dict):
+        return urlencode(data).encode("ascii"), "application/x-www-form-urlencoded"
+    return data or b"", None
+
+
+class FakeTransport(Transport):
+    """
+    In-process transport for tests and benchmarks, no socket is opened.
+
+    Replies are registered per method and URL (query string excluded) with
+    `add()`, either as fixed values or as a callable
+    `reply(method, url, **kwargs)` returning a `Response` or a
+    `(status_code, content)` tuple. Unknown routes get `handler` when given,
+    else a 404. With `record`, every call is kept in `calls` as
+    `(method, url, kwargs)`.
+    """
+
+    def __init__(self, handler=None, record: bool = True):
+        self._routes = {}
+        self._handler = handler
+        self._record = record
+        self._lock = threading.Lock()
+        self._count = 0
+        self.calls = []
+
+    def add(self, method: str, url: str, reply=b"", status_code=200, headers=None):
+        if not callable(reply):
+            content = reply.encode("utf-8") if isinstance(reply, str) else reply
+            fixed = (status_code, content, headers)
+            reply = lambda method, url, **kwargs: fixed  # noqa: E731
+        self._routes[(method.upper(), url.split("?", 1)[0])] = reply
+        return self
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        with self._lock:
+            self._count += 1
+            if self._record:
+                self.calls.append((method, url, kwargs))
+
+        reply = self._routes.get((method.upper(), url.split("?", 1)[0]), self._handler)
+        if reply is None:
+            return Response(404, b"Not Found", url=url, reason="Not Found")
+
+        result = reply(method, url, **kwargs)
+        if isinstance(result, Response):
+            return result
+        status_code, content = result[0], result[1]
+        headers = result[2] if len(result) > 2 else None
+        return Response(status_code, content, headers, url)
+
+    def stats(self) -> dict:
+        return {"requests": self._count}
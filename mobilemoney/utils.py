@@ -1,6 +1,184 @@
-from datetime import datetime
+import json
+import os
+import threading
+import time
+from json.encoder import encode_basestring
+
+try:
+    import orjson
+except ImportError:  # optional, only makes JSON encoding faster
+    orjson = None
+
+# sequence numbers per second and per node: 6 digits
+_SEQUENCE_LIMIT = 1000000
+
+_json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _default_node() -> str:
+    """Random 48 bits node id, as 12 hex digits."""
+    # a hash of host name and pid only had 24 bits: ~3% chance of a
+    # collision over 1000 processes, hence duplicate references
+    return os.urandom(6).hex()
+
+
+class ReferenceGenerator(object):
+    """
+    Unique, time-sortable transaction references:
+
+        yymmdd.HHMMSS.<node>.<sequence>
+
+    `node` tells hosts and processes apart (`MOBILEMONEY_NODE_ID`, else 48
+    random bits drawn per process, again after a fork; a fixed node gets
+    the pid of forked children appended) and `sequence` counts the
+    references made by this node within the second. Times are UTC, so
+    references do not repeat when daylight saving time ends.
+    References never go backwards: when the clock does, or when more than a
+    million references are made in one second, the second is carried over.
+    Generators sharing a node share its sequences: use one per node, such
+    as the module-level `references`.
+    """
+
+    def __init__(self, node: str = None):
+        if node is not None and not isinstance(node, str):
+            raise ValueError("value 'node' must be type of 'str'")
+
+        self._node = node or os.environ.get("MOBILEMONEY_NODE_ID")
+        self._fixed_node = self._node
+        self._pid = os.getpid()
+        if not self._fixed_node:
+            self._node = _default_node()
+        self._lock = threading.Lock()
+        self._second = 0
+        self._sequence = 0
+        self._prefix = ""
+
+    @property
+    def node(self):
+        return self._node
+
+    def _reserve(self, count: int):
+        """Reserve `count` sequence numbers: (prefix, first sequence)."""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._second = self._sequence = 0
+                if self._fixed_node:
+                    # the parent keeps the fixed id, its children must not
+                    self._node = f"{self._fixed_node}-{self._pid}"
+                else:
+                    self._node = _default_node()
+
+            now = int(time.time())
+            if now > self._second:
+                self._second, self._sequence = now, 0
+                self._prefix = ""
+            elif self._sequence + count > _SEQUENCE_LIMIT:
+                self._second, self._sequence = self._second + 1, 0
+                self._prefix = ""
+
+            if not self._prefix:
+                stamp = time.strftime("%y%m%d.%H%M%S", time.gmtime(self._second))
+                self._prefix = f"{stamp}.{self._node}."
+            first = self._sequence
+            self._sequence += count
+            return self._prefix, first
+
+    def next(self) -> str:
+        prefix, sequence = self._reserve(1)
+        return f"{prefix}{sequence:06d}"
+
+    def generate(self, n: int) -> list:
+        """`n` consecutive references (at most one million per call)."""
+        if not isinstance(n, int) or not 0 < n <= _SEQUENCE_LIMIT:
+            raise ValueError(f"value 'n' must be an 'int' in 1..{_SEQUENCE_LIMIT}")
+
+        prefix, first = self._reserve(n)
+        return [f"{prefix}{sequence:06d}" for sequence in range(first, first + n)]
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        return self.next()
+
+
+references = ReferenceGenerator()
 
 
 def get_reference():
-    reference = datetime.now().strftime("%y%m%d.%H%M%S.%f")
-    return reference
+    return references.next()
+
+
+def json_dumps(value) -> bytes:
+    """Compact UTF-8 JSON, encoded by orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return _json_encoder.encode(value).encode("utf-8")
+
+
+class _Field(object):
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class JSONTemplate(object):
+    """
+    JSON document of a fixed shape, encoded once.
+
+    Values marked with `JSONTemplate.field(name)` are left out of the
+    encoding: `render(**values)` only encodes those and joins them with the
+    pre-encoded parts of the document. `bytes` values are taken as JSON
+    that is already encoded.
+
+        template = JSONTemplate({"amount": JSONTemplate.field("amount")})
+        template.render(amount=100)  # b'{"amount":100}'
+    """
+
+    field = _Field
+
+    def __init__(self, document):
+        fields = []
+
+        def mark(value):
+            if isinstance(value, _Field):
+                fields.append(value.name)
+                return f"\x00{value.name}\x00"
+            if isinstance(value, dict):
+                return {key: mark(item) for key, item in value.items()}
+            if isinstance(value, (list, tuple)):
+                return [mark(item) for item in value]
+            return value
+
+        encoded = json_dumps(mark(document))
+        parts = []
+        for name in fields:
+            part, encoded = encoded.split(json_dumps(f"\x00{name}\x00"), 1)
+            parts.append(part)
+        parts.append(encoded)
+
+        self._fields = tuple(fields)
+        self._parts = tuple(parts)
+
+    @property
+    def fields(self):
+        return self._fields
+
+    def render(self, **values) -> bytes:
+        parts = self._parts
+        chunks = [parts[0]]
+        for index, name in enumerate(self._fields, 1):
+            value = values[name]
+            # strings and ints, the usual fields, skip the encoder call
+            if type(value) is str:
+                chunks.append(encode_basestring(value).encode("utf-8"))
+            elif type(value) is int:
+                chunks.append(b"%d" % value)
+            elif type(value) is bytes:
+                chunks.append(value)
+            else:
+                chunks.append(json_dumps(value))
+            chunks.append(parts[index])
+        return b"".join(chunks)
@@ -0,0 +1,311 @@
+import itertools
+import multiprocessing
+import pickle
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from mobilemoney.base import BasePayment
+from mobilemoney.batch import BatchResult
+from mobilemoney.pool import Urllib3Transport, set_default_pool
+from mobilemoney.registry import clients
+
+
+class ProcessItem(object):
+    """
+    One payment operation for `ProcessValidator`. The worker runs
+    `clients.get(cls, *client_args).<method>(*args, **kwargs)`, so clients
+    are described by class and constructor arguments rather than passed as
+    instances. `key` is carried over to the matching `BatchResult`.
+    """
+
+    __slots__ = ("cls", "client_args", "method", "args", "kwargs", "key")
+
+    def __init__(
+        self,
+        cls,
+        client_args: tuple,
+        *args,
+        method="validate_payment",
+        key=None,
+        **kwargs,
+    ):
+        if not isinstance(cls, type) or not issubclass(cls, BasePayment):
+            raise ValueError("value 'cls' must be a subclass of 'BasePayment'")
+
+        if not callable(getattr(cls, method, None)):
+            raise ValueError(f"'{cls.__name__}' has no method '{method}'")
+
+        self.cls = cls
+        self.client_args = tuple(client_args)
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+
+    @property
+    def provider(self):
+        return self.cls.provider
+
+    @property
+    def shard(self) -> int:
+        """Stable hash of the merchant credentials."""
+        credential = (
+            f"{self.cls.__module__}.{self.cls.__qualname__}:{self.client_args!r}"
+        )
+        return zlib.crc32(credential.encode("utf-8"))
+
+
+def _dumps(job_id, result, error, elapsed) -> bytes:
+    try:
+        return pickle.dumps((job_id, result, error, elapsed))
+    except Exception as exp:
+        error = RuntimeError(f"result of job {job_id} cannot be sent back: {exp}")
+        return pickle.dumps((job_id, None, error, elapsed))
+
+
+def _worker(jobs, results, threads):
+    # connections inherited from the parent must not be shared
+    set_default_pool(Urllib3Transport(pool_size=threads))
+    executor = ThreadPoolExecutor(threads, thread_name_prefix="mobilemoney-worker")
+
+    def run(job_id, cls, client_args, method, args, kwargs):
+        started = time.monotonic()
+        result = error = None
+        try:
+            result = getattr(clients.get(cls, *client_args), method)(*args, **kwargs)
+        except Exception as exp:
+            error = exp
+        results.put(_dumps(job_id, result, error, time.monotonic() - started))
+
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            job_id, payload = job
+            try:
+                # pickled by `submit()`, loading may still fail (spawn context)
+                executor.submit(run, job_id, *pickle.loads(payload))
+            except Exception as exp:
+                results.put(_dumps(job_id, None, exp, 0.0))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        executor.shutdown()
+
+
+class ProcessValidator(object):
+    """
+    Run payment operations in a pool of worker processes, past the GIL.
+
+    `processes` workers (one per core by default) are started up front,
+    each running `threads` calls at a time with its own connection pool and
+    client registry. Workers start cold: a worker builds the client of a
+    merchant and opens its connections on the first job for that merchant.
+    Items are sharded by merchant credentials, so later jobs of a merchant
+    land on the same worker and reuse them. Results are `BatchResult`
+    instances, as with `BatchValidator`.
+
+    Rate limits shared between workers need a `SQLiteRateBackend`.
+
+    A worker that dies (out of memory, crash) is replaced; the calls it was
+    running are completed with an error, as their outcome is unknown.
+    """
+
+    # seconds between two checks of the worker processes
+    check_interval = 0.5
+
+    def __init__(self, processes: int = None, threads: int = 8, context=None):
+        processes = processes or multiprocessing.cpu_count()
+        if not isinstance(processes, int) or processes < 1:
+            raise ValueError("value 'processes' must be a positive 'int'")
+
+        if not isinstance(threads, int) or threads < 1:
+            raise ValueError("value 'threads' must be a positive 'int'")
+
+        context = context or multiprocessing.get_context()
+        self._context = context
+        self._threads = threads
+        self._ids = itertools.count()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._results = context.Queue()
+        self._closed = False
+        self._jobs = [None] * processes
+        self._processes = [None] * processes
+        for index in range(processes):
+            self._start_worker(index)
+
+        self._collector = threading.Thread(
+            target=self._collect, name="mobilemoney-collector", daemon=True
+        )
+        self._collector.start()
+
+    @property
+    def processes(self):
+        return len(self._processes)
+
+    @property
+    def threads(self):
+        return self._threads
+
+    def _start_worker(self, index):
+        # a fresh queue: a process killed while reading may leave it locked
+        jobs = self._jobs[index] = self._context.Queue()
+        process = self._processes[index] = self._context.Process(
+            target=_worker,
+            args=(jobs, self._results, self._threads),
+            name=f"mobilemoney-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+
+    def _deliver(self, message) -> bool:
+        if message is None:
+            return False
+
+        job_id, result, error, elapsed = pickle.loads(message)
+        with self._lock:
+            pending = self._pending.pop(job_id, None)
+        if pending is not None:
+            item, future, _ = pending
+            future.set_result(BatchResult(item, result, error, elapsed))
+        return True
+
+    def _dead_workers(self) -> list:
+        with self._lock:
+            if self._closed:
+                return []
+            return [
+                index
+                for index, process in enumerate(self._processes)
+                if not process.is_alive()
+            ]
+
+    def _replace_workers(self, dead):
+        failed = []
+        with self._lock:
+            if self._closed:
+                return
+            for index in dead:
+                process = self._processes[index]
+                error = RuntimeError(
+                    f"worker '{process.name}' exited with code {process.exitcode}, "
+                    "outcome of the call unknown"
+                )
+                for job_id, (item, future, worker) in list(self._pending.items()):
+                    if worker == index:
+                        del self._pending[job_id]
+                        failed.append((item, future, error))
+                self._start_worker(index)
+
+        for item, future, error in failed:
+            future.set_result(BatchResult(item, error=error))
+
+    def _collect(self):
+        next_check = time.monotonic() + self.check_interval
+        while True:
+            try:
+                message = self._results.get(timeout=self.check_interval)
+            except queue.Empty:
+                pass
+            else:
+                if not self._deliver(message):
+                    break
+
+            if time.monotonic() < next_check:
+                continue
+            next_check = time.monotonic() + self.check_interval
+            dead = self._dead_workers()
+            if not dead:
+                continue
+
+            # results sent by the dead workers before they exited come first
+            while True:
+                try:
+                    message = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                if not self._deliver(message):
+                    return
+            self._replace_workers(dead)
+
+    def submit(self, item: ProcessItem) -> Future:
+        """Future resolved with the `BatchResult` of `item`."""
+        if not isinstance(item, ProcessItem):
+            raise ValueError("value 'item' must be type of 'ProcessItem'")
+
+        if self._closed:
+            raise RuntimeError("ProcessValidator is shut down")
+
+        job_id = next(self._ids)
+        future = Future()
+        try:
+            # pickled here: the queue would pickle it in a feeder thread where
+            # an error only prints a traceback and the future never resolves
+            payload = pickle.dumps(
+                (item.cls, item.client_args, item.method, item.args, item.kwargs)
+            )
+        except Exception as exp:
+            error = ValueError(f"item cannot be sent to a worker: {exp}")
+            future.set_result(BatchResult(item, error=error))
+            return future
+
+        index = item.shard % len(self._jobs)
+        with self._lock:
+            self._pending[job_id] = (item, future, index)
+            self._jobs[index].put((job_id, payload))
+        return future
+
+    def run(self, items):
+        """
+        Submit `items` lazily (at most two calls per worker thread ahead) and
+        yield their `BatchResult` in completion order.
+        """
+        items = iter(items)
+        window = len(self._processes) * self._threads * 2
+        futures = set()
+        exhausted = False
+
+        while True:
+            while not exhausted and len(futures) < window:
+                try:
+                    futures.add(self.submit(next(items)))
+                except StopIteration:
+                    exhausted = True
+            if not futures:
+                return
+
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+    def shutdown(self, timeout: float = None):
+        if self._closed:
+            return
+
+        with self._lock:
+            self._closed = True
+        for jobs in self._jobs:
+            jobs.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+        self._results.put(None)
+        self._collector.join()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for item, future, _ in pending.values():
+            error = RuntimeError("worker stopped before the job completed")
+            future.set_result(BatchResult(item, error=error))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
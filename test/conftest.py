@@ -0,0 +1,56 @@
+import pytest
+
+from mobilemoney.ligdicash import GenericPaymentWithRedirect
+from mobilemoney.moovmoney import GenericPayment as MoovPayment
+from mobilemoney.orangemoney import GenericPayment as OMPayment
+from mobilemoney.policy import ProviderPolicy
+from mobilemoney.transport import FakeTransport
+
+OM_URL = "http://om.test/payment"
+MOOV_URL = "http://moov.test/3pp/transaction/process"
+LIGDICASH_URL = "http://ligdicash.test/create"
+LIGDICASH_VERIFY_URL = "http://ligdicash.test/confirm"
+
+OM_OK = (
+    b"<status>200</status><message>Paiement effectue avec succes</message>"
+    b"<transID>OM.2310.1712.0001</transID>"
+)
+OM_ARGS = ("76000000", "1234", 1000, "Achat")
+
+
+def make_policy(**kwargs):
+    """Policy without backoff delays, so that retries do not slow tests."""
+    kwargs.setdefault("backoff_base", 0.0)
+    kwargs.setdefault("reset_timeout", 0.05)
+    return ProviderPolicy(**kwargs)
+
+
+@pytest.fixture
+def transport():
+    return FakeTransport()
+
+
+@pytest.fixture
+def om(transport):
+    client = OMPayment(OM_URL, "70000000", "om-merchant", "secret")
+    client.pool = transport
+    client.policy = make_policy()
+    return client
+
+
+@pytest.fixture
+def moov(transport):
+    client = MoovPayment(MOOV_URL, "moov-merchant", "secret")
+    client.pool = transport
+    client.policy = make_policy()
+    return client
+
+
+@pytest.fixture
+def ligdicash(transport):
+    client = GenericPaymentWithRedirect(
+        LIGDICASH_URL, "apikey", "apitoken", LIGDICASH_VERIFY_URL
+    )
+    client.pool = transport
+    client.policy = make_policy()
+    return client
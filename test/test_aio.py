@@ -0,0 +1,166 @@
+import asyncio
+
+import pytest
+
+from mobilemoney import moovmoney, moovmoney_aio
+from mobilemoney.aio import AsyncConnectionPool
+from mobilemoney.ligdicash_aio import AsyncGenericPaymentWithRedirect
+from mobilemoney.moovmoney_aio import AsyncGenericPayment as AsyncMoovPayment
+from mobilemoney.orangemoney_aio import AsyncGenericPayment as AsyncOMPayment
+
+from test.conftest import (
+    LIGDICASH_URL,
+    LIGDICASH_VERIFY_URL,
+    MOOV_URL,
+    OM_ARGS,
+    OM_OK,
+    OM_URL,
+    make_policy,
+)
+
+OK = b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok"
+
+
+def async_client(cls, transport, *args):
+    client = cls(*args)
+    client.async_pool = transport
+    client.policy = make_policy()
+    return client
+
+
+def test_moov_constructors_keep_their_signature():
+    client = moovmoney.GenericPayment(MOOV_URL, "user", "pwd")
+    assert (client.url, client.username, client.password) == (MOOV_URL, "user", "pwd")
+
+    for cls in (
+        moovmoney.Payment,
+        moovmoney.DevPayment,
+        moovmoney_aio.AsyncPayment,
+        moovmoney_aio.AsyncDevPayment,
+    ):
+        client = cls("70000000", "user", "pwd")
+        assert (client.phonenumber, client.username, client.password) == (
+            "70000000",
+            "user",
+            "pwd",
+        )
+
+
+def test_async_providers(transport):
+    transport.add("POST", OM_URL, OM_OK)
+    transport.add("POST", MOOV_URL, b'{"status": "0", "trans-id": "MM1"}')
+    transport.add("POST", LIGDICASH_URL, b'{"response_code": "00", "token": "t"}')
+    transport.add("GET", LIGDICASH_VERIFY_URL, b'{"status": "completed"}')
+
+    om = async_client(AsyncOMPayment, transport, OM_URL, "7", "u", "p")
+    moov = async_client(AsyncMoovPayment, transport, MOOV_URL, "u", "p")
+    ligdicash = async_client(
+        AsyncGenericPaymentWithRedirect, transport, LIGDICASH_URL, "k", "t"
+    )
+    ligdicash.verify_url = LIGDICASH_VERIFY_URL
+
+    async def main():
+        return await asyncio.gather(
+            om.validate_payment(*OM_ARGS),
+            moov.send_otp("76000000", 1000),
+            moov.validate_payment("76000000", "1234", 1000, "m", "MM1"),
+            ligdicash.validate_payment({"invoice": {}}),
+            ligdicash.verify_token("t"),
+        )
+
+    paid, otp, moov_paid, invoice, (completed, _) = asyncio.run(main())
+
+    assert paid.success and moov_paid.success and invoice.success and completed
+    assert otp["trans-id"] == "MM1"
+
+
+async def serve(handle):
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"http://127.0.0.1:{port}/pay"
+
+
+async def read_request(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            await reader.readexactly(int(line.split(b":")[1]))
+    return head
+
+
+def test_pool_reuses_connections():
+    async def main():
+        async def handle(reader, writer):
+            while True:
+                try:
+                    await read_request(reader)
+                except asyncio.IncompleteReadError:
+                    return
+                writer.write(OK)
+                await writer.drain()
+
+        server, url = await serve(handle)
+        pool = AsyncConnectionPool(pool_size=2)
+        try:
+            for _ in range(3):
+                response = await pool.request("POST", url, data=b"x", timeout=2)
+                assert response.content == b"ok"
+            return pool.stats()
+        finally:
+            await pool.close()
+            server.close()
+
+    stats = asyncio.run(main())
+
+    assert stats["opened"] == 1
+    assert stats["reused"] == 2
+
+
+@pytest.mark.parametrize(
+    "mode, sent, outcome",
+    [
+        # closed while idle: the request never reached the server, sent again
+        ("idle", 2, 200),
+        # dropped in the middle of the answer: a payment is never sent twice
+        ("partial", 2, "IncompleteReadError"),
+    ],
+)
+def test_pool_resends_only_unprocessed_requests(mode, sent, outcome):
+    requests = []
+
+    async def main():
+        async def handle(reader, writer):
+            while True:
+                try:
+                    await read_request(reader)
+                except asyncio.IncompleteReadError:
+                    return
+                requests.append(1)
+                if mode == "partial" and len(requests) == 2:
+                    writer.write(b"HTTP/1.1 20")
+                    await writer.drain()
+                    writer.close()
+                    return
+                writer.write(OK)
+                await writer.drain()
+                if mode == "idle":
+                    writer.close()
+                    return
+
+        server, url = await serve(handle)
+        pool = AsyncConnectionPool()
+        try:
+            await pool.request("POST", url, data=b"x", timeout=2)
+            await asyncio.sleep(0.05)
+            try:
+                return (
+                    await pool.request("POST", url, data=b"x", timeout=2)
+                ).status_code
+            except asyncio.IncompleteReadError as exp:
+                return type(exp).__name__
+        finally:
+            await pool.close()
+            server.close()
+
+    assert asyncio.run(main()) == outcome
+    assert len(requests) == sent
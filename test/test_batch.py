@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from mobilemoney.batch import BatchItem, BatchValidator, validate_payments
+
+from test.conftest import MOOV_URL, OM_ARGS, OM_OK, OM_URL
+
+
+def test_item_validation(om):
+    with pytest.raises(ValueError):
+        BatchItem(object())
+    with pytest.raises(ValueError):
+        BatchItem(om, method="missing")
+    with pytest.raises(ValueError):
+        BatchValidator(max_workers=0)
+    with pytest.raises(ValueError):
+        BatchValidator(limits={"moovmoney": 0})
+
+
+def test_every_item_gets_a_result(om, transport):
+    transport.add("POST", OM_URL, OM_OK)
+    items = [BatchItem(om, *OM_ARGS, key=index) for index in range(20)]
+    items.append(BatchItem(om, key="bad"))  # missing arguments
+
+    results = {result.key: result for result in validate_payments(items, 4)}
+
+    assert len(results) == 21
+    assert all(results[index].result.success for index in range(20))
+    assert isinstance(results["bad"].error, TypeError)
+    assert not results["bad"].ok
+
+
+def test_provider_limit(om, moov, transport):
+    running = {"orangemoney": 0, "moovmoney": 0}
+    peak = dict(running)
+    lock = threading.Lock()
+
+    def slow(provider, content):
+        def reply(method, url, **kwargs):
+            with lock:
+                running[provider] += 1
+                peak[provider] = max(peak[provider], running[provider])
+            time.sleep(0.01)
+            with lock:
+                running[provider] -= 1
+            return 200, content
+
+        return reply
+
+    transport.add("POST", OM_URL, slow("orangemoney", OM_OK))
+    transport.add("POST", MOOV_URL, slow("moovmoney", b'{"status": "0"}'))
+    items = []
+    for index in range(12):
+        items.append(BatchItem(om, *OM_ARGS))
+        items.append(BatchItem(moov, "70000000", "1234", 1000, "m", f"MM{index}"))
+
+    with BatchValidator(max_workers=8, limits={"moovmoney": 2}) as validator:
+        results = list(validator.run(items))
+
+    assert len(results) == 24 and all(result.ok for result in results)
+    assert peak["moovmoney"] <= 2
+    assert peak["orangemoney"] > 2
+
+
+def test_items_are_pulled_lazily(om, transport):
+    transport.add("POST", OM_URL, OM_OK)
+    pulled = []
+
+    def items():
+        for index in range(1000):
+            pulled.append(index)
+            yield BatchItem(om, *OM_ARGS)
+
+    with BatchValidator(max_workers=2) as validator:
+        results = validator.run(items())
+        next(results)
+        assert len(pulled) < 20
+        results.close()
@@ -0,0 +1,137 @@
+import asyncio
+import io
+import json
+import threading
+import time
+from concurrent.futures import TimeoutError
+
+import pytest
+
+from mobilemoney.callback import CallbackReceiver
+from mobilemoney.polling import COMPLETED, NOT_COMPLETED
+
+from test.conftest import LIGDICASH_VERIFY_URL
+
+
+def body(token="tok", status="completed", **extra):
+    return json.dumps({"token": token, "status": status, **extra}).encode("utf-8")
+
+
+@pytest.fixture
+def receiver():
+    return CallbackReceiver(trust_payload=True)
+
+
+def test_client_or_trust_is_required():
+    with pytest.raises(ValueError):
+        CallbackReceiver()
+    with pytest.raises(ValueError):
+        CallbackReceiver(client=object())
+
+
+def test_deliveries_are_deduplicated(receiver):
+    assert receiver.handle(body(transaction_id="T1")) == (200, {"status": "ok"})
+    assert receiver.handle(body()) == (200, {"status": "duplicate"})
+    # same transaction, new token: still the same payment
+    assert receiver.handle(body("other", transaction_id="T1"))[1] == {
+        "status": "duplicate"
+    }
+
+
+def test_pending_and_invalid_deliveries(receiver):
+    assert receiver.handle(body(status="pending")) == (202, {"status": "pending"})
+    assert receiver.handle(body())[0] == 200
+
+    assert receiver.handle(b"{not json")[0] == 400
+    assert receiver.handle(b'{"status": "completed"}')[0] == 400
+    assert receiver.handle(
+        b"token=tok2&status=nocompleted", "application/x-www-form-urlencoded"
+    ) == (200, {"status": "ok"})
+    assert receiver.wait("tok2", timeout=0).status == NOT_COMPLETED
+
+
+def test_status_is_confirmed_with_the_client(ligdicash, transport):
+    transport.add("GET", LIGDICASH_VERIFY_URL, b'{"status": "nocompleted"}')
+    receiver = CallbackReceiver(client=ligdicash)
+
+    # the payload claims success, the gateway says otherwise
+    assert receiver.handle(body())[0] == 200
+    assert receiver.wait("tok", timeout=0).status == NOT_COMPLETED
+    assert transport.calls[0][2]["params"] == {"invoiceToken": "tok"}
+
+
+def test_wait_is_resolved_by_the_callback(receiver):
+    results = []
+    waiter = threading.Thread(
+        target=lambda: results.append(receiver.wait("tok", timeout=5))
+    )
+    waiter.start()
+    deadline = time.monotonic() + 5
+    while not receiver._waiters and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+    receiver.handle(body())
+    waiter.join()
+
+    assert results[0].status == COMPLETED
+    assert receiver._waiters == {}
+
+
+def test_timed_out_waiters_are_dropped(receiver):
+    with pytest.raises(TimeoutError):
+        receiver.wait("tok", timeout=0.01)
+    assert receiver._waiters == {}
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await receiver.wait_async("tok", timeout=0.01)
+        task = asyncio.ensure_future(receiver.wait_async("tok", timeout=5))
+        await asyncio.sleep(0)
+        receiver.handle(body())
+        return await task
+
+    assert asyncio.run(main()).status == COMPLETED
+    assert receiver._waiters == {}
+
+
+def test_wsgi(receiver):
+    def call(method, content=b""):
+        replies = []
+        environ = {
+            "REQUEST_METHOD": method,
+            "CONTENT_LENGTH": str(len(content)),
+            "CONTENT_TYPE": "application/json",
+            "wsgi.input": io.BytesIO(content),
+        }
+        chunks = receiver(environ, lambda status, headers: replies.append(status))
+        return replies[0], json.loads(b"".join(chunks))
+
+    assert call("POST", body()) == ("200 OK", {"status": "ok"})
+    assert call("POST", body()) == ("200 OK", {"status": "duplicate"})
+    assert call("GET")[0] == "405 Method Not Allowed"
+
+
+def test_asgi(receiver):
+    async def call(method, chunks):
+        messages = [
+            {"type": "http.request", "body": chunk, "more_body": more}
+            for chunk, more in zip(chunks, [True] * (len(chunks) - 1) + [False])
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": method, "headers": []}
+        await receiver.asgi(scope, receive, send)
+        return sent[0]["status"], json.loads(sent[1]["body"])
+
+    content = body()
+    assert asyncio.run(call("POST", [content[:5], content[5:]])) == (
+        200,
+        {"status": "ok"},
+    )
+    assert asyncio.run(call("GET", [b""]))[0] == 405
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from mobilemoney.idempotency import IdempotencyCache
+from mobilemoney.ratelimit import RateLimiter
+
+from test.conftest import LIGDICASH_URL, OM_ARGS, OM_OK, OM_URL
+
+INVOICE_OK = b'{"response_code": "00", "token": "tok", "response_text": "url"}'
+COMMAND = {"invoice": {"total_amount": 100}, "custom_data": {"transaction_id": "T1"}}
+
+
+def test_result_is_replayed():
+    cache = IdempotencyCache()
+    calls = []
+
+    assert cache.run("k", lambda: calls.append(1) or "done") == "done"
+    assert cache.run("k", lambda: calls.append(1) or "again") == "done"
+    assert calls == [1]
+    assert cache.stats()["hits"] == 1
+
+
+def test_rejected_results_and_errors_are_not_kept():
+    cache = IdempotencyCache()
+
+    assert cache.run("k", lambda: "error", lambda result: False) == "error"
+    assert cache.get("k") is None
+
+    with pytest.raises(RuntimeError):
+        cache.run("k", lambda: (_ for _ in ()).throw(RuntimeError("down")))
+    assert cache.run("k", lambda: "ok") == "ok"
+
+
+def test_concurrent_calls_share_one_run():
+    cache = IdempotencyCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "done"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.run("k", call)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(cache.run("k", call)))
+    follower.start()
+    deadline = time.monotonic() + 5
+    while cache.stats()["coalesced"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert results == ["done", "done"]
+    assert calls == [1]
+    assert cache.stats()["coalesced"] == 1
+
+
+def test_run_async():
+    cache = IdempotencyCache()
+
+    async def call():
+        return "done"
+
+    async def main():
+        first = await cache.run_async("k", call)
+        return first, await cache.run_async("k", call)
+
+    assert asyncio.run(main()) == ("done", "done")
+    assert cache.stats()["misses"] == 1
+
+
+def test_om_payment_replayed_by_reference(om, transport):
+    om.idempotency = IdempotencyCache()
+    transport.add("POST", OM_URL, OM_OK)
+
+    first = om.validate_payment(*OM_ARGS, reference="REF1")
+    second = om.validate_payment(*OM_ARGS, reference="REF1")
+
+    assert first.success and second is first
+    assert transport.stats() == {"requests": 1}
+
+
+def test_om_transport_error_is_not_replayed(om, transport):
+    om.idempotency = IdempotencyCache()
+    transport.add("POST", OM_URL, b"down", 500)
+    assert not om.validate_payment(*OM_ARGS, reference="REF1").success
+
+    transport.add("POST", OM_URL, OM_OK)
+    assert om.validate_payment(*OM_ARGS, reference="REF1").success
+
+
+def test_ligdicash_rate_limit_refusal_is_not_replayed(
+    ligdicash, transport, monkeypatch
+):
+    limiter = RateLimiter()
+    limiter.configure("ligdicash", 0.001, max_wait=0)
+    monkeypatch.setattr("mobilemoney.base.rate_limits", limiter)
+    ligdicash.idempotency = IdempotencyCache()
+    transport.add("POST", LIGDICASH_URL, INVOICE_OK)
+
+    ligdicash.validate_payment(COMMAND, idempotency_key="other")
+    assert ligdicash.validate_payment(COMMAND).http_status == 429
+
+    limiter.remove("ligdicash")
+    assert ligdicash.validate_payment(COMMAND).success
+    assert ligdicash.validate_payment(COMMAND).success
+    assert transport.stats() == {"requests": 2}
@@ -0,0 +1,90 @@
+import asyncio
+from concurrent.futures import Future
+
+import pytest
+
+from mobilemoney.instrumentation import Histogram, Instrumentation, instrumentation
+from mobilemoney.transport import Response
+
+from test.conftest import OM_ARGS, OM_OK, OM_URL
+
+
+@pytest.fixture
+def enabled():
+    instrumentation.reset()
+    instrumentation.enabled = True
+    yield instrumentation
+    instrumentation.enabled = False
+    instrumentation.reset()
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    assert histogram.percentile(0.5) == 0.0
+
+    for value in range(1, 101):
+        histogram.observe(value / 1000)
+
+    assert histogram.count == 100
+    assert histogram.sum == pytest.approx(5.05)
+    assert histogram.percentile(0.5) == pytest.approx(0.05, rel=0.05)
+    assert histogram.percentile(0.99) == pytest.approx(0.099, rel=0.05)
+
+
+def test_disabled_by_default():
+    metrics = Instrumentation()
+
+    assert metrics.start("orangemoney", "pay", "POST", OM_URL, {}) is None
+    metrics.finish(None)
+    assert metrics.to_dict() == {}
+
+
+def test_metrics_per_provider_and_operation():
+    metrics = Instrumentation(enabled=True)
+    for status in (200, 200, 500):
+        event = metrics.start("orangemoney", "pay", "POST", OM_URL, {"data": b"abc"})
+        metrics.finish(event, Response(status, b"12345"))
+
+    stats = metrics.to_dict()["orangemoney"]["pay"]
+    assert stats["requests"] == 3 and stats["errors"] == 1
+    assert (stats["request_bytes"], stats["response_bytes"]) == (9, 15)
+    assert {"p50", "p95", "p99"} <= set(stats)
+
+    exported = metrics.to_prometheus()
+    assert (
+        'mobilemoney_request_errors_total{provider="orangemoney",operation="pay"} 1'
+        in exported
+    )
+
+
+def test_hooks(caplog):
+    metrics = Instrumentation(enabled=True)
+    seen = []
+
+    def broken(event):
+        raise RuntimeError("hook bug")
+
+    metrics.add_hook(pre=broken, post=lambda event: seen.append(event.status))
+    event = metrics.start("orangemoney", "pay", "POST", OM_URL, {})
+    metrics.finish(event, Response(200, b""))
+
+    assert seen == [200]
+    assert "hook bug" in caplog.text
+
+    metrics.remove_hook(broken)
+    refused = Future()
+    refused.set_exception(PermissionError("refused"))
+    metrics.add_hook(pre=lambda event: refused)
+    with pytest.raises(PermissionError):
+        metrics.start("orangemoney", "pay", "POST", OM_URL, {})
+    with pytest.raises(PermissionError):
+        asyncio.run(metrics.start_async("orangemoney", "pay", "POST", OM_URL, {}))
+
+
+def test_client_calls_are_measured(enabled, om, transport):
+    transport.add("POST", OM_URL, OM_OK)
+
+    om.validate_payment(*OM_ARGS)
+
+    (operations,) = enabled.to_dict()["orangemoney"].values()
+    assert operations["requests"] == 1 and operations["errors"] == 0
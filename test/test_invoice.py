@@ -0,0 +1,128 @@
+import json
+
+import pytest
+
+from mobilemoney.ligdicash import InvoiceBuilder, InvoiceItem
+
+from test.conftest import LIGDICASH_URL
+
+STORE = {
+    "store_name": "Boutique",
+    "website_url": "https://shop.test",
+    "cancel_url": "https://shop.test/cancel",
+    "return_url": "https://shop.test/return",
+    "callback_url": "https://shop.test/callback",
+}
+
+
+@pytest.fixture
+def builder():
+    return InvoiceBuilder(description="Achat", custom_data={"shop": 7}, **STORE)
+
+
+def test_item():
+    item = InvoiceItem("Jus", 3, 500, "Jus de fruits")
+
+    assert item.total_price == 1500
+    assert json.loads(item.encoded) == {
+        "name": "Jus",
+        "description": "Jus de fruits",
+        "quantity": 3,
+        "unit_price": 500,
+        "total_price": 1500,
+    }
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ("", 1, 100),
+        (1, 1, 100),
+        ("Jus", 0, 100),
+        ("Jus", True, 100),
+        ("Jus", 1.5, 100),
+        ("Jus", 1, -1),
+        ("Jus", 1, False),
+        ("Jus", 1, 100, None),
+    ],
+)
+def test_item_rejects_bad_values(args):
+    with pytest.raises(ValueError):
+        InvoiceItem(*args)
+
+
+def test_build_matches_the_command_dict(builder):
+    invoice = builder.build(
+        [InvoiceItem("Jus", 2, 500), ("Pain", 1, 250, 'Pain "complet"')],
+        customer_firstname="Awa",
+        customer_email="awa@example.com",
+        customer="22676000000",
+        transaction_id="T1",
+    )
+
+    assert invoice.total_amount == 1250 and invoice.transaction_id == "T1"
+    assert invoice.json() == {
+        "invoice": {
+            "items": [
+                {
+                    "name": "Jus",
+                    "description": "",
+                    "quantity": 2,
+                    "unit_price": 500,
+                    "total_price": 1000,
+                },
+                {
+                    "name": "Pain",
+                    "description": 'Pain "complet"',
+                    "quantity": 1,
+                    "unit_price": 250,
+                    "total_price": 250,
+                },
+            ],
+            "total_amount": 1250,
+            "devise": "XOF",
+            "description": "Achat",
+            "customer": "22676000000",
+            "customer_firstname": "Awa",
+            "customer_lastname": "",
+            "customer_email": "awa@example.com",
+            "external_id": "",
+            "otp": "",
+        },
+        "store": {"name": "Boutique", "website_url": "https://shop.test"},
+        "actions": {
+            "cancel_url": "https://shop.test/cancel",
+            "return_url": "https://shop.test/return",
+            "callback_url": "https://shop.test/callback",
+        },
+        "custom_data": {"transaction_id": "T1", "shop": 7},
+    }
+
+
+def test_build_per_order_values(builder):
+    first = builder.build([("Jus", 1, 500)], description="Promo")
+    second = builder.build([("Jus", 1, 500)])
+
+    assert first.json()["invoice"]["description"] == "Promo"
+    assert second.json()["invoice"]["description"] == "Achat"
+    assert first.transaction_id and first.transaction_id != second.transaction_id
+    assert first.json()["custom_data"]["transaction_id"] == first.transaction_id
+
+
+def test_build_rejects_bad_values(builder):
+    with pytest.raises(ValueError):
+        builder.build([])
+    with pytest.raises(ValueError):
+        builder.build([("Jus", 1, 500)], customer=22676000000)
+    with pytest.raises(ValueError):
+        InvoiceBuilder(custom_data={"transaction_id": "T1"}, **STORE)
+    with pytest.raises(ValueError):
+        InvoiceBuilder(**{**STORE, "callback_url": None})
+
+
+def test_validate_invoice(builder, ligdicash, transport):
+    transport.add("POST", LIGDICASH_URL, b'{"response_code": "00", "token": "t"}')
+    invoice = builder.build([("Jus", 1, 500)], transaction_id="T1")
+
+    assert ligdicash.validate_payment(invoice).success
+    assert transport.calls[0][2]["data"] is invoice.body
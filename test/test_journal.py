@@ -0,0 +1,74 @@
+import sqlite3
+
+import pytest
+
+from mobilemoney.instrumentation import instrumentation
+from mobilemoney.journal import DONE, SENT, PaymentJournal
+
+from test.conftest import OM_ARGS, OM_OK, OM_URL
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = PaymentJournal(str(tmp_path / "journal.db"), flush_interval=0.01)
+    yield journal
+    journal.close()
+
+
+def test_attach_restores_the_instrumentation_state(journal):
+    assert not instrumentation.enabled
+
+    journal.attach()
+    assert instrumentation.enabled
+    journal.detach()
+    assert not instrumentation.enabled
+
+    instrumentation.enabled = True
+    try:
+        journal.attach()
+        journal.close()
+        assert instrumentation.enabled
+    finally:
+        instrumentation.enabled = False
+
+
+def test_calls_are_journaled(journal, om, transport):
+    transport.add("POST", OM_URL, OM_OK)
+    journal.attach()
+
+    om.validate_payment(*OM_ARGS, reference="REF1")
+    journal.flush()
+
+    records = journal.entries("REF1")
+    assert [record["phase"] for record in records] == [SENT, DONE]
+    assert records[1]["status"] == 200
+    assert records[1]["body"] == OM_OK
+    assert journal.unfinished() == []
+
+
+def test_unfinished_calls_are_recovered(journal):
+    journal.attach()
+    # sent, then the process died before the call returned
+    instrumentation.start("orangemoney", "pay", "POST", OM_URL, {}, "REF2")
+    journal.detach()
+    journal.flush()
+    assert [entry["reference"] for entry in journal.unfinished()] == ["REF2"]
+
+    assert journal.recover(lambda entry: entry["reference"] == "REF2") == 1
+    assert journal.unfinished() == []
+
+
+def test_durable_write_failure_stops_the_call(tmp_path, om, transport):
+    path = str(tmp_path / "journal.db")
+    transport.add("POST", OM_URL, OM_OK)
+    with PaymentJournal(path, durable=True) as journal:
+        journal.attach()
+        connection = sqlite3.connect(path)
+        connection.execute("DROP TABLE journal")
+        connection.close()
+
+        result = om.validate_payment(*OM_ARGS)
+
+    assert not result.success
+    assert transport.stats() == {"requests": 0}
+    assert not instrumentation.enabled
@@ -0,0 +1,140 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+from mobilemoney.merchants import MerchantPool
+from mobilemoney.moovmoney import GenericPayment as MoovPayment
+from mobilemoney.moovmoney_aio import AsyncGenericPayment as AsyncMoovPayment
+from mobilemoney.transport import basic_auth
+
+from test.conftest import MOOV_URL, make_policy
+
+OTP = b'{"status": "0", "trans-id": "MM1"}'
+PAYMENT = ("76000000", "1234", 1000, "m", "MM1")
+
+
+def merchant(transport, username, cls=MoovPayment):
+    client = cls(MOOV_URL, username, "secret")
+    if cls is MoovPayment:
+        client.pool = transport
+    else:
+        client.async_pool = transport
+    client.policy = make_policy()
+    return client
+
+
+@pytest.fixture
+def pool(transport):
+    transport.add("POST", MOOV_URL, OTP)
+    pool = MerchantPool()
+    for username in ("m1", "m2", "m3"):
+        pool.add(merchant(transport, username))
+    return pool
+
+
+def test_add_rejects_bad_accounts(pool, transport):
+    with pytest.raises(ValueError):
+        pool.add(merchant(transport, "m1"))
+    with pytest.raises(ValueError):
+        pool.add(merchant(transport, "m4"), weight=0)
+    with pytest.raises(ValueError):
+        pool.add(object())
+    with pytest.raises(ValueError):
+        pool.select("orangemoney")
+
+    pool.add(merchant(transport, "m1"), name="m1-bis")
+    assert [a.name for a in pool.accounts("moovmoney")] == ["m1", "m2", "m3", "m1-bis"]
+
+
+def test_keyed_calls_stick_to_one_account(pool):
+    keys = [f"7600{index:04d}" for index in range(300)]
+    before = {key: pool.select("moovmoney", key).name for key in keys}
+
+    assert before == {key: pool.select("moovmoney", key).name for key in keys}
+    assert set(before.values()) == {"m1", "m2", "m3"}
+
+    # only the keys of the removed account move
+    pool.remove("moovmoney", "m3")
+    for key, name in before.items():
+        if name != "m3":
+            assert pool.select("moovmoney", key).name == name
+
+
+def test_weights_share_keys(transport):
+    pool = MerchantPool()
+    pool.add(merchant(transport, "big"), weight=3)
+    pool.add(merchant(transport, "small"))
+
+    shares = Counter(pool.select("moovmoney", key).name for key in range(4000))
+
+    assert 0.65 < shares["big"] / 4000 < 0.85
+
+
+def test_unkeyed_calls_go_to_least_loaded(pool):
+    m1, m2, m3 = pool.accounts("moovmoney")
+    m1.inflight = m3.inflight = 2
+
+    assert pool.select("moovmoney") is m2
+    assert pool.call("moovmoney", "send_otp", "76000000", 1000)["trans-id"] == "MM1"
+    assert m2.inflight == 0 and m2.health.calls == 1
+
+
+def test_auth_failure_quarantines_account(pool, transport):
+    def reply(method, url, **kwargs):
+        if kwargs["headers"]["authorization"] == basic_auth(("m1", "secret")):
+            return 401, b'{"status": "401"}'
+        return 200, OTP
+
+    transport.add("POST", MOOV_URL, reply)
+    m1 = pool.accounts("moovmoney")[0]
+    key = next(key for key in range(1000) if pool.select("moovmoney", key) is m1)
+
+    assert not pool.call("moovmoney", "validate_payment", *PAYMENT, key=key).success
+    stats = pool.stats()["moovmoney"]["m1"]
+    assert stats["auth_failures"] == 1 and stats["quarantined"] > 0
+
+    # the key walks the ring to the next account
+    assert pool.select("moovmoney", key) is not m1
+    assert pool.call("moovmoney", "validate_payment", *PAYMENT, key=key).success
+
+    pool.release_quarantine("moovmoney", "m1")
+    assert pool.select("moovmoney", key) is m1
+
+
+def test_every_account_quarantined(transport):
+    transport.add("POST", MOOV_URL, b'{"status": "403"}', status_code=403)
+    pool = MerchantPool()
+    pool.add(merchant(transport, "m1"))
+    pool.call("moovmoney", "validate_payment", *PAYMENT)
+
+    with pytest.raises(RuntimeError):
+        pool.call("moovmoney", "validate_payment", *PAYMENT)
+
+
+def test_errors_are_counted(pool):
+    with pytest.raises(ValueError):
+        # no OTP session and no trans-id
+        pool.call("moovmoney", "validate_payment", "76000000", "1234", 1000, "m")
+
+    stats = pool.stats()["moovmoney"]
+    assert sum(account["errors"] for account in stats.values()) == 1
+    assert all(account["inflight"] == 0 for account in stats.values())
+
+
+def test_call_async(transport):
+    transport.add("POST", MOOV_URL, OTP)
+    pool = MerchantPool()
+    pool.add(merchant(transport, "m1", AsyncMoovPayment))
+    pool.add(merchant(transport, "m2", AsyncMoovPayment))
+
+    async def main():
+        return await asyncio.gather(
+            *(
+                pool.call_async("moovmoney", "send_otp", "76000000", 1000, key=key)
+                for key in range(10)
+            )
+        )
+
+    assert all(otp["trans-id"] == "MM1" for otp in asyncio.run(main()))
+    assert sum(a.health.calls for a in pool.accounts("moovmoney")) == 10
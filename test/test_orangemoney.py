@@ -0,0 +1,124 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from mobilemoney.orangemoney import _extract_fields, _scan_fields
+
+from test.conftest import OM_OK
+
+FIELDS = {
+    "status": "200",
+    "message": "Paiement effectue avec succes",
+    "trans_id": "OM.2310.1712.0001",
+}
+
+
+def element_tree_query(client, customer_phone, customer_otp, amount, libel, reference):
+    """The ElementTree serialization the OM template replaced."""
+    root = ET.Element("COMMAND")
+    for tag, text in (
+        ("TYPE", "OMPREQ"),
+        ("customer_msisdn", f"{customer_phone}"),
+        ("merchant_msisdn", client.phonenumber),
+        ("api_username", client.username),
+        ("api_password", client.password),
+        ("amount", f"{amount}"),
+        ("PROVIDER", "101"),
+        ("PROVIDER2", "101"),
+        ("PAYID", "12"),
+        ("PAYID2", "12"),
+        ("otp", f"{customer_otp}"),
+        ("reference_number", libel),
+        ("ext_txn_id", reference),
+    ):
+        ET.SubElement(root, tag).text = text
+    return ET.tostring(root, encoding="utf-8").decode("utf-8")
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ("76000000", "1234", 1000, "Achat", "REF1"),
+        ("76000000", 1234, 1000, 'Café & <thé> "x"', "REF'2"),
+        ("76000000", "", 0, "", ""),
+    ],
+)
+def test_om_query_matches_element_tree(om, args):
+    assert om.parse_query(*args) == element_tree_query(om, *args)
+    assert om.serialize_query(*args) == element_tree_query(om, *args).encode("utf-8")
+
+
+def test_om_query_follows_credential_changes(om):
+    args = ("76000000", "1234", 1000, "Achat", "REF1")
+    om.parse_query(*args)
+
+    om.password = "rotated & new"
+
+    assert "<api_password>rotated &amp; new</api_password>" in om.parse_query(*args)
+    assert om.parse_query(*args) == element_tree_query(om, *args)
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        OM_OK,
+        OM_OK.decode("utf-8"),
+        b"\n  " + OM_OK.replace(b"><", b">\n  <") + b"\n",
+        b'<?xml version="1.0" encoding="UTF-8"?>' + OM_OK,
+        b"<extra>1</extra>" + OM_OK + b"<empty />",
+        OM_OK + b"trailing text",
+    ],
+)
+def test_om_result(om, content):
+    assert om.parse_result(content) == FIELDS
+
+
+def test_om_result_decodes_references(om):
+    fields = om.parse_result(
+        b"<status>60019</status><message>Solde insuffisant &#233;t&#xe9; &amp; "
+        b"&quot;ok&quot;</message><transID>OM.1</transID>"
+    )
+
+    assert fields["message"] == 'Solde insuffisant été & "ok"'
+    assert fields["status"] == "60019"
+
+
+def test_om_result_reads_top_level_fields_only(om):
+    content = b"<foo><status>500</status></foo>" + OM_OK
+
+    assert _scan_fields(content) is None
+    assert om.parse_result(content) == FIELDS
+
+    # fields nested in another element are not the response fields
+    assert om.parse_result(b"<response>" + OM_OK + b"</response>")["status"] == (
+        "OM-500"
+    )
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        OM_OK + b"<broken",
+        OM_OK + b"</status>",
+        b"<status>200</status><message>x</message>",
+        b"<status>",
+        b"circuit open",
+        b"",
+    ],
+)
+def test_om_invalid_result(om, content):
+    assert _scan_fields(content) is None
+
+    fields = om.parse_result(content)
+
+    assert fields["status"] == "OM-500"
+    assert fields["trans_id"] == "Error"
+
+
+def test_om_malformed_result_reports_the_parser_error(om):
+    found, error = _extract_fields(OM_OK + b"<broken")
+
+    assert error is not None
+    assert om.parse_result(OM_OK + b"<broken")["message"].startswith(
+        "Réponse invalide de l'API OM: "
+    )
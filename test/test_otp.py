@@ -0,0 +1,126 @@
+import json
+
+import pytest
+
+from mobilemoney.otp import MemoryOTPBackend, OTPSessionStore, SQLiteOTPBackend
+
+from test.conftest import MOOV_URL
+
+SESSION = {"trans_id": "MM1", "sent_at": 0.0, "response": {"trans-id": "MM1"}}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryOTPBackend()
+    return SQLiteOTPBackend(str(tmp_path / "otp.db"))
+
+
+def test_backend_set_get_delete(backend):
+    assert backend.get("k") is None
+
+    backend.set("k", SESSION, 60)
+    assert backend.get("k") == SESSION
+
+    backend.delete("k")
+    assert backend.get("k") is None
+    backend.delete("k")
+
+
+def test_backend_expiry(backend):
+    backend.set("k", SESSION, 0)
+    assert backend.get("k") is None
+
+
+def test_memory_backend_drops_closest_to_expiry():
+    backend = MemoryOTPBackend(max_entries=2)
+    backend.set("short", SESSION, 10)
+    backend.set("long", SESSION, 60)
+    backend.set("new", SESSION, 60)
+
+    assert backend.get("short") is None
+    assert backend.get("long") == backend.get("new") == SESSION
+
+    # updating a key already stored never evicts
+    backend.set("long", SESSION, 60)
+    assert backend.get("new") == SESSION
+
+
+def test_sqlite_backend_is_shared(tmp_path):
+    path = str(tmp_path / "otp.db")
+    SQLiteOTPBackend(path).set("k", SESSION, 60)
+
+    assert SQLiteOTPBackend(path).get("k") == json.loads(json.dumps(SESSION))
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{"backend": object()}, {"ttl": 0}, {"resend_interval": -1}],
+)
+def test_store_rejects_bad_arguments(kwargs):
+    with pytest.raises(ValueError):
+        OTPSessionStore(**kwargs)
+
+
+def test_store_sessions():
+    store = OTPSessionStore(resend_interval=60)
+
+    assert store.save("m", "76000000", 1000, {"status": "1"}) is None
+    assert store.trans_id("m", "76000000", 1000) is None
+
+    store.save("m", "76000000", 1000, {"status": "0", "trans-id": "MM1"})
+    assert store.trans_id("m", "76000000", 1000) == "MM1"
+    assert store.trans_id("m", "76000000", 2000) is None
+    assert store.trans_id("other", "76000000", 1000) is None
+    assert store.recent("m", "76000000", 1000)["response"]["trans-id"] == "MM1"
+
+    store.discard("m", "76000000", 1000)
+    assert store.get("m", "76000000", 1000) is None
+
+
+def test_store_resend_interval():
+    store = OTPSessionStore(resend_interval=0)
+    store.save("m", "76000000", 1000, {"status": "0", "trans-id": "MM1"})
+
+    assert store.recent("m", "76000000", 1000) is None
+    assert store.trans_id("m", "76000000", 1000) == "MM1"
+
+
+def test_moov_rejects_bad_store(moov):
+    with pytest.raises(ValueError):
+        moov.otp_sessions = {}
+
+
+def test_moov_without_store_needs_trans_id(moov, transport):
+    transport.add("POST", MOOV_URL, b'{"status": "0", "trans-id": "MM1"}')
+    moov.send_otp("76000000", 1000)
+
+    with pytest.raises(ValueError):
+        moov.validate_payment("76000000", "1234", 1000, "m")
+
+
+def test_moov_uses_stored_session(moov, transport):
+    moov.otp_sessions = OTPSessionStore()
+    transport.add("POST", MOOV_URL, b'{"status": "0", "trans-id": "MM1"}')
+
+    assert moov.send_otp("76000000", 1000)["trans-id"] == "MM1"
+    # sent too early: answered locally with the last gateway response
+    assert moov.resend_otp("76000000", 1000)["trans-id"] == "MM1"
+    assert len(transport.calls) == 1
+
+    transport.add("POST", MOOV_URL, b'{"status": "0", "trans-id": "MM1"}')
+    assert moov.validate_payment("76000000", "1234", 1000, "m").success
+    assert b'"trans-id":"MM1"' in transport.calls[1][2]["data"]
+
+    # a completed payment closes its session
+    assert moov.otp_sessions.get("moov-merchant", "76000000", 1000) is None
+
+
+def test_moov_keeps_session_after_failed_payment(moov, transport):
+    moov.otp_sessions = OTPSessionStore()
+    transport.add("POST", MOOV_URL, b'{"status": "0", "trans-id": "MM1"}')
+    moov.send_otp("76000000", 1000)
+
+    transport.add("POST", MOOV_URL, b'{"status": "12", "message": "bad otp"}')
+    assert not moov.validate_payment("76000000", "0000", 1000, "m").success
+    assert moov.otp_sessions.trans_id("moov-merchant", "76000000", 1000) == "MM1"
@@ -0,0 +1,59 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+import mobilemoney
+
+HEAVY = ("asyncio", "urllib3", "requests", "sqlite3", "ssl", "xml.sax", "logging")
+
+SCRIPT = """
+import json, sys
+before = set(sys.modules)
+import mobilemoney
+{access}
+print(json.dumps(sorted(set(sys.modules) - before)))
+"""
+
+
+def loaded_modules(access):
+    output = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(access=access)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def test_every_export_resolves():
+    for name in mobilemoney.__all__:
+        assert getattr(mobilemoney, name) is not None, name
+
+    assert mobilemoney.OMPayment.__name__ == "Payment"
+    assert mobilemoney.AsyncMMPayment.__module__ == "mobilemoney.moovmoney_aio"
+    assert set(mobilemoney.__all__) <= set(dir(mobilemoney))
+    with pytest.raises(AttributeError):
+        mobilemoney.NotAnExport
+
+
+@pytest.mark.parametrize(
+    "access",
+    ["", "mobilemoney.OMPayment", "mobilemoney.MMPayment", "mobilemoney.Reconciler"],
+)
+def test_sync_clients_do_not_load_optional_subsystems(access):
+    modules = loaded_modules(access)
+
+    assert not [
+        name
+        for name in modules
+        for heavy in HEAVY
+        if f"{name}.".startswith(heavy + ".")
+    ]
+    assert "mobilemoney.aio" not in modules
+    assert "mobilemoney.idempotency" not in modules
+
+
+def test_async_clients_load_asyncio():
+    assert "asyncio" in loaded_modules("mobilemoney.AsyncOMPayment")
@@ -0,0 +1,63 @@
+from decimal import Decimal
+
+import pytest
+
+from mobilemoney.reconciliation import parse_amount
+from mobilemoney.transport import Response
+
+from test.conftest import LIGDICASH_VERIFY_URL, MOOV_URL
+
+
+def test_moov_result(moov):
+    result = moov._result(
+        Response(200, b'{"status": "0", "message": "ok", "trans-id": "MM1"}')
+    )
+    assert result.success
+    assert result.trans_id == "MM1"
+    assert result["trans-id"] == "MM1"
+
+    result = moov._result(Response(503, b"circuit open"))
+    assert not result.success
+    assert result.message == "circuit open"
+
+
+def test_moov_otp_session_data(moov, transport):
+    transport.add("POST", MOOV_URL, b'{"status": "0", "trans-id": "MM2"}')
+
+    assert moov.send_otp("76000000", 1000) == {"status": "0", "trans-id": "MM2"}
+
+
+def test_ligdicash_verify(ligdicash, transport):
+    transport.add("GET", LIGDICASH_VERIFY_URL, b'{"status": "nocompleted"}')
+    completed, result = ligdicash.verify_token("tok")
+    assert completed is False
+    assert result.trans_id == "tok"
+
+    transport.add("GET", LIGDICASH_VERIFY_URL, b'{"status": "pending"}')
+    assert ligdicash.verify_token("tok")[0] is None
+
+    assert transport.calls[0][2]["params"] == {"invoiceToken": "tok"}
+
+
+@pytest.mark.parametrize(
+    "value, amount",
+    [
+        ("1000", Decimal(1000)),
+        ("1 000", Decimal(1000)),
+        ("1.000", Decimal(1000)),
+        ("1,000", Decimal(1000)),
+        ("1.000.000", Decimal(1000000)),
+        ("1,000,000", Decimal(1000000)),
+        ("1,000.50", Decimal("1000.50")),
+        ("1.000,50", Decimal("1000.50")),
+        ("1000,5", Decimal("1000.5")),
+        ("1.5", Decimal("1.5")),
+        (1500, Decimal(1500)),
+        (2.5, Decimal("2.5")),
+        ("", None),
+        (None, None),
+        ("n/a", None),
+    ],
+)
+def test_parse_amount(value, amount):
+    assert parse_amount(value) == amount
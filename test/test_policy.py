@@ -0,0 +1,136 @@
+import asyncio
+import time
+
+import pytest
+
+from mobilemoney.ligdicash_aio import AsyncGenericPaymentWithRedirect
+from mobilemoney.policy import CircuitBreaker, ProviderPolicy
+from mobilemoney.ratelimit import RateLimiter
+from mobilemoney.transport import FakeTransport
+
+from test.conftest import LIGDICASH_VERIFY_URL, OM_ARGS, OM_OK, OM_URL, make_policy
+
+
+def test_policy_validation():
+    with pytest.raises(ValueError):
+        ProviderPolicy(retries=-1)
+    with pytest.raises(ValueError):
+        ProviderPolicy(connect_timeout=0)
+    with pytest.raises(ValueError):
+        CircuitBreaker(failure_threshold=0)
+
+
+def test_circuit_breaker_states():
+    circuit = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    circuit.record_failure()
+    assert circuit.allow()
+
+    circuit.record_failure()
+    assert circuit.state == CircuitBreaker.OPEN
+    assert not circuit.allow()
+
+    time.sleep(0.06)
+    assert circuit.allow()  # the single half-open trial
+    assert not circuit.allow()
+
+    circuit.release()
+    assert circuit.allow()
+    circuit.record_success()
+    assert circuit.state == CircuitBreaker.CLOSED
+    assert circuit.snapshot() == {"state": "closed", "failures": 0, "retry_in": None}
+
+
+def test_payment_is_not_retried(om, transport):
+    transport.add("POST", OM_URL, b"down", 500)
+
+    result = om.validate_payment(*OM_ARGS)
+
+    assert not result.success
+    assert transport.stats() == {"requests": 1}
+
+
+def test_idempotent_call_is_retried(ligdicash, transport):
+    transport.add("GET", LIGDICASH_VERIFY_URL, b"down", 503)
+    ligdicash.policy = make_policy(retries=2, failure_threshold=10)
+
+    completed, result = ligdicash.verify_token("token")
+
+    assert completed is None
+    assert result.http_status == 503
+    assert transport.stats() == {"requests": 3}
+
+
+def test_transport_error_counts_as_failure(om, transport):
+    def fail(method, url, **kwargs):
+        raise ConnectionError("connection refused")
+
+    transport.add("POST", OM_URL, fail)
+
+    result = om.validate_payment(*OM_ARGS)
+
+    assert not result.success
+    assert om.policy.circuit.failures == 1
+
+
+def test_open_circuit_fails_fast(om, transport):
+    om.policy = make_policy(failure_threshold=1)
+    transport.add("POST", OM_URL, b"down", 500)
+    om.validate_payment(*OM_ARGS)
+
+    result = om.validate_payment(*OM_ARGS)
+
+    assert result.http_status == 503
+    assert transport.stats() == {"requests": 1}
+
+    time.sleep(0.06)
+    transport.add("POST", OM_URL, OM_OK)
+    assert om.validate_payment(*OM_ARGS).success
+    assert om.policy.circuit.state == CircuitBreaker.CLOSED
+
+
+def test_rate_limited_trial_keeps_the_circuit_usable(om, transport, monkeypatch):
+    limiter = RateLimiter()
+    limiter.configure("orangemoney", 0.001, max_wait=0)
+    monkeypatch.setattr("mobilemoney.base.rate_limits", limiter)
+    om.policy = make_policy(failure_threshold=1)
+    transport.add("POST", OM_URL, b"down", 500)
+
+    om.validate_payment(*OM_ARGS)
+    time.sleep(0.06)
+    assert om.validate_payment(*OM_ARGS).http_status == 429
+
+    limiter.remove("orangemoney")
+    transport.add("POST", OM_URL, OM_OK)
+    assert om.validate_payment(*OM_ARGS).success
+
+
+def test_cancelled_trial_releases_the_circuit():
+    def slow(method, url, **kwargs):
+        time.sleep(0.2)
+        return 200, b'{"status": "completed"}'
+
+    transport = FakeTransport().add("GET", LIGDICASH_VERIFY_URL, slow)
+    client = AsyncGenericPaymentWithRedirect("", "key", "token", LIGDICASH_VERIFY_URL)
+    client.async_pool = transport
+    client.policy = make_policy(failure_threshold=1)
+    client.policy.circuit.record_failure()
+    time.sleep(0.06)
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.verify_token("t"), 0.05)
+        return await client.verify_token("t")
+
+    completed, result = asyncio.run(main())
+
+    assert completed
+    assert client.policy.circuit.state == CircuitBreaker.CLOSED
+
+
+def test_moov_otp_while_circuit_open(moov, transport):
+    moov.policy = make_policy(failure_threshold=1, reset_timeout=30)
+    moov.policy.circuit.record_failure()
+
+    assert moov.send_otp("76000000", 1000)["status"] == "503"
+    assert moov.resend_otp("76000000", 1000)["status"] == "503"
+    assert transport.stats() == {"requests": 0}
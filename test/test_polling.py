@@ -0,0 +1,124 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+
+import pytest
+
+from mobilemoney.polling import (
+    COMPLETED,
+    EXPIRED,
+    NOT_COMPLETED,
+    InvoicePoller,
+    token_expiry,
+)
+
+from test.conftest import LIGDICASH_VERIFY_URL
+
+
+def jwt(expiry_date):
+    payload = json.dumps({"id_invoice": "1", "expiry_date": expiry_date})
+    encoded = base64.urlsafe_b64encode(payload.encode("utf-8")).rstrip(b"=")
+    return f"header.{encoded.decode('ascii')}.signature"
+
+
+@pytest.fixture
+def gateway(transport):
+    """Invoice status answered by the fake gateway per token, and the checks."""
+    gateway = {"statuses": {}, "checks": []}
+
+    def verify(method, url, params=None, **kwargs):
+        token = params["invoiceToken"]
+        gateway["checks"].append(token)
+        status = gateway["statuses"][token]
+        return 200, json.dumps({"status": status}).encode("utf-8")
+
+    transport.add("GET", LIGDICASH_VERIFY_URL, verify)
+    return gateway
+
+
+@pytest.fixture
+def poller(ligdicash):
+    poller = InvoicePoller(
+        ligdicash, initial_interval=0.01, max_interval=0.04, factor=2, rate=1000
+    )
+    yield poller
+    poller.close()
+
+
+def test_token_expiry():
+    assert token_expiry(jwt(1700000000)) == 1700000000.0
+    assert token_expiry("not-a-jwt") is None
+    assert token_expiry(jwt("soon")) is None
+
+
+def test_validation(ligdicash):
+    with pytest.raises(ValueError):
+        InvoicePoller(object())
+    with pytest.raises(ValueError):
+        InvoicePoller(ligdicash, initial_interval=10, max_interval=1)
+    with pytest.raises(ValueError):
+        InvoicePoller(ligdicash, factor=0.5)
+
+
+def test_poll_once(poller, gateway):
+    gateway["statuses"].update(paid="completed", refused="nocompleted", wait="pending")
+    expired = jwt(time.time() - 1)
+    delivered = []
+    for token in ("paid", "refused", "wait", expired):
+        poller.add(token, callback=delivered.append)
+
+    assert poller.poll_once() == []  # nothing due yet
+    time.sleep(0.02)
+    finished = {result.token: result.status for result in poller.poll_once()}
+
+    assert finished == {"paid": COMPLETED, "refused": NOT_COMPLETED, expired: EXPIRED}
+    assert len(delivered) == 3
+    # the expired token never reaches the gateway
+    assert sorted(gateway["checks"]) == ["paid", "refused", "wait"]
+    assert "wait" in poller and len(poller) == 1
+
+
+def test_pending_tokens_back_off(poller, gateway):
+    gateway["statuses"]["wait"] = "pending"
+    poller.add("wait")
+
+    delays = []
+    for _ in range(4):
+        delay = poller.next_due() - time.monotonic()
+        delays.append(delay)
+        time.sleep(max(delay, 0) + 0.001)
+        poller.poll_once()
+
+    # 0.01, 0.02, 0.04, then capped at max_interval
+    assert delays[1] > delays[0] * 1.5
+    assert delays[3] <= 0.04
+
+    assert poller.remove("wait") and poller.next_due() is None
+
+
+def test_run_until_done(poller, gateway):
+    gateway["statuses"].update(a="pending", b="completed")
+    poller.add("a")
+    poller.add("b")
+    runner = threading.Thread(target=poller.run)
+    runner.start()
+
+    time.sleep(0.05)
+    gateway["statuses"]["a"] = "completed"
+    runner.join(5)
+
+    assert not runner.is_alive()
+    assert len(poller) == 0
+
+
+def test_completions(poller, gateway):
+    gateway["statuses"].update(a="completed", b="nocompleted")
+    poller.add("a")
+    poller.add("b")
+
+    async def main():
+        return {result.token: result.completed async for result in poller.completions()}
+
+    assert asyncio.run(main()) == {"a": True, "b": False}
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+
+import pytest
+
+from mobilemoney.orangemoney_aio import AsyncGenericPayment as AsyncOMPayment
+from mobilemoney.ratelimit import MemoryRateBackend, RateLimiter, SQLiteRateBackend
+
+from test.conftest import OM_ARGS, OM_OK, OM_URL, make_policy
+
+
+def test_memory_backend_burst_then_wait():
+    backend = MemoryRateBackend()
+
+    assert backend.reserve("k", 10.0, 2.0) == 0.0
+    assert backend.reserve("k", 10.0, 2.0) == 0.0
+    assert backend.reserve("k", 10.0, 2.0) == pytest.approx(0.1, abs=0.01)
+
+
+def test_memory_backend_refuses_past_max_wait():
+    backend = MemoryRateBackend()
+    backend.reserve("k", 1.0, 1.0, max_wait=0)
+
+    assert backend.reserve("k", 1.0, 1.0, max_wait=0) is None
+    # a refused call does not take a token
+    assert backend.reserve("k", 1.0, 1.0, max_wait=0.5) is None
+
+
+def test_sqlite_backend_shares_buckets(tmp_path):
+    path = str(tmp_path / "rate.db")
+    first, second = SQLiteRateBackend(path), SQLiteRateBackend(path)
+
+    assert first.reserve("k", 1.0, 1.0) == 0.0
+    assert second.reserve("k", 1.0, 1.0, max_wait=0) is None
+
+
+def test_limiter_per_username():
+    limiter = RateLimiter()
+    assert limiter.reserve("orangemoney", "a") == 0.0
+
+    limiter.configure("orangemoney", 1.0, max_wait=0)
+    limiter.configure("orangemoney", 100.0, username="b", max_wait=0)
+
+    assert limiter.reserve("orangemoney", "a") == 0.0
+    assert limiter.reserve("orangemoney", "a") is None
+    assert limiter.reserve("orangemoney", "b") == 0.0
+    assert limiter.reserve("orangemoney", "b") == 0.0
+
+    limiter.remove("orangemoney")
+    assert limiter.reserve("orangemoney", "a") == 0.0
+
+
+def test_limiter_validation():
+    limiter = RateLimiter()
+    with pytest.raises(ValueError):
+        limiter.configure("orangemoney", 0)
+    with pytest.raises(ValueError):
+        limiter.configure("orangemoney", 1.0, burst=0.5)
+    with pytest.raises(ValueError):
+        RateLimiter(backend=object())
+
+
+def test_refused_call_is_answered_locally(om, transport, monkeypatch):
+    limiter = RateLimiter()
+    limiter.configure("orangemoney", 0.001, max_wait=0)
+    monkeypatch.setattr("mobilemoney.base.rate_limits", limiter)
+    transport.add("POST", OM_URL, OM_OK)
+
+    assert om.validate_payment(*OM_ARGS).success
+    result = om.validate_payment(*OM_ARGS)
+
+    assert result.http_status == 429
+    assert not result.success
+    assert transport.stats() == {"requests": 1}
+
+
+def test_open_circuit_takes_no_token(om, transport, monkeypatch):
+    limiter = RateLimiter()
+    limiter.configure("orangemoney", 0.001, max_wait=0)
+    monkeypatch.setattr("mobilemoney.base.rate_limits", limiter)
+    om.policy = make_policy(failure_threshold=1, reset_timeout=30)
+    om.policy.circuit.record_failure()
+
+    assert om.validate_payment(*OM_ARGS).http_status == 503
+    assert om.validate_payment(*OM_ARGS).http_status == 503
+
+    om.policy.circuit.record_success()
+    transport.add("POST", OM_URL, OM_OK)
+    assert om.validate_payment(*OM_ARGS).success
+
+
+class RecordingBackend(SQLiteRateBackend):
+    def reserve(self, key, rate, burst, max_wait=None):
+        self.thread = threading.current_thread()
+        return super().reserve(key, rate, burst, max_wait)
+
+
+def test_blocking_backend_runs_off_the_event_loop(tmp_path, transport, monkeypatch):
+    backend = RecordingBackend(str(tmp_path / "rate.db"))
+    limiter = RateLimiter(backend)
+    limiter.configure("orangemoney", 100.0)
+    monkeypatch.setattr("mobilemoney.aio.rate_limits", limiter)
+    transport.add("POST", OM_URL, OM_OK)
+    client = AsyncOMPayment(OM_URL, "70000000", "om-merchant", "secret")
+    client.async_pool = transport
+    client.policy = make_policy()
+
+    assert asyncio.run(client.validate_payment(*OM_ARGS)).success
+    assert backend.thread is not threading.main_thread()
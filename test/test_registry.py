@@ -0,0 +1,61 @@
+import pytest
+
+from mobilemoney.helpers import validate_om_prod_payment
+from mobilemoney.moovmoney import Payment as MMPayment
+from mobilemoney.orangemoney import Payment as OMPayment
+from mobilemoney.orangemoney import orange_prod_url
+from mobilemoney.registry import ClientRegistry, clients
+
+from test.conftest import OM_ARGS, OM_OK, make_policy
+
+
+def test_clients_are_reused_per_credentials():
+    registry = ClientRegistry()
+
+    first = registry.get(OMPayment, "70000000", "merchant", "secret")
+
+    assert registry.get(OMPayment, "70000000", "merchant", "secret") is first
+    assert registry.get(OMPayment, "70000000", "merchant", "rotated") is not first
+    assert first in registry and len(registry) == 2
+
+
+def test_least_recently_used_client_is_dropped():
+    registry = ClientRegistry(maxsize=2)
+    first = registry.get(OMPayment, "70000000", "a", "secret")
+    second = registry.get(OMPayment, "70000000", "b", "secret")
+
+    registry.get(OMPayment, "70000000", "a", "secret")
+    registry.get(OMPayment, "70000000", "c", "secret")
+
+    assert first in registry and second not in registry
+    with pytest.raises(ValueError):
+        ClientRegistry(maxsize=0)
+
+
+def test_invalidate():
+    registry = ClientRegistry()
+    registry.get(OMPayment, "70000000", "a", "secret")
+    registry.get(OMPayment, "70000000", "b", "secret")
+    registry.get(MMPayment, "70000000", "a", "secret")
+
+    assert registry.invalidate(username="a") == 2
+    assert registry.invalidate(MMPayment) == 0
+    assert registry.invalidate() == 1
+    assert len(registry) == 0
+
+
+def test_helpers_reuse_the_registry_client(transport):
+    client = clients.get(OMPayment, "70000000", "helper-merchant", "secret")
+    client.pool = transport
+    client.policy = make_policy()
+    transport.add("POST", orange_prod_url, OM_OK)
+    try:
+        for _ in range(2):
+            result = validate_om_prod_payment(
+                "helper-merchant", "secret", "70000000", *OM_ARGS
+            )
+            assert result.success
+    finally:
+        clients.invalidate(username="helper-merchant")
+
+    assert transport.stats() == {"requests": 2}
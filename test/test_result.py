@@ -0,0 +1,91 @@
+import pickle
+
+import pytest
+
+from mobilemoney.result import PaymentResult
+
+from test.conftest import LIGDICASH_URL, MOOV_URL, OM_ARGS, OM_OK, OM_URL
+
+
+def make_result(**kwargs):
+    kwargs.setdefault("data", {"status": "0", "trans-id": "MM1"})
+    return PaymentResult("moovmoney", "0", "ok", "MM1", True, 0.1, 200, **kwargs)
+
+
+def test_result_is_slotted():
+    result = make_result()
+
+    assert not hasattr(result, "__dict__")
+    with pytest.raises(AttributeError):
+        result.extra = 1
+
+
+def test_result_reads_like_a_dict():
+    result = make_result()
+
+    assert result.ok and result.json() == result.data
+    assert result["trans-id"] == "MM1"
+    assert result["provider"] == "moovmoney"
+    assert "trans-id" in result and "status" in result
+    assert "token" not in result
+    assert result.get("token", "-") == "-"
+    with pytest.raises(KeyError):
+        result["token"]
+
+    # without data, only the common fields
+    result = make_result(data=None)
+    assert result["status"] == "0"
+    assert "trans-id" not in result
+
+
+def test_result_to_dict_and_pickle():
+    result = make_result()
+    assert result.to_dict() == {
+        "provider": "moovmoney",
+        "status": "0",
+        "message": "ok",
+        "trans_id": "MM1",
+        "success": True,
+        "latency": 0.1,
+        "http_status": 200,
+        "data": {"status": "0", "trans-id": "MM1"},
+    }
+    assert "raw" in make_result(raw=b"{}").to_dict()
+
+    loaded = pickle.loads(pickle.dumps(result))
+    assert loaded.to_dict() == result.to_dict()
+    assert repr(loaded) == repr(result)
+
+
+def test_providers_return_results(om, moov, ligdicash, transport):
+    transport.add("POST", OM_URL, OM_OK)
+    transport.add("POST", MOOV_URL, b'{"status": "0", "trans-id": "MM1"}')
+    transport.add("POST", LIGDICASH_URL, b'{"response_code": "00", "token": "t"}')
+
+    results = [
+        om.validate_payment(*OM_ARGS),
+        moov.validate_payment("76000000", "1234", 1000, "m", "MM1"),
+        ligdicash.validate_payment({"invoice": {}}),
+    ]
+
+    assert all(isinstance(result, PaymentResult) for result in results)
+    assert [(r.provider, r.trans_id, r.success) for r in results] == [
+        ("orangemoney", "OM.2310.1712.0001", True),
+        ("moovmoney", "MM1", True),
+        ("ligdicash", "t", True),
+    ]
+    assert all(r.http_status == 200 and r.raw is None for r in results)
+    assert results[0].data is None
+    assert results[2]["token"] == "t"
+
+
+def test_keep_raw(om, transport):
+    transport.add("POST", OM_URL, OM_OK)
+    transport.add("POST", OM_URL, OM_OK)
+
+    assert om.validate_payment(*OM_ARGS).raw is None
+    om.keep_raw = True
+    assert om.validate_payment(*OM_ARGS).raw == OM_OK
+
+    with pytest.raises(ValueError):
+        om.keep_raw = 1
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from mobilemoney.orangemoney_aio import AsyncGenericPayment as AsyncOMPayment
+from mobilemoney.router import (
+    LIGDICASH,
+    MOOVMONEY,
+    ORANGEMONEY,
+    PaymentRequest,
+    PaymentRouter,
+    normalize_phone,
+    operator_for,
+)
+
+from test.conftest import LIGDICASH_URL, OM_OK, OM_URL, make_policy
+
+INVOICE_OK = b'{"response_code": "00", "token": "tok", "response_text": "url"}'
+COMMAND = {"invoice": {"total_amount": 1000}, "custom_data": {"transaction_id": "T"}}
+
+
+@pytest.mark.parametrize(
+    "phone, local, operator",
+    [
+        ("76 00 00 00", "76000000", ORANGEMONEY),
+        ("+226 70000000", "70000000", MOOVMONEY),
+        ("0022605000000", "05000000", ORANGEMONEY),
+        ("99000000", "99000000", None),
+        ("7600", "7600", None),
+    ],
+)
+def test_operator_for(phone, local, operator):
+    assert normalize_phone(phone) == local
+    assert operator_for(phone) == operator
+
+
+def test_route_by_number(om, moov, ligdicash):
+    router = PaymentRouter(om, moov, ligdicash)
+
+    assert router.route(PaymentRequest("76000000", 1000)) == ORANGEMONEY
+    assert router.route(PaymentRequest("70000000", 1000)) == MOOVMONEY
+    assert router.route(PaymentRequest("99000000", 1000, command={})) == LIGDICASH
+    assert router.route(PaymentRequest("70000000", 1000, provider=LIGDICASH)) == (
+        LIGDICASH
+    )
+    with pytest.raises(ValueError):
+        router.route(PaymentRequest("99000000", 1000))
+    with pytest.raises(ValueError):
+        PaymentRequest("76000000", 1000, provider="wave")
+
+
+def test_degraded_operator_fails_over_to_ligdicash(om, ligdicash, transport):
+    transport.add("POST", OM_URL, b"down", 500)
+    transport.add("POST", LIGDICASH_URL, INVOICE_OK)
+    om.policy = make_policy(failure_threshold=10)
+    router = PaymentRouter(om, ligdicash=ligdicash, alpha=1, probe_interval=60)
+    request = PaymentRequest("76000000", 1000, otp="1234", command=COMMAND)
+
+    provider, result = router.pay(request)
+    assert provider == ORANGEMONEY and not result.success
+    assert router.degraded(ORANGEMONEY)
+
+    provider, result = router.pay(request)
+    assert provider == LIGDICASH and result.success
+    assert router.health()[ORANGEMONEY]["calls"] == 1
+
+
+def test_invalid_arguments_do_not_count_against_the_provider(om, ligdicash):
+    router = PaymentRouter(om, ligdicash=ligdicash)
+
+    for amount in (0, -5, "1000", None, True):
+        with pytest.raises(ValueError):
+            router.pay(PaymentRequest("76000000", amount, otp="1234"))
+    with pytest.raises(ValueError):
+        router.pay("76000000")
+    with pytest.raises(ValueError):
+        router.pay(PaymentRequest("76000000", 1000, provider=LIGDICASH))
+    with pytest.raises(ValueError):
+        router.pay(PaymentRequest("76000000", 1000, command="x", provider=LIGDICASH))
+
+    health = router.health()
+    assert health[ORANGEMONEY]["calls"] == health[LIGDICASH]["calls"] == 0
+    assert not router.degraded(ORANGEMONEY)
+
+
+def test_provider_errors_are_observed(moov, transport):
+    def fail(method, url, **kwargs):
+        raise RuntimeError("gateway bug")
+
+    router = PaymentRouter(moovmoney=moov)
+    moov.pool = type(transport)().add("POST", moov.url, fail)
+    moov.policy = make_policy(failure_threshold=10)
+
+    result = router.pay(
+        PaymentRequest("70000000", 1000, otp="1234", otp_trans_id="MM1")
+    )[1]
+
+    assert not result.success
+    assert router.health()[MOOVMONEY]["calls"] == 1
+    assert router.health()[MOOVMONEY]["error_rate"] > 0
+
+
+def test_pay_async(transport):
+    transport.add("POST", OM_URL, OM_OK)
+    om = AsyncOMPayment(OM_URL, "70000000", "om-merchant", "secret")
+    om.async_pool = transport
+    om.policy = make_policy()
+    router = PaymentRouter(om)
+
+    provider, result = asyncio.run(
+        router.pay_async(PaymentRequest("76000000", 1000, otp="1234"))
+    )
+    assert provider == ORANGEMONEY and result.success
+
+    with pytest.raises(ValueError):
+        asyncio.run(router.pay_async(PaymentRequest("76000000", 0)))
+    assert router.health()[ORANGEMONEY]["calls"] == 1
@@ -0,0 +1,118 @@
+import asyncio
+import json
+
+import pytest
+
+from mobilemoney.aio import AsyncConnectionPool
+from mobilemoney.orangemoney_aio import AsyncGenericPayment as AsyncOMPayment
+from mobilemoney.transport import (
+    FakeTransport,
+    Response,
+    Transport,
+    basic_auth,
+    encode_body,
+    request_target,
+)
+
+from test.conftest import OM_ARGS, OM_OK, OM_URL, make_policy
+
+
+def test_fake_transport_fixed_reply():
+    transport = FakeTransport().add(
+        "post", "http://x.test/a", "réponse", 201, {"X-Id": "1"}
+    )
+
+    response = transport.request("POST", "http://x.test/a?page=2", data=b"body")
+
+    assert response.status_code == 201
+    assert response.content == "réponse".encode("utf-8")
+    assert response.headers == {"X-Id": "1"}
+    assert response.url == "http://x.test/a?page=2"
+    assert transport.calls == [("POST", "http://x.test/a?page=2", {"data": b"body"})]
+    assert transport.stats() == {"requests": 1}
+
+
+def test_fake_transport_unknown_route():
+    response = FakeTransport().request("GET", "http://x.test/missing")
+
+    assert response.status_code == 404
+    assert not response.ok
+
+
+def test_fake_transport_handler_and_callable_reply():
+    def handler(method, url, **kwargs):
+        return 200, f"{method} {url}".encode("ascii")
+
+    transport = FakeTransport(handler, record=False).add(
+        "GET", "http://x.test/r", lambda method, url, **kwargs: Response(204)
+    )
+
+    assert transport.request("GET", "http://x.test/r").status_code == 204
+    assert transport.request("PUT", "http://x.test/o").content == b"PUT http://x.test/o"
+    assert transport.calls == []
+    assert transport.stats() == {"requests": 2}
+
+
+def test_response_decodes_lazily():
+    response = Response(200, '{"message": "payé"}'.encode("utf-8"))
+
+    assert response.text == '{"message": "payé"}'
+    assert response.json() == {"message": "payé"}
+    assert response.ok
+    assert Response(500).text == ""
+
+
+def test_encode_body():
+    assert encode_body(json={"a": 1}) == (b'{"a": 1}', "application/json")
+    assert encode_body(data="é") == ("é".encode("utf-8"), None)
+    assert encode_body(data={"a": "b c"}) == (
+        b"a=b+c",
+        "application/x-www-form-urlencoded",
+    )
+    body = memoryview(b"raw")
+    assert encode_body(data=body)[0] is body
+    assert encode_body() == (b"", None)
+
+
+def test_request_target_and_basic_auth():
+    assert request_target("http://x.test") == "/"
+    assert request_target("http://x.test/p?a=1", {"b": 2}) == "/p?a=1&b=2"
+    assert basic_auth(("user", "pass")) == "Basic dXNlcjpwYXNz"
+
+
+def test_async_pool_is_a_transport():
+    assert isinstance(AsyncConnectionPool(), Transport)
+    assert AsyncConnectionPool.asynchronous
+    assert not FakeTransport.asynchronous
+
+
+def test_async_client_with_fake_transport(transport):
+    transport.add("POST", OM_URL, OM_OK)
+    client = AsyncOMPayment(OM_URL, "70000000", "om-merchant", "secret")
+    client.async_pool = transport
+    client.policy = make_policy()
+
+    result = asyncio.run(client.validate_payment(*OM_ARGS))
+
+    assert result.success
+    assert result.trans_id == "OM.2310.1712.0001"
+    assert b"<otp>1234</otp>" in transport.calls[0][2]["data"]
+
+
+def test_async_pool_rejects_other_objects():
+    client = AsyncOMPayment(OM_URL, "70000000", "om-merchant", "secret")
+
+    with pytest.raises(ValueError):
+        client.async_pool = object()
+
+
+def test_ligdicash_request_body(ligdicash, transport):
+    transport.add("POST", ligdicash.url, b'{"response_code": "00", "token": "t"}')
+
+    ligdicash.validate_payment({"invoice": {"total_amount": 100}})
+
+    method, url, kwargs = transport.calls[0]
+    sent = json.loads(kwargs["data"])
+    assert sent["commande"]["invoice"] == {"total_amount": 100}
+    assert sent["commande"]["custom_data"]["transaction_id"]
+    assert kwargs["headers"]["Apikey"] == "apikey"
@@ -0,0 +1,214 @@
+import json
+import re
+import threading
+
+import pytest
+
+from mobilemoney import utils
+from mobilemoney.transport import basic_auth
+from mobilemoney.utils import JSONTemplate, ReferenceGenerator, get_reference
+
+from test.conftest import LIGDICASH_URL, MOOV_URL
+
+REFERENCE = re.compile(r"^\d{6}\.\d{6}\.([0-9a-z-]+)\.(\d{6})$")
+
+
+class Clock(object):
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(1700000000.5)
+    monkeypatch.setattr(utils.time, "time", clock)
+    return clock
+
+
+def test_reference_format():
+    generator = ReferenceGenerator()
+    match = REFERENCE.match(generator.next())
+
+    assert match and match.group(1) == generator.node
+    assert len(generator.node) == 12
+    assert REFERENCE.match(get_reference())
+
+
+def test_node(monkeypatch):
+    assert ReferenceGenerator("api-1").node == "api-1"
+
+    monkeypatch.setenv("MOBILEMONEY_NODE_ID", "api-2")
+    assert ReferenceGenerator().node == "api-2"
+
+    monkeypatch.delenv("MOBILEMONEY_NODE_ID")
+    assert ReferenceGenerator().node != ReferenceGenerator().node
+
+    with pytest.raises(ValueError):
+        ReferenceGenerator(1)
+
+
+def test_references_are_utc_and_sorted(clock):
+    generator = ReferenceGenerator("n")
+    first = generator.next()
+    clock.now += 1
+    second = generator.next()
+
+    assert first == "231114.221320.n.000000"
+    assert second == "231114.221321.n.000000"
+    assert first < second
+
+
+def test_clock_going_backwards(clock):
+    generator = ReferenceGenerator("n")
+    first = generator.next()
+    clock.now -= 3600
+    second = generator.next()
+
+    assert second == "231114.221320.n.000001"
+    assert first < second
+
+
+def test_full_second_is_carried_over(clock, monkeypatch):
+    monkeypatch.setattr(utils, "_SEQUENCE_LIMIT", 3)
+    generator = ReferenceGenerator("n")
+
+    assert generator.generate(2) == [
+        "231114.221320.n.000000",
+        "231114.221320.n.000001",
+    ]
+    assert generator.generate(2) == [
+        "231114.221321.n.000000",
+        "231114.221321.n.000001",
+    ]
+    # the clock catches up: the carried second keeps counting
+    clock.now += 1
+    assert generator.next() == "231114.221321.n.000002"
+
+
+@pytest.mark.parametrize("n", [0, -1, 1.5, 1000001])
+def test_generate_rejects_bad_count(n):
+    with pytest.raises(ValueError):
+        ReferenceGenerator().generate(n)
+
+
+def test_unique_across_threads():
+    generator = ReferenceGenerator()
+    found = []
+
+    def run():
+        found.extend(generator.next() for _ in range(2000))
+        found.extend(generator.generate(500))
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(found)) == len(found) == 8 * 2500
+
+
+def test_fork_changes_node(monkeypatch):
+    random = ReferenceGenerator()
+    fixed = ReferenceGenerator("api")
+    parent = random.node
+    random.next()
+    fixed.next()
+
+    monkeypatch.setattr(utils.os, "getpid", lambda: 424242)
+
+    assert REFERENCE.match(random.next()).group(2) == "000000"
+    assert random.node != parent
+    assert fixed.next().split(".")[2] == "api-424242"
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(utils, "orjson", None)
+    elif utils.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+
+def test_json_dumps(encoder):
+    value = {"a": 'é"\n', "b": [1, 2.5, None, True], 3: "x"}
+
+    assert utils.json_dumps(value) == json.dumps(
+        {"a": 'é"\n', "b": [1, 2.5, None, True], "3": "x"},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["", 'Achat "spécial"\n\t<&>', 1000, -5, 2.5, None, True, [1, "a"], {"k": 1}],
+)
+def test_template_renders_like_json(encoder, value):
+    template = JSONTemplate(
+        {
+            "fixed": "héhé",
+            "value": JSONTemplate.field("value"),
+            "nested": {"items": [JSONTemplate.field("other"), 0]},
+        }
+    )
+
+    assert template.fields == ("value", "other")
+    assert json.loads(template.render(value=value, other="o")) == {
+        "fixed": "héhé",
+        "value": value,
+        "nested": {"items": ["o", 0]},
+    }
+
+
+def test_template_bytes_are_encoded_json(encoder):
+    template = JSONTemplate({"items": JSONTemplate.field("items")})
+
+    assert template.render(items=b"[1,2]") == b'{"items":[1,2]}'
+    with pytest.raises(KeyError):
+        template.render()
+
+
+def test_moov_body_matches_query(moov):
+    args = ("76000000", "1234", 1000, 'Achat "spécial"', "MM1")
+
+    assert json.loads(moov.serialize_query(*args)) == moov.parse_query(*args)
+
+
+def test_moov_headers_are_cached(moov, transport):
+    transport.add("POST", MOOV_URL, b'{"status": "0", "trans-id": "MM1"}')
+    transport.add("POST", MOOV_URL, b'{"status": "0", "trans-id": "MM2"}')
+    moov.send_otp("76000000", 1000)
+    moov.send_otp("76000000", 2000)
+
+    first, second = (call[2]["headers"] for call in transport.calls)
+    assert first is second
+    assert first["authorization"] == basic_auth(("moov-merchant", "secret"))
+    assert json.loads(transport.calls[1][2]["data"])["amount"] == 2000
+    with pytest.raises(TypeError):
+        first["authorization"] = ""
+
+    moov.password = "changed"
+    headers = moov._command_headers(first["command-id"])
+    assert headers["authorization"] == basic_auth(("moov-merchant", "changed"))
+
+
+def test_ligdicash_headers_are_cached(ligdicash, transport):
+    transport.add("POST", LIGDICASH_URL, b'{"response_code": "00", "token": "t"}')
+    command = {
+        "invoice": {"total_amount": 100},
+        "custom_data": {"transaction_id": "T1"},
+    }
+    ligdicash.validate_payment(command)
+
+    headers = transport.calls[0][2]["headers"]
+    assert headers is ligdicash._request_headers()
+    assert headers["Authorization"] == "Bearer apitoken"
+    assert json.loads(transport.calls[0][2]["data"]) == {"commande": command}
+
+    ligdicash.username = "other"
+    assert ligdicash._request_headers()["Apikey"] == "other"
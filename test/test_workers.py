@@ -0,0 +1,84 @@
+import multiprocessing
+import os
+import threading
+
+import pytest
+
+from benchmarks.servers import MockProviderServer
+from mobilemoney.orangemoney import GenericPayment as OMPayment
+from mobilemoney.workers import ProcessItem, ProcessValidator
+
+from test.conftest import OM_ARGS
+
+pytestmark = pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork"
+)
+
+
+class CrashingPayment(OMPayment):
+    def crash(self, *args):
+        os._exit(3)
+
+
+@pytest.fixture(scope="module")
+def server():
+    with MockProviderServer() as server:
+        yield server
+
+
+@pytest.fixture
+def validator():
+    validator = ProcessValidator(
+        processes=2, threads=2, context=multiprocessing.get_context("fork")
+    )
+    validator.check_interval = 0.05
+    yield validator
+    validator.shutdown(timeout=5)
+
+
+def om_item(server, merchant, key=None, cls=OMPayment, **kwargs):
+    client_args = (server.url("/om"), "70000000", merchant, "secret")
+    return ProcessItem(cls, client_args, *OM_ARGS, key=key, **kwargs)
+
+
+def test_item_validation(server):
+    with pytest.raises(ValueError):
+        ProcessItem(object, ())
+    with pytest.raises(ValueError):
+        ProcessItem(OMPayment, (), method="missing")
+
+    assert om_item(server, "a").shard == om_item(server, "a").shard
+    assert om_item(server, "a").provider == "orangemoney"
+
+
+def test_payments_run_in_workers(server, validator):
+    items = [om_item(server, f"merchant-{index % 3}", key=index) for index in range(12)]
+
+    results = list(validator.run(items))
+
+    assert sorted(result.key for result in results) == list(range(12))
+    assert all(result.ok and result.result.success for result in results)
+
+
+def test_unpicklable_item_fails_at_once(server, validator):
+    item = om_item(server, "a", reference=threading.Lock())
+
+    result = validator.submit(item).result(timeout=5)
+
+    assert isinstance(result.error, ValueError)
+
+
+def test_dead_worker_is_replaced(server, validator):
+    crash = validator.submit(om_item(server, "a", cls=CrashingPayment, method="crash"))
+    # the job loses its worker: its outcome is unknown
+    assert isinstance(crash.result(timeout=10).error, RuntimeError)
+
+    after = validator.submit(om_item(server, "a", cls=CrashingPayment))
+    assert after.result(timeout=10).result.success
+
+
+def test_shutdown(server, validator):
+    validator.shutdown(timeout=5)
+
+    with pytest.raises(RuntimeError):
+        validator.submit(om_item(server, "a"))